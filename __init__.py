@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from backend.plugin.option.model import Config, APIKey
+from backend.plugin.option.model import Config, APIKey, ConfigRevision, ConfigChange, ConfigBlob
 
-__all__ = ['Config', 'APIKey']
+__all__ = ['Config', 'APIKey', 'ConfigRevision', 'ConfigChange', 'ConfigBlob']
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import json
+
+from typing import Any, TypeVar
+
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from backend.common.exception import errors
+from backend.plugin.option.conf import option_settings
+
+ModelT = TypeVar('ModelT', bound=BaseModel)
+
+
+async def read_json_body(request: Request, limit: int) -> Any:
+    """
+    按大小上限读取并解析 JSON 请求体
+
+    声明了 Content-Length 时在读取前拒绝，分块传输时读取过程中超限即拒绝；大文档在线程池中解析
+
+    :param request: 请求对象
+    :param limit: 请求体字节数上限
+    :return: 解析后的 JSON
+    """
+    content_length = request.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        raise errors.HTTPError(code=413, msg=f'请求体 {content_length} 字节超过上限 {limit} 字节')
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise errors.HTTPError(code=413, msg=f'请求体超过上限 {limit} 字节')
+        chunks.append(chunk)
+    body = b''.join(chunks)
+    try:
+        if size >= option_settings.CONFIG_THREADPOOL_MIN_SIZE:
+            return await run_in_threadpool(json.loads, body)
+        return json.loads(body)
+    except ValueError as e:
+        raise errors.RequestError(msg=f'请求体不是合法的 JSON: {e}')
+
+
+def request_body_schema(model: type[BaseModel]) -> dict:
+    """
+    手动读取请求体的接口在 OpenAPI 文档中声明的请求体
+
+    :param model: 请求模型
+    :return: openapi_extra
+    """
+    return {'requestBody': {'required': True, 'content': {'application/json': {'schema': model.model_json_schema()}}}}
+
+
+def validate_body(model: type[ModelT], data: Any) -> ModelT:
+    """
+    校验已解析的请求体，错误格式与 FastAPI 自动校验一致
+
+    :param model: 请求模型
+    :param data: 已解析的 JSON
+    :return:
+    """
+    try:
+        return model.model_validate(data)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False), body=data)
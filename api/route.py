@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import time
+
+from typing import Callable, Coroutine, Any
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from backend.plugin.option.service.metrics_service import metrics_service
+from backend.plugin.option.service.profile_service import PROFILE_HEADER, profile_service
+
+
+class OptionRoute(APIRoute):
+    """统计每个路由的请求数、耗时及请求/响应体大小，按需剖析请求并返回 Server-Timing 响应头"""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        route = self.path_format
+
+        async def instrumented_handler(request: Request) -> Response:
+            started = time.perf_counter()
+            profile_token = profile_service.begin(route, request.method, request.headers.get(PROFILE_HEADER))
+            status = 500
+            response = None
+            try:
+                response = await handler(request)
+                status = response.status_code
+                return response
+            except Exception as e:
+                code = getattr(e, 'status_code', None) or getattr(e, 'code', None)
+                status = code if isinstance(code, int) else 500
+                raise
+            finally:
+                if profile_token is not None:
+                    profile = profile_service.finish(profile_token, status)
+                    if response is not None:
+                        response.headers['Server-Timing'] = profile.server_timing()
+                metrics_service.observe_request(
+                    route,
+                    request.method,
+                    status,
+                    time.perf_counter() - started,
+                    request.headers.get('content-length'),
+                    response.headers.get('content-length') if response is not None else None,
+                )
+
+        return instrumented_handler
@@ -1,11 +1,36 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
 from fastapi import APIRouter
 
 from backend.core.conf import settings
 from backend.plugin.option.api.v1.option_api import router as option_router
+from backend.plugin.option.service.bus_service import config_bus
+from backend.plugin.option.service.usage_service import usage_service
 
-v1 = APIRouter(prefix=f'{settings.FASTAPI_API_V1_PATH}/option')
 
-v1.include_router(option_router, tags=['option配置下发'])
+async def shutdown() -> None:
+    """
+    插件退出钩子：刷新缓冲的 last_used_time 并停止配置变更订阅
+
+    宿主应用的 FastAPI 版本不合并被包含路由的 lifespan 时，需在自身 lifespan 退出时调用
+    """
+    await usage_service.shutdown()
+    await config_bus.shutdown()
+
 
+@asynccontextmanager
+async def lifespan(_app: Any) -> AsyncIterator[None]:
+    """插件生命周期，宿主应用包含路由时合并到其 lifespan，退出时调用 shutdown"""
+    try:
+        yield
+    finally:
+        await shutdown()
+
+
+# 宿主应用使用 lifespan 时不会执行路由的 shutdown 事件，改为随 lifespan 退出
+v1 = APIRouter(prefix=f'{settings.FASTAPI_API_V1_PATH}/option', lifespan=lifespan)
+
+v1.include_router(option_router, tags=['option配置下发'])
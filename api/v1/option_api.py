@@ -1,32 +1,62 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from fastapi import APIRouter, Header, Path, Depends
+import time
+
+from fastapi import APIRouter, Header, Path, Query, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from backend.plugin.option.api.body import read_json_body, request_body_schema, validate_body
+from backend.plugin.option.api.route import OptionRoute
 from backend.plugin.option.service.config_service import config_service
+from backend.plugin.option.service.metrics_service import metrics_service
+from backend.plugin.option.service.profile_service import PROFILE_HEADER, profile_service
+from backend.plugin.option.service.revision_service import config_revision_service
+from backend.plugin.option.service.snapshot_service import snapshot_service
+from backend.plugin.option.service.transfer_service import ImportMode, config_transfer_service
+from backend.common.exception import errors
 from backend.common.response.response_schema import ResponseModel, ResponseSchemaModel, response_base
 from backend.common.response.response_code import CustomResponse
 from backend.plugin.option.schema.schema_config import (
     ConfigRequest,
     ConfigDataResponse,
     SysConfigInfo,
-    UpdateConfigRequest
+    UpdateConfigRequest,
+    WatchConfigResponse,
+    BatchConfigRequest,
+    BatchConfigItem,
+    BatchConfigResponse,
+    ConfigRevisionList,
+    BatchSaveConfigRequest,
+    SavedAPIKey,
+    ImportConfigResult
 )
+from backend.plugin.option.conf import option_settings
+from backend.plugin.option.utils.content import etag_matches
+from backend.plugin.option.utils.encoding import IDENTITY
 
 
 from backend.common.security.jwt import DependsJwtAuth
 
-router = APIRouter()
+router = APIRouter(route_class=OptionRoute)
 
 
-@router.post('/save-config', summary='保存配置并生成API Key', response_model=ResponseModel)
+@router.post(
+    '/save-config',
+    summary='保存配置并生成API Key',
+    response_model=ResponseModel,
+    openapi_extra=request_body_schema(ConfigRequest)
+)
 async def save_config(
-    config_request: ConfigRequest
+    request: Request
 ) -> ResponseModel:
     """
     保存配置数据并生成API Key
 
-    :param config_request: 配置请求数据，包含名称和配置数据
+    请求体按 Content-Length 及默认配置大小上限提前拒绝，大文档在线程池中解析
+
+    :param request: 请求对象，请求体为配置请求数据，包含名称和配置数据
     :return: 返回模型，包含状态码、消息和API Key
     """
+    config_request = validate_body(ConfigRequest, await read_json_body(request, option_settings.CONFIG_MAX_SIZE))
     api_key, _ = await config_service.save_config(
         name=config_request.name,
         config_data=config_request.config_data
@@ -34,40 +64,291 @@ async def save_config(
     return response_base.success(res=CustomResponse(code=200, msg='创建成功'), data=api_key)
 
 
+@router.post(
+    '/save-configs',
+    summary='批量保存配置并生成API Key',
+    response_model=ResponseModel,
+    dependencies=[DependsJwtAuth],
+    openapi_extra=request_body_schema(BatchSaveConfigRequest)
+)
+async def save_configs(
+    request: Request
+) -> ResponseModel:
+    """
+    批量保存配置数据并生成API Key，在同一事务中完成
+
+    请求体按 Content-Length 及请求体大小上限提前拒绝，每个配置再按默认配置大小上限校验
+
+    :param request: 请求对象，请求体为批量保存配置请求，包含名称和配置数据列表
+    :return: 返回模型，包含各名称对应的API Key
+    """
+    batch_request = validate_body(
+        BatchSaveConfigRequest, await read_json_body(request, option_settings.CONFIG_MAX_REQUEST_SIZE)
+    )
+    saved = await config_service.save_configs(
+        items=[(item.name, item.config_data) for item in batch_request.configs]
+    )
+    data = [SavedAPIKey(name=name, api_key=api_key) for name, api_key in saved]
+    return response_base.success(res=CustomResponse(code=200, msg='创建成功'), data=data)
+
+
+@router.get('/export-configs', summary='导出全部配置', dependencies=[DependsJwtAuth])
+async def export_configs() -> StreamingResponse:
+    """
+    以 NDJSON 流式导出全部 API Key 及配置，每行一个 JSON 对象
+
+    :return: application/x-ndjson 流式响应
+    """
+    return StreamingResponse(
+        config_transfer_service.export_configs(),
+        media_type='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename="configs.ndjson"'},
+    )
+
+
+@router.post('/import-configs', summary='导入配置', response_model=ResponseSchemaModel[ImportConfigResult], dependencies=[DependsJwtAuth])
+async def import_configs(
+    request: Request,
+    mode: ImportMode = Query('upsert', description='upsert 覆盖已存在的 Key，skip 跳过已存在的 Key')
+) -> ResponseSchemaModel[ImportConfigResult]:
+    """
+    从 NDJSON 请求体流式导入配置，格式与导出一致，按批提交
+
+    :param request: 请求对象，请求体为 NDJSON
+    :param mode: 已存在 Key 的处理方式
+    :return: 返回模型，包含导入统计及失败行明细
+    """
+    result = await config_transfer_service.import_configs(chunks=request.stream(), mode=mode)
+    return response_base.success(res=CustomResponse(code=200, msg='导入完成'), data=result)
+
 
 @router.get('/get-config', summary='获取配置', response_model=ConfigDataResponse, name='option_get_config')
 async def get_config(
-    api_key: str = Header(..., description='API Key')
-) -> ConfigDataResponse:
+    request: Request,
+    response: Response,
+    api_key: str = Header(..., description='API Key'),
+    if_none_match: str | None = Header(None, description='上次获取配置时返回的 ETag'),
+    accept_encoding: str | None = Header(None, description='支持的压缩编码，如 gzip、zstd'),
+    pointer: list[str] | None = Query(None, description='JSON Pointer，如 /smtp/to，可传多个')
+) -> ConfigDataResponse | Response:
     """
-    获取配置数据
+    获取配置数据，支持 ETag / If-None-Match 条件请求及 JSON Pointer 片段提取
 
+    完整文档直接返回按版本缓存的序列化及压缩结果，不再经过 pydantic 校验和重新编码；
+    超过该 Key 的限流配额时返回 429
+
+    :param request: 请求对象
+    :param response: 响应对象
     :param api_key: API Key
-    :return: 配置数据
+    :param if_none_match: If-None-Match 请求头
+    :param accept_encoding: Accept-Encoding 请求头
+    :param pointer: JSON Pointer 列表，单个时返回该片段，多个时返回指针到片段的映射
+    :return: 配置数据，未变更时返回 304
     """
-    config_data = await config_service.get_config(api_key=api_key)
-    return ConfigDataResponse(config_data=config_data)
+    await config_service.check_rate_limit(
+        api_key=api_key, scope='read', client_ip=request.client.host if request.client else None
+    )
+    entry = await config_service.get_config(api_key=api_key, if_none_match=if_none_match)
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers={'ETag': entry.etag})
+    headers = {'X-Config-Revision': str(entry.revision)}
+    if entry.etag:
+        headers['ETag'] = entry.etag
+    if pointer:
+        response.headers.update(headers)
+        return ConfigDataResponse(config_data=config_service.project_config(entry.config_data, pointer))
+
+    body, encoding = await config_service.render_config(entry, accept_encoding)
+    headers['Vary'] = 'Accept-Encoding'
+    if encoding != IDENTITY:
+        headers['Content-Encoding'] = encoding
+    return Response(content=body, media_type='application/json', headers=headers)
+
+
+@router.post('/get-configs', summary='批量获取配置', response_model=BatchConfigResponse, name='option_get_configs')
+async def get_configs(
+    request: Request,
+    batch_request: BatchConfigRequest
+) -> BatchConfigResponse:
+    """
+    批量获取多个API Key的配置数据，每个Key单独返回结果或错误信息
+
+    每个Key按自身读取配额计数，超过配额的Key返回错误信息
+
+    :param request: 请求对象
+    :param batch_request: 批量获取配置请求，包含API Key列表
+    :return: API Key到配置数据或错误信息的映射
+    """
+    results = await config_service.get_configs(
+        api_keys=batch_request.api_keys, client_ip=request.client.host if request.client else None
+    )
+    configs = {
+        api_key: BatchConfigItem(error=entry)
+        if isinstance(entry, str)
+        else BatchConfigItem(config_data=entry.config_data, revision=entry.revision)
+        for api_key, entry in results.items()
+    }
+    return BatchConfigResponse(configs=configs)
+
 
+@router.get('/watch-config', summary='长轮询监听配置变更', response_model=WatchConfigResponse, name='option_watch_config')
+async def watch_config(
+    api_key: str = Header(..., description='API Key'),
+    revision: int = Query(0, description='客户端当前的配置版本号'),
+    timeout: float | None = Query(None, gt=0, description='最长等待秒数，默认使用服务端配置')
+) -> WatchConfigResponse | Response:
+    """
+    长轮询监听配置变更，版本号变化时立即返回最新配置
 
-@router.put('/update-config', summary='更新配置', response_model=ResponseModel, name='option_update_config')
+    :param api_key: API Key
+    :param revision: 客户端当前的配置版本号
+    :param timeout: 最长等待秒数
+    :return: 最新配置及版本号，超时未变更时返回 304
+    """
+    entry = await config_service.watch_config(api_key=api_key, revision=revision, timeout=timeout)
+    if entry is None:
+        return Response(status_code=304)
+    return WatchConfigResponse(config_data=entry.config_data, revision=entry.revision)
+
+
+@router.put(
+    '/update-config',
+    summary='更新配置',
+    response_model=ResponseModel,
+    name='option_update_config',
+    openapi_extra=request_body_schema(UpdateConfigRequest)
+)
 async def update_config(
-    update_request: UpdateConfigRequest,
-    api_key: str = Header(..., description='API Key')
+    request: Request,
+    api_key: str = Header(..., description='API Key'),
+    if_match: str | None = Header(None, description='当前配置的 ETag，不一致时返回 412')
 ) -> ResponseModel:
     """
     根据API Key更新配置数据
 
-    :param update_request: 更新配置请求
+    请求体按 Content-Length 及该 Key 的配置大小上限提前拒绝，大文档在线程池中解析；超过限流配额时返回 429
+
+    :param request: 请求对象，请求体为更新配置请求
     :param api_key: API Key
+    :param if_match: If-Match 请求头
     :return: 标准响应格式，包含状态码、消息和数据
     """
+    await config_service.check_rate_limit(
+        api_key=api_key, scope='write', client_ip=request.client.host if request.client else None
+    )
+    limit = config_service.get_body_size_limit(api_key)
+    update_request = validate_body(UpdateConfigRequest, await read_json_body(request, limit))
     updated_config = await config_service.update_config(
         api_key=api_key,
-        config_data=update_request.config_data
+        config_data=update_request.config_data,
+        if_match=if_match
     )
     return response_base.success(res=CustomResponse(code=200, msg='更新成功'), data=updated_config)
 
 
+@router.patch(
+    '/update-config',
+    summary='局部更新配置',
+    response_model=ResponseModel,
+    name='option_patch_config',
+    openapi_extra={
+        'requestBody': {
+            'required': True,
+            'description': 'Merge Patch 对象或 JSON Patch 操作数组',
+            'content': {'application/merge-patch+json': {'schema': {}}, 'application/json-patch+json': {'schema': {'type': 'array'}}},
+        }
+    }
+)
+async def patch_config(
+    request: Request,
+    api_key: str = Header(..., description='API Key'),
+    if_match: str | None = Header(None, description='当前配置的 ETag，不一致时返回 412')
+) -> ResponseModel:
+    """
+    根据API Key局部更新配置数据
+
+    Content-Type 为 application/json-patch+json 时按 RFC 6902 JSON Patch 处理，
+    application/merge-patch+json 或 application/json 时按 RFC 7396 Merge Patch 处理；
+    补丁按该 Key 的配置大小上限提前拒绝，应用后的配置同样受该上限约束；超过限流配额时返回 429
+
+    :param request: 请求对象，请求体为补丁内容
+    :param api_key: API Key
+    :param if_match: If-Match 请求头
+    :return: 标准响应格式，包含状态码、消息和数据
+    """
+    content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    if content_type == 'application/json-patch+json':
+        patch_type = 'json'
+    elif content_type in ('application/merge-patch+json', 'application/json'):
+        patch_type = 'merge'
+    else:
+        raise errors.HTTPError(code=415, msg=f'不支持的补丁类型: {content_type}')
+    await config_service.check_rate_limit(
+        api_key=api_key, scope='write', client_ip=request.client.host if request.client else None
+    )
+    limit = config_service.get_body_size_limit(api_key)
+    patch = await read_json_body(request, limit)
+    updated_config = await config_service.patch_config(
+        api_key=api_key,
+        patch=patch,
+        patch_type=patch_type,
+        if_match=if_match
+    )
+    return response_base.success(res=CustomResponse(code=200, msg='更新成功'), data=updated_config)
+
+
+@router.get('/config-revisions', summary='获取配置历史版本', response_model=ResponseSchemaModel[ConfigRevisionList], name='option_get_config_revisions')
+async def get_config_revisions(
+    api_key: str = Header(..., description='API Key'),
+    limit: int = Query(20, ge=1, le=200, description='每页条数'),
+    before: int | None = Query(None, description='游标，传入上一页返回的 next_cursor')
+) -> ResponseSchemaModel[ConfigRevisionList]:
+    """
+    按版本号倒序获取配置历史版本
+
+    :param api_key: API Key
+    :param limit: 每页条数
+    :param before: 游标
+    :return: 历史版本摘要及下一页游标
+    """
+    result = await config_revision_service.get_revisions(api_key=api_key, limit=limit, before=before)
+    return response_base.success(data=ConfigRevisionList(**result))
+
+
+@router.get('/config-revisions/{revision}', summary='获取指定版本的配置', response_model=ConfigDataResponse, name='option_get_config_revision')
+async def get_config_revision(
+    revision: int = Path(..., ge=1, description='配置版本号'),
+    api_key: str = Header(..., description='API Key')
+) -> ConfigDataResponse:
+    """
+    获取指定历史版本的配置数据
+
+    :param revision: 配置版本号
+    :param api_key: API Key
+    :return: 该版本的配置数据
+    """
+    config_data = await config_revision_service.get_revision(api_key=api_key, revision=revision)
+    return ConfigDataResponse(config_data=config_data)
+
+
+@router.post('/config-revisions/{revision}/rollback', summary='回滚配置到指定版本', response_model=ResponseModel, name='option_rollback_config')
+async def rollback_config(
+    revision: int = Path(..., ge=1, description='配置版本号'),
+    api_key: str = Header(..., description='API Key'),
+    if_match: str | None = Header(None, description='当前配置的 ETag，不一致时返回 412')
+) -> ResponseModel:
+    """
+    回滚配置到指定历史版本，回滚结果作为新版本保存
+
+    :param revision: 配置版本号
+    :param api_key: API Key
+    :param if_match: If-Match 请求头
+    :return: 标准响应格式，包含状态码、消息和回滚后的配置数据
+    """
+    config_data = await config_revision_service.rollback(api_key=api_key, revision=revision, if_match=if_match)
+    return response_base.success(res=CustomResponse(code=200, msg='回滚成功'), data=config_data)
+
+
 @router.delete('/delete-key-by-id/{api_key_id}', summary='通过Key ID删除配置和API Key', response_model=ResponseModel, dependencies=[DependsJwtAuth])
 async def delete_config_by_api_key_id(
     api_key_id: str = Path(..., description='API Key ID')
@@ -83,13 +364,27 @@ async def delete_config_by_api_key_id(
 
 
 @router.get('/get-sys-config-info', summary='获取用户历史配置和API Key信息', response_model=ResponseSchemaModel[SysConfigInfo], dependencies=[DependsJwtAuth])
-async def get_sys_config_info() -> ResponseSchemaModel[SysConfigInfo]:
+async def get_sys_config_info(
+    page_size: int = Query(20, ge=1, le=200, description='每页条数'),
+    after_id: int | None = Query(None, description='游标，传入上一页返回的 next_cursor'),
+    name: str | None = Query(None, description='名称模糊匹配'),
+    status: int | None = Query(None, description='状态(0停用 1正常)')
+) -> ResponseSchemaModel[SysConfigInfo]:
     """
-    获取系统配置和API Key信息，API Key会被部分加密显示
+    按游标分页获取系统配置和API Key信息，API Key会被部分加密显示
 
-    :return: 包含系统配置和API Key信息的响应
+    :param page_size: 每页条数
+    :param after_id: 游标
+    :param name: 名称模糊匹配
+    :param status: 状态过滤
+    :return: 包含系统配置和API Key信息及下一页游标的响应
     """
-    result = await config_service.get_sys_config_info()
+    result = await config_service.get_sys_config_info(
+        page_size=page_size,
+        after_id=after_id,
+        name=name,
+        status=status
+    )
     return response_base.success(data=SysConfigInfo(**result))
 
 
@@ -106,3 +401,145 @@ async def get_api_key(api_key_id: int = Path(..., description='API Key ID')
     return response_base.success(res=CustomResponse(code=200, msg='获取成功'), data=api_key)
 
 
+@router.put('/api-key/{api_key_id}/config-size-limit', summary='设置配置大小上限', response_model=ResponseModel, dependencies=[DependsJwtAuth])
+async def set_config_size_limit(
+    api_key_id: int = Path(..., description='API Key ID'),
+    max_config_size: int | None = Query(None, ge=1, description='配置大小上限（字节），不传时恢复全局默认值')
+) -> ResponseModel:
+    """
+    按 API Key 设置配置大小上限，超过上限的保存和更新请求返回 413
+
+    :param api_key_id: API Key ID
+    :param max_config_size: 配置大小上限
+    :return: 标准响应格式
+    """
+    await config_service.set_config_size_limit(api_key_id=api_key_id, max_config_size=max_config_size)
+    return response_base.success(res=CustomResponse(code=200, msg='设置成功'))
+
+
+@router.put('/api-key/{api_key_id}/rate-limit', summary='设置限流配额', response_model=ResponseModel, dependencies=[DependsJwtAuth])
+async def set_rate_limit(
+    api_key_id: int = Path(..., description='API Key ID'),
+    rate_limit: int | None = Query(None, ge=0, description='每秒请求数上限，0 为不限流，不传时恢复全局默认值'),
+    rate_burst: int | None = Query(None, ge=1, description='突发请求数上限，不传时使用全局默认值')
+) -> ResponseModel:
+    """
+    按 API Key 设置 get-config / update-config 的令牌桶限流配额，读、写分别计数
+
+    :param api_key_id: API Key ID
+    :param rate_limit: 每秒请求数上限
+    :param rate_burst: 突发请求数上限
+    :return: 标准响应格式
+    """
+    await config_service.set_rate_limit(api_key_id=api_key_id, rate_limit=rate_limit, rate_burst=rate_burst)
+    return response_base.success(res=CustomResponse(code=200, msg='设置成功'))
+
+
+@router.put('/api-key/{api_key_id}/parent', summary='设置配置继承', response_model=ResponseModel, dependencies=[DependsJwtAuth])
+async def set_config_parent(
+    api_key_id: int = Path(..., description='API Key ID'),
+    parent_key_id: int | None = Query(None, description='父配置的 API Key ID，不传时解除继承')
+) -> ResponseModel:
+    """
+    设置 API Key 的父配置，get-config 返回父配置与自身覆盖层深度合并（JSON Merge Patch）的结果；
+    设置时按新的父配置重新生成覆盖层，解析结果保持不变，之后的更新接口读写的均为覆盖层
+
+    :param api_key_id: API Key ID
+    :param parent_key_id: 父配置的 API Key ID
+    :return: 返回模型，包含父配置 API Key ID、有效版本号及覆盖层
+    """
+    data = await config_service.set_config_parent(api_key_id=api_key_id, parent_key_id=parent_key_id)
+    return response_base.success(res=CustomResponse(code=200, msg='设置成功'), data=data)
+
+
+@router.get('/cache-stats', summary='获取配置缓存统计', response_model=ResponseModel, dependencies=[DependsJwtAuth])
+async def get_cache_stats() -> ResponseModel:
+    """
+    获取配置缓存的命中、未命中及淘汰计数
+
+    :return: 缓存统计信息
+    """
+    return response_base.success(data=config_service.get_cache_stats())
+
+
+@router.post('/compile-snapshot', summary='生成配置快照', response_model=ResponseModel, dependencies=[DependsJwtAuth])
+async def compile_snapshot() -> ResponseModel:
+    """
+    将全部启用 Key 的配置编译为只读快照文件，写入 OPTION_SNAPSHOT_PATH，供边缘节点或数据库不可用时使用
+
+    :return: 返回模型，包含快照路径、条目数、版本及大小
+    """
+    info = await snapshot_service.compile()
+    return response_base.success(res=CustomResponse(code=200, msg='生成成功'), data=info)
+
+
+@router.post('/gc-config-blobs', summary='清理配置内容', response_model=ResponseModel, dependencies=[DependsJwtAuth])
+async def gc_config_blobs() -> ResponseModel:
+    """
+    删除不再被任何配置引用的内容，用于清理删除 Key 或导入覆盖后遗留的内容
+
+    :return: 返回模型，包含删除的条数
+    """
+    count = await config_service.gc_blobs()
+    return response_base.success(res=CustomResponse(code=200, msg='清理成功'), data={'deleted': count})
+
+
+@router.get('/metrics', summary='Prometheus 指标', include_in_schema=False)
+async def metrics(request: Request, authorization: str | None = Header(None)) -> Response:
+    """
+    以 Prometheus 文本格式输出请求、数据库、缓存等运行指标，只允许白名单 IP 或携带指标令牌的请求访问
+
+    :param request: 请求对象
+    :param authorization: Bearer 指标令牌
+    :return: text/plain 响应
+    """
+    if not option_settings.METRICS_ENABLED:
+        raise errors.NotFoundError(msg='指标接口未启用')
+    if not metrics_service.is_allowed(request.client.host if request.client else None, authorization):
+        raise errors.ForbiddenError(msg='无权访问指标接口')
+    return Response(content=metrics_service.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@router.get('/profiles', summary='获取请求剖析记录', response_model=ResponseModel, dependencies=[DependsJwtAuth])
+async def get_profiles(
+    limit: int = Query(50, ge=1, le=1000, description='条数')
+) -> ResponseModel:
+    """
+    获取当前 worker 环形缓冲中最近的请求剖析记录，包含各阶段及 SQL 耗时
+
+    :param limit: 条数
+    :return: 返回模型，新记录在前
+    """
+    return response_base.success(res=CustomResponse(code=200, msg='获取成功'), data=profile_service.get_profiles(limit))
+
+
+@router.put('/profiling', summary='设置请求剖析', response_model=ResponseModel, dependencies=[DependsJwtAuth])
+async def set_profiling(
+    enabled: bool | None = Query(None, description='是否对全部请求开启剖析'),
+    sample_rate: float | None = Query(None, ge=0, le=1, description='开启时写入环形缓冲的采样率')
+) -> ResponseModel:
+    """
+    运行时开关全局请求剖析，只影响当前 worker
+
+    :param enabled: 是否开启
+    :param sample_rate: 采样率
+    :return: 返回模型，包含当前设置
+    """
+    data = profile_service.configure(enabled=enabled, sample_rate=sample_rate)
+    return response_base.success(res=CustomResponse(code=200, msg='设置成功'), data=data)
+
+
+@router.post('/profile-token', summary='生成请求剖析签名头', response_model=ResponseModel, dependencies=[DependsJwtAuth])
+async def create_profile_token(
+    ttl: int = Query(300, ge=1, le=86400, description='有效期（秒）')
+) -> ResponseModel:
+    """
+    生成 X-Option-Profile 请求头的值，携带该请求头的请求会被剖析并写入环形缓冲
+
+    :param ttl: 有效期
+    :return: 返回模型，包含请求头名称及值
+    """
+    if not option_settings.PROFILE_SECRET:
+        raise errors.ForbiddenError(msg='未配置 OPTION_PROFILE_SECRET')
+    value = profile_service.sign(int(time.time()) + ttl)
+    return response_base.success(res=CustomResponse(code=200, msg='生成成功'), data={'header': PROFILE_HEADER, 'value': value})
@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+option 配置下发客户端，仅依赖 httpx，可单独复制到业务项目中使用
+"""
+from .option_client import AsyncOptionClient, OptionClient, OptionClientError
+
+__all__ = ['AsyncOptionClient', 'OptionClient', 'OptionClientError']
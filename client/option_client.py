@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+
+class OptionClientError(Exception):
+    """配置获取失败且本地没有可用缓存"""
+
+    def __init__(self, msg: str, *, status_code: int | None = None) -> None:
+        super().__init__(msg)
+        self.msg = msg
+        self.status_code = status_code
+
+
+class _DiskCache:
+    """本地磁盘缓存，每个 API Key 保存最后一次成功获取的配置"""
+
+    def __init__(self, cache_dir: str | os.PathLike) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, api_key: str) -> Path:
+        # 文件名使用摘要，避免 API Key 明文出现在文件系统中
+        return self.cache_dir / f'{hashlib.sha256(api_key.encode("utf-8")).hexdigest()}.json'
+
+    def load(self, api_key: str) -> dict | None:
+        """
+        读取缓存
+
+        :param api_key: API Key
+        :return: 包含 config_data、etag、revision 的字典
+        """
+        try:
+            with open(self._path(api_key), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, api_key: str, entry: dict) -> None:
+        """
+        原子写入缓存，进程中途退出也不会留下半个文件
+
+        :param api_key: API Key
+        :param entry: 包含 config_data、etag、revision 的字典
+        :return:
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.chmod(tmp, 0o600)
+            os.replace(tmp, self._path(api_key))
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+
+class AsyncOptionClient:
+    """
+    option 配置下发异步客户端
+
+    使用连接池复用连接，携带 If-None-Match 条件请求重新验证本地缓存；
+    服务端不可达或返回 5xx 时返回本地磁盘缓存，服务启动不依赖配置中心可用
+
+    :param base_url: option 接口前缀，如 http://127.0.0.1:8000/api/v1/option
+    :param cache_dir: 本地缓存目录，为空时不使用磁盘缓存
+    :param timeout: 请求超时秒数
+    :param max_connections: 连接池最大连接数
+    :param retries: 连接失败时的重试次数
+    :param batch_size: 批量获取时每个请求包含的 Key 数量
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        cache_dir: str | os.PathLike | None = None,
+        timeout: float = 5.0,
+        max_connections: int = 20,
+        retries: int = 2,
+        batch_size: int = 100,
+    ) -> None:
+        self.batch_size = batch_size
+        self._cache = _DiskCache(cache_dir) if cache_dir else None
+        self._memory: Dict[str, dict] = {}
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip('/'),
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=httpx.AsyncHTTPTransport(retries=retries),
+        )
+
+    async def __aenter__(self) -> 'AsyncOptionClient':
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """关闭连接池"""
+        await self._client.aclose()
+
+    def _load(self, api_key: str) -> dict | None:
+        """内部方法：读取内存或磁盘中的最后一次成功结果"""
+        entry = self._memory.get(api_key)
+        if entry is None and self._cache is not None:
+            entry = self._cache.load(api_key)
+            if entry is not None:
+                self._memory[api_key] = entry
+        return entry
+
+    def _store(self, api_key: str, entry: dict) -> None:
+        """内部方法：更新内存及磁盘缓存"""
+        self._memory[api_key] = entry
+        if self._cache is not None:
+            try:
+                self._cache.save(api_key, entry)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _error_message(response: httpx.Response) -> str:
+        """内部方法：提取服务端错误信息"""
+        try:
+            return response.json().get('msg') or response.text
+        except ValueError:
+            return response.text
+
+    async def get_config(self, api_key: str) -> Any:
+        """
+        获取配置数据
+
+        :param api_key: API Key
+        :return: 配置数据
+        """
+        cached = self._load(api_key)
+        headers = {'api-key': api_key}
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        try:
+            response = await self._client.get('/get-config', headers=headers)
+        except httpx.HTTPError as e:
+            if cached is not None:
+                return cached['config_data']
+            raise OptionClientError(f'配置中心不可达: {e}') from e
+
+        if response.status_code == 304 and cached is not None:
+            return cached['config_data']
+        if response.status_code == 200:
+            entry = {
+                'config_data': response.json()['config_data'],
+                'etag': response.headers.get('ETag'),
+                'revision': int(response.headers.get('X-Config-Revision', 0)),
+            }
+            self._store(api_key, entry)
+            return entry['config_data']
+        if response.status_code >= 500 and cached is not None:
+            return cached['config_data']
+        raise OptionClientError(self._error_message(response), status_code=response.status_code)
+
+    async def get_configs(self, api_keys: List[str]) -> Dict[str, Any]:
+        """
+        批量获取配置数据，按 batch_size 分批并发请求
+
+        :param api_keys: API Key 列表
+        :return: API Key 到配置数据或 OptionClientError 的映射
+        """
+        api_keys = list(dict.fromkeys(api_keys))
+        batches = [api_keys[i:i + self.batch_size] for i in range(0, len(api_keys), self.batch_size)]
+        results: Dict[str, Any] = {}
+        for batch_result in await asyncio.gather(*(self._get_batch(batch) for batch in batches)):
+            results.update(batch_result)
+        return results
+
+    async def _get_batch(self, api_keys: List[str]) -> Dict[str, Any]:
+        """内部方法：获取一批配置，请求失败时逐个回退到本地缓存"""
+        try:
+            response = await self._client.post('/get-configs', json={'api_keys': api_keys})
+            if response.status_code >= 500:
+                raise OptionClientError(self._error_message(response), status_code=response.status_code)
+        except (httpx.HTTPError, OptionClientError) as e:
+            results = {}
+            for api_key in api_keys:
+                cached = self._load(api_key)
+                results[api_key] = cached['config_data'] if cached else OptionClientError(f'配置中心不可达: {e}')
+            return results
+        if response.status_code != 200:
+            error = OptionClientError(self._error_message(response), status_code=response.status_code)
+            return {api_key: error for api_key in api_keys}
+
+        results = {}
+        for api_key, item in response.json()['configs'].items():
+            if item.get('error'):
+                results[api_key] = OptionClientError(item['error'])
+                continue
+            cached = self._load(api_key)
+            entry = {
+                'config_data': item['config_data'],
+                # 批量接口不返回 ETag，版本未变时保留原有 ETag 供后续条件请求使用
+                'etag': cached.get('etag') if cached and cached.get('revision') == item['revision'] else None,
+                'revision': item['revision'],
+            }
+            self._store(api_key, entry)
+            results[api_key] = entry['config_data']
+        return results
+
+    async def watch_config(self, api_key: str, *, timeout: float | None = None) -> Any | None:
+        """
+        长轮询等待配置变更
+
+        :param api_key: API Key
+        :param timeout: 服务端最长等待秒数
+        :return: 变更后的配置数据，超时未变更返回 None
+        """
+        cached = self._load(api_key)
+        params: Dict[str, Any] = {'revision': cached.get('revision', 0) if cached else 0}
+        if timeout is not None:
+            params['timeout'] = timeout
+        read_timeout = (timeout or 120) + 10
+        response = await self._client.get(
+            '/watch-config', headers={'api-key': api_key}, params=params, timeout=read_timeout
+        )
+        if response.status_code == 304:
+            return None
+        if response.status_code != 200:
+            raise OptionClientError(self._error_message(response), status_code=response.status_code)
+        data = response.json()
+        self._store(api_key, {'config_data': data['config_data'], 'etag': None, 'revision': data['revision']})
+        return data['config_data']
+
+
+class OptionClient:
+    """
+    option 配置下发同步客户端，供脚本使用
+
+    内部持有独立的事件循环运行 AsyncOptionClient，连接池在多次调用间复用
+    """
+
+    def __init__(self, base_url: str, **kwargs: Any) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._client = self._loop.run_until_complete(self._create(base_url, **kwargs))
+
+    @staticmethod
+    async def _create(base_url: str, **kwargs: Any) -> AsyncOptionClient:
+        return AsyncOptionClient(base_url, **kwargs)
+
+    def __enter__(self) -> 'OptionClient':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """关闭连接池及事件循环"""
+        if not self._loop.is_closed():
+            self._loop.run_until_complete(self._client.aclose())
+            self._loop.close()
+
+    def get_config(self, api_key: str) -> Any:
+        """
+        获取配置数据
+
+        :param api_key: API Key
+        :return: 配置数据
+        """
+        return self._loop.run_until_complete(self._client.get_config(api_key))
+
+    def get_configs(self, api_keys: List[str]) -> Dict[str, Any]:
+        """
+        批量获取配置数据
+
+        :param api_keys: API Key 列表
+        :return: API Key 到配置数据或 OptionClientError 的映射
+        """
+        return self._loop.run_until_complete(self._client.get_configs(api_keys))
+
+    def watch_config(self, api_key: str, *, timeout: float | None = None) -> Any | None:
+        """
+        长轮询等待配置变更
+
+        :param api_key: API Key
+        :param timeout: 服务端最长等待秒数
+        :return: 变更后的配置数据，超时未变更返回 None
+        """
+        return self._loop.run_until_complete(self._client.watch_config(api_key, timeout=timeout))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from functools import lru_cache
+from typing import Literal
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class OptionSettings(BaseSettings):
+    """option 插件配置，可通过 OPTION_ 前缀的环境变量覆盖"""
+
+    model_config = SettingsConfigDict(env_prefix='OPTION_', env_file='.env', env_file_encoding='utf-8', extra='ignore')
+
+    # 配置缓存
+    CONFIG_CACHE_MAXSIZE: int = 10000
+    CONFIG_CACHE_TTL: float = 300
+
+    # 按内容哈希共享的已解析配置及响应体，内容不可变，TTL 只用于回收内存
+    DOCUMENT_CACHE_MAXSIZE: int = 1000
+    DOCUMENT_CACHE_TTL: float = 3600
+
+    # 无效 API Key 过滤：布隆过滤器及短时负缓存
+    KEY_FILTER_ENABLED: bool = True
+    KEY_FILTER_ERROR_RATE: float = 0.001
+    KEY_FILTER_REBUILD_INTERVAL: float = 3600
+    NEGATIVE_CACHE_MAXSIZE: int = 100000
+    NEGATIVE_CACHE_TTL: float = 30
+
+    # last_used_time 批量回写
+    USAGE_FLUSH_INTERVAL: float = 10
+    USAGE_FLUSH_MAX_PENDING: int = 5000
+
+    # get-config 响应预序列化及压缩，zstd 需安装 zstandard
+    RESPONSE_COMPRESS_MIN_SIZE: int = 1024
+    RESPONSE_GZIP_LEVEL: int = 9
+    RESPONSE_ZSTD_LEVEL: int = 10
+
+    # 大配置：请求体及单个配置的默认大小上限（可按 Key 覆盖），超过阈值时压缩存储、线程池解析
+    CONFIG_MAX_SIZE: int = 4 * 1024 * 1024
+    CONFIG_MAX_REQUEST_SIZE: int = 64 * 1024 * 1024
+    CONFIG_COMPRESS_MIN_SIZE: int = 64 * 1024
+    CONFIG_COMPRESS_LEVEL: int = 6
+    CONFIG_THREADPOOL_MIN_SIZE: int = 256 * 1024
+
+    # 按 API Key 的令牌桶限流（get-config / update-config），可按 Key 覆盖；redis 后端在多 worker 间共享令牌桶
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal['memory', 'redis'] = 'memory'
+    RATE_LIMIT_RATE: int = 100
+    RATE_LIMIT_BURST: int = 200
+    RATE_LIMIT_BY_IP: bool = False
+    RATE_LIMIT_MAX_BUCKETS: int = 100000
+    RATE_LIMIT_REDIS_PREFIX: str = 'fba:option:rate_limit'
+    # 共享限流后端出错后，在该秒数内直接使用进程内令牌桶，不再等待后端
+    RATE_LIMIT_BACKEND_RETRY: float = 5
+
+    # 批量获取配置
+    BATCH_MAX_KEYS: int = 100
+    BATCH_MAX_SAVE: int = 1000
+
+    # NDJSON 导出/导入，每批读取或写入的条数及最多返回的失败明细数
+    TRANSFER_BATCH_SIZE: int = 500
+    TRANSFER_MAX_ERRORS: int = 100
+
+    # 配置继承，父配置链的最大层数
+    CONFIG_INHERIT_MAX_DEPTH: int = 8
+
+    # 配置历史版本，每隔多少个版本保存一次完整快照
+    REVISION_SNAPSHOT_INTERVAL: int = 20
+
+    # 配置变更长轮询
+    WATCH_TIMEOUT: float = 30
+    WATCH_MAX_TIMEOUT: float = 120
+
+    # 配置快照：serve 为 get-config 只读快照，fallback 为数据库不可用时读快照，off 为不使用
+    SNAPSHOT_MODE: Literal['off', 'fallback', 'serve'] = 'off'
+    SNAPSHOT_PATH: str = 'option.snapshot'
+    SNAPSHOT_RELOAD_INTERVAL: float = 30
+    SNAPSHOT_VERIFY: bool = True
+
+    # Prometheus 指标接口：只允许白名单内的客户端 IP 或携带 Bearer 令牌的请求访问
+    METRICS_ENABLED: bool = True
+    METRICS_ALLOWED_IPS: list[str] = ['127.0.0.1', '::1']
+    METRICS_TOKEN: str = ''
+
+    # 请求剖析：全局开启时按采样率写入环形缓冲；配置密钥后可通过签名请求头对单个请求开启
+    PROFILE_ENABLED: bool = False
+    PROFILE_SAMPLE_RATE: float = 1.0
+    PROFILE_BUFFER_SIZE: int = 200
+    PROFILE_SECRET: str = ''
+    PROFILE_MAX_QUERIES: int = 200
+    PROFILE_MAX_STATEMENT: int = 1000
+
+    # 跨 worker 配置变更广播：redis 为发布/订阅，db 为轮询变更日志，none 为仅本进程
+    BUS_BACKEND: Literal['redis', 'db', 'none'] = 'redis'
+    BUS_CHANNEL: str = 'fba:option:config_changed'
+    BUS_POLL_INTERVAL: float = 2
+    BUS_POLL_BATCH: int = 1000
+    # 自增序号按插入分配而非按提交顺序，每次轮询回看游标之前的若干序号，补上晚提交的变更
+    BUS_POLL_LOOKBACK: int = 200
+    BUS_RETENTION: int = 86400
+
+
+@lru_cache
+def get_option_settings() -> OptionSettings:
+    """获取 option 插件配置"""
+    return OptionSettings()
+
+
+option_settings = get_option_settings()
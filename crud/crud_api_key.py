@@ -1,26 +1,32 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 from datetime import datetime
-from typing import List
+from typing import AsyncIterator, List
 
-from sqlalchemy import update, select
+from sqlalchemy import Row, case, insert, update, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 from sqlalchemy_crud_plus import CRUDPlus
 
-from backend.plugin.option.model import APIKey
+from backend.database.db import uuid4_str
+from backend.plugin.option.model import APIKey, Config, ConfigBlob
+from backend.plugin.option.utils.security import key_digest, keys_equal
 from backend.utils.timezone import timezone
 
 
 class CRUDAPIKey(CRUDPlus[APIKey]):
     async def get_by_key(self, db: AsyncSession, key: str) -> APIKey | None:
         """
-        通过 key 获取 API Key
+        通过 key 的摘要获取 API Key，并以常量时间比较确认
 
         :param db:
         :param key:
         :return:
         """
-        return await self.select_model_by_column(db, key=key)
+        api_key = await self.select_model_by_column(db, key_digest=key_digest(key))
+        if api_key and keys_equal(api_key.key, key):
+            return api_key
+        return None
 
     async def get_by_name(self, db: AsyncSession, name: str) -> APIKey | None:
         """
@@ -34,33 +40,120 @@ class CRUDAPIKey(CRUDPlus[APIKey]):
 
     async def create(self, db: AsyncSession, *, key: str, name: str) -> APIKey:
         """
-        创建 API Key
+        创建 API Key，只 flush 以获取主键，由调用方提交事务
 
         :param db:
         :param key:
         :param name:
         :return:
         """
-        api_key = APIKey(key=key, name=name)
+        api_key = APIKey(key=key, key_digest=key_digest(key), name=name)
         db.add(api_key)
-        await db.commit()
-        await db.refresh(api_key)
+        await db.flush()
         return api_key
 
-    async def update_last_used_time(self, db: AsyncSession, key: str) -> int:
+    async def bulk_create(self, db: AsyncSession, items: List[dict]) -> dict[str, int]:
         """
-        更新最后使用时间
+        批量创建 API Key，单条多行 INSERT 完成，由调用方提交事务
 
         :param db:
-        :param key:
+        :param items: 包含 key、name 及可选 status 的字典列表
+        :return: key 到 API Key ID 的映射
+        """
+        if not items:
+            return {}
+        now = timezone.now()
+        await db.execute(
+            insert(self.model),
+            [
+                {
+                    'uuid': uuid4_str(),
+                    'key': item['key'],
+                    'key_digest': key_digest(item['key']),
+                    'name': item['name'],
+                    'status': item.get('status', 1),
+                    'created_time': now,
+                }
+                for item in items
+            ],
+        )
+        return await self.get_ids_by_keys(db, [item['key'] for item in items])
+
+    async def get_ids_by_keys(self, db: AsyncSession, keys: List[str]) -> dict[str, int]:
+        """
+        通过 key 摘要批量获取 API Key ID
+
+        :param db:
+        :param keys:
+        :return: key 到 API Key ID 的映射，不存在的 key 不返回
+        """
+        if not keys:
+            return {}
+        result = await db.execute(
+            select(self.model.key, self.model.id).where(self.model.key_digest.in_([key_digest(key) for key in keys]))
+        )
+        return {key: api_key_id for key, api_key_id in result.all()}
+
+    async def bulk_update(self, db: AsyncSession, items: List[dict]) -> None:
+        """
+        批量按主键更新 API Key 名称和状态，由调用方提交事务
+
+        :param db:
+        :param items: 包含 id、name、status 的字典列表
+        :return:
+        """
+        if items:
+            await db.execute(update(self.model), items)
+
+    async def update_max_config_size(self, db: AsyncSession, api_key_id: int, max_config_size: int | None) -> int:
+        """
+        更新配置大小上限，由调用方提交事务
+
+        :param db:
+        :param api_key_id:
+        :param max_config_size:
+        :return: 更新行数
+        """
+        result = await db.execute(
+            update(self.model).where(self.model.id == api_key_id).values(max_config_size=max_config_size)
+        )
+        return result.rowcount
+
+    async def update_rate_limit(
+        self, db: AsyncSession, api_key_id: int, rate_limit: int | None, rate_burst: int | None
+    ) -> int:
+        """
+        更新限流配额，由调用方提交事务
+
+        :param db:
+        :param api_key_id:
+        :param rate_limit:
+        :param rate_burst:
+        :return: 更新行数
+        """
+        result = await db.execute(
+            update(self.model)
+            .where(self.model.id == api_key_id)
+            .values(rate_limit=rate_limit, rate_burst=rate_burst)
+        )
+        return result.rowcount
+
+    async def bulk_update_last_used_time(self, db: AsyncSession, used_times: dict[int, datetime]) -> int:
+        """
+        批量更新最后使用时间，单条 UPDATE 语句完成，由调用方提交事务
+
+        :param db:
+        :param used_times: API Key ID 到最后使用时间的映射
         :return:
         """
+        if not used_times:
+            return 0
         result = await db.execute(
             update(self.model)
-            .where(self.model.key == key)
-            .values(last_used_time=timezone.now())
+            .where(self.model.id.in_(list(used_times.keys())))
+            .values(last_used_time=case(used_times, value=self.model.id))
+            .execution_options(synchronize_session=False)
         )
-        await db.commit()
         return result.rowcount
 
     async def delete(self, db: AsyncSession, api_key_id: int) -> bool:
@@ -74,7 +167,7 @@ class CRUDAPIKey(CRUDPlus[APIKey]):
         api_key = await self.select_model_by_column(db, id=api_key_id)
         if api_key:
             await db.delete(api_key)
-            await db.commit()
+            await db.flush()
             return True
         return False
 
@@ -88,5 +181,98 @@ class CRUDAPIKey(CRUDPlus[APIKey]):
         result = await db.execute(select(self.model))
         return result.scalars().all()
 
+    async def stream_digests(self, db: AsyncSession, batch: int = 10000) -> AsyncIterator[bytes]:
+        """
+        流式获取全部API Key摘要，服务端游标分批读取
+
+        :param db:
+        :param batch: 每批读取条数
+        :return:
+        """
+        result = await db.stream_scalars(select(self.model.key_digest).execution_options(yield_per=batch))
+        async for digest in result:
+            yield digest
+
+    async def get_digests_by_ids(self, db: AsyncSession, api_key_ids: List[int]) -> List[Row]:
+        """
+        通过ID获取API Key及其摘要
+
+        :param db:
+        :param api_key_ids:
+        :return: (key, key_digest) 列表
+        """
+        if not api_key_ids:
+            return []
+        result = await db.execute(
+            select(self.model.key, self.model.key_digest).where(self.model.id.in_(api_key_ids))
+        )
+        return list(result.all())
+
+    async def stream_with_config(self, db: AsyncSession, batch: int = 1000) -> AsyncIterator[Row]:
+        """
+        流式获取全部API Key及其配置，服务端游标分批读取
+
+        :param db:
+        :param batch: 每批读取条数
+        :return: (key, name, status, created_time, revision, config_data, parent_key)，
+            声明了父 Key 时 config_data 为覆盖层，parent_key 为父配置的 key
+        """
+        parent = aliased(self.model)
+        stmt = (
+            select(
+                self.model.key,
+                self.model.name,
+                self.model.status,
+                self.model.created_time,
+                Config.revision,
+                ConfigBlob.data.label('config_data'),
+                parent.key.label('parent_key'),
+            )
+            .outerjoin(Config, Config.api_key_id == self.model.id)
+            .outerjoin(ConfigBlob, ConfigBlob.content_hash == Config.content_hash)
+            .outerjoin(parent, parent.id == Config.parent_key_id)
+            .order_by(self.model.id)
+            .execution_options(yield_per=batch)
+        )
+        result = await db.stream(stmt)
+        async for row in result:
+            yield row
+
+    async def get_page_with_config(
+        self,
+        db: AsyncSession,
+        *,
+        limit: int,
+        after_id: int | None = None,
+        name: str | None = None,
+        status: int | None = None,
+    ) -> List[Row]:
+        """
+        按主键游标分页获取API Key及其配置摘要，单次联表查询
+
+        :param db:
+        :param limit: 返回条数
+        :param after_id: 游标，返回ID大于该值的记录
+        :param name: 名称模糊匹配
+        :param status: 状态过滤
+        :return: (APIKey, revision, updated_time) 列表
+        """
+        stmt = (
+            select(self.model, Config.revision, Config.updated_time)
+            .outerjoin(Config, Config.api_key_id == self.model.id)
+            .order_by(self.model.id)
+            .limit(limit)
+        )
+        if after_id is not None:
+            stmt = stmt.where(self.model.id > after_id)
+        if name:
+            # 转义用户输入中的通配符，按字面子串匹配
+            pattern = name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            stmt = stmt.where(self.model.name.like(f'%{pattern}%', escape='\\'))
+        if status is not None:
+            stmt = stmt.where(self.model.status == status)
+        result = await db.execute(stmt)
+        return list(result.all())
+
 
 api_key_dao: CRUDAPIKey = CRUDAPIKey(APIKey) 
\ No newline at end of file
@@ -1,11 +1,20 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from sqlalchemy import select
+from sqlalchemy import LargeBinary, Row, case, insert, select, type_coerce, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy_crud_plus import CRUDPlus
-from typing import List
+from typing import Any, AsyncIterator, List
 
+from backend.database.db import uuid4_str
+from backend.plugin.option.model.model_api_key import APIKey
 from backend.plugin.option.model.model_config import Config
+from backend.plugin.option.model.model_config_blob import ConfigBlob
+from backend.plugin.option.crud.crud_config_blob import config_blob_dao
+from backend.plugin.option.crud.crud_config_revision import RevisionData, config_revision_dao, encode_revision
+from backend.plugin.option.utils.content import digest
+from backend.plugin.option.utils.security import key_digest, keys_equal
+from backend.plugin.option.utils.storage import EncodedConfig, encode_config
+from backend.utils.timezone import timezone
 
 
 class CRUDConfig(CRUDPlus[Config]):
@@ -19,9 +28,365 @@ class CRUDConfig(CRUDPlus[Config]):
         """
         return await self.select_model_by_column(db, api_key_id=api_key_id)
 
+    def _select_with_api_key(self, *, with_data: bool = True):
+        """
+        内部方法：构建 API Key 联表配置的查询语句
+
+        :param with_data: 是否加载配置数据列
+        :return:
+        """
+        columns = [
+            APIKey.key,
+            APIKey.id.label('api_key_id'),
+            APIKey.status,
+            APIKey.rate_limit,
+            APIKey.rate_burst,
+            APIKey.max_config_size,
+            self.model.revision,
+            self.model.content_hash,
+            self.model.parent_key_id,
+        ]
+        stmt = select(*columns).select_from(APIKey).outerjoin(self.model, self.model.api_key_id == APIKey.id)
+        if with_data:
+            # 取原始存储值，由调用方决定是否在线程池中解码
+            stmt = stmt.add_columns(
+                type_coerce(ConfigBlob.data, LargeBinary).label('config_data'), ConfigBlob.size.label('config_size')
+            ).outerjoin(ConfigBlob, ConfigBlob.content_hash == self.model.content_hash)
+        return stmt
+
+    async def get_by_api_key(self, db: AsyncSession, key: str, *, with_data: bool = True) -> Row | None:
+        """
+        通过 API Key 摘要单次联表查询 Key 状态及配置，未配置时配置列为 None
+
+        :param db:
+        :param key:
+        :param with_data: 是否加载配置数据列
+        :return: (key, api_key_id, status, rate_limit, rate_burst, max_config_size, revision, content_hash,
+            parent_key_id[, config_data 原始存储值, config_size])
+        """
+        result = await db.execute(
+            self._select_with_api_key(with_data=with_data).where(APIKey.key_digest == key_digest(key))
+        )
+        row = result.first()
+        if row and keys_equal(row.key, key):
+            return row
+        return None
+
+    async def get_by_api_keys(self, db: AsyncSession, keys: List[str]) -> List[Row]:
+        """
+        通过多个 API Key 摘要单次联表查询 Key 状态及配置
+
+        :param db:
+        :param keys:
+        :return: (key, api_key_id, status, rate_limit, rate_burst, max_config_size, revision, content_hash,
+            parent_key_id, config_data 原始存储值, config_size) 列表，不存在的 Key 不返回
+        """
+        if not keys:
+            return []
+        result = await db.execute(
+            self._select_with_api_key().where(APIKey.key_digest.in_([key_digest(key) for key in keys]))
+        )
+        return list(result.all())
+
+    async def get_model_by_api_key(self, db: AsyncSession, key: str, *, for_update: bool = False) -> Row | None:
+        """
+        通过 API Key 摘要单次联表查询 Key 状态及配置对象，用于更新
+
+        :param db:
+        :param key:
+        :param for_update: 是否加行锁，读-改-写时避免并发覆盖
+        :return: (api_key_id, status, Config | None, key, max_config_size, config_data 原始存储值)
+        """
+        stmt = (
+            select(
+                APIKey.id.label('api_key_id'),
+                APIKey.status,
+                self.model,
+                APIKey.key,
+                APIKey.max_config_size,
+                type_coerce(ConfigBlob.data, LargeBinary).label('config_data'),
+            )
+            .select_from(APIKey)
+            .outerjoin(self.model, self.model.api_key_id == APIKey.id)
+            .outerjoin(ConfigBlob, ConfigBlob.content_hash == self.model.content_hash)
+            .where(APIKey.key_digest == key_digest(key))
+        )
+        if for_update:
+            # 只锁 Key 及配置行，内容表按哈希只增不改
+            stmt = stmt.with_for_update(of=[APIKey, self.model])
+        result = await db.execute(stmt)
+        row = result.first()
+        if row and keys_equal(row.key, key):
+            return row
+        return None
+
+    async def get_model_with_data(self, db: AsyncSession, api_key_id: int, *, for_update: bool = False) -> Row | None:
+        """
+        通过 API Key ID 获取配置对象及其数据
+
+        :param db:
+        :param api_key_id:
+        :param for_update: 是否锁定配置行
+        :return: (Config, api_key_id, parent_key_id, revision, content_hash, config_data 原始存储值, config_size)
+        """
+        stmt = (
+            select(
+                self.model,
+                self.model.api_key_id,
+                self.model.parent_key_id,
+                self.model.revision,
+                self.model.content_hash,
+                type_coerce(ConfigBlob.data, LargeBinary).label('config_data'),
+                ConfigBlob.size.label('config_size'),
+            )
+            .join(ConfigBlob, ConfigBlob.content_hash == self.model.content_hash)
+            .where(self.model.api_key_id == api_key_id)
+        )
+        if for_update:
+            stmt = stmt.with_for_update(of=self.model)
+        result = await db.execute(stmt)
+        return result.first()
+
+    async def get_parents(self, db: AsyncSession, parent_key_id: int | None, max_depth: int) -> List[Row]:
+        """
+        沿父配置链逐级向上获取版本信息，不加载配置数据列
+
+        遇到未配置的父 Key 或重复的 Key 时停止，最多返回 max_depth + 1 条，由调用方判断是否超过层数
+
+        :param db:
+        :param parent_key_id: 起始的父配置 API Key ID
+        :param max_depth: 最大层数
+        :return: 由近及远的 (api_key_id, parent_key_id, revision, content_hash) 列表
+        """
+        parents: List[Row] = []
+        visited = set()
+        while parent_key_id is not None and parent_key_id not in visited and len(parents) <= max_depth:
+            visited.add(parent_key_id)
+            result = await db.execute(
+                select(self.model.api_key_id, self.model.parent_key_id, self.model.revision, self.model.content_hash).where(
+                    self.model.api_key_id == parent_key_id
+                )
+            )
+            row = result.first()
+            if row is None:
+                break
+            parents.append(row)
+            parent_key_id = row.parent_key_id
+        return parents
+
+    async def get_child_ids(self, db: AsyncSession, api_key_ids: List[int]) -> List[int]:
+        """
+        获取直接继承指定配置的 API Key ID
+
+        :param db:
+        :param api_key_ids:
+        :return:
+        """
+        if not api_key_ids:
+            return []
+        result = await db.execute(select(self.model.api_key_id).where(self.model.parent_key_id.in_(api_key_ids)))
+        return list(result.scalars().all())
+
+    async def bulk_update_parents(self, db: AsyncSession, parents: dict[int, int | None]) -> int:
+        """
+        批量设置父配置，只修改继承关系不改写覆盖层，单条 UPDATE 语句完成，由调用方提交事务
+
+        :param db:
+        :param parents: API Key ID 到父配置 API Key ID 的映射，值为 None 时解除继承
+        :return: 更新行数
+        """
+        if not parents:
+            return 0
+        result = await db.execute(
+            update(self.model)
+            .where(self.model.api_key_id.in_(list(parents.keys())))
+            .values(parent_key_id=case(parents, value=self.model.api_key_id))
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    @staticmethod
+    async def set_config_data(
+        db: AsyncSession,
+        config: Config,
+        config_data: Any,
+        encoded: EncodedConfig | None = None,
+        previous: Any = None,
+        revision: int | None = None,
+        revision_data: RevisionData | None = None,
+    ) -> bool:
+        """
+        设置配置数据，同步更新内容哈希和版本号并记录历史版本
+
+        内容已存在时只更新配置行的哈希引用，不重复写入内容
+
+        :param db:
+        :param config:
+        :param config_data:
+        :param encoded: 已在线程池中编码的结果，为空时在此编码
+        :param previous: 当前配置数据，用于生成历史版本增量，新建配置时为 None
+        :param revision: 指定新版本号，内容未变化时同样写入该版本；为空时内容变化才加一
+        :param revision_data: 已在线程池中按新版本号生成的历史版本存储值，为空时在此生成
+        :return: 内容是否发生变化
+        """
+        encoded = encoded or encode_config(config_data)
+        body = encoded.body
+        new_hash = digest(body)
+        changed = config.content_hash != new_hash
+        if not changed and revision is None:
+            return False
+        await config_blob_dao.ensure(db, {new_hash: encoded})
+        if revision is not None:
+            config.revision = revision
+        elif config.content_hash:
+            config.revision += 1
+        else:
+            previous = revision_data = None
+        config.content_hash = new_hash
+        if revision_data is None:
+            revision_data = encode_revision(config.revision, previous, config_data, encoded)
+        config_revision_dao.add(
+            db, api_key_id=config.api_key_id, revision=config.revision, data=revision_data, content_hash=new_hash
+        )
+        return changed
+
+    async def create(
+        self, db: AsyncSession, api_key_id: int, config_data: Any, encoded: EncodedConfig | None = None
+    ) -> Config:
+        """
+        创建配置，只 flush 不提交，由调用方提交事务
+
+        :param db:
+        :param api_key_id:
+        :param config_data:
+        :param encoded: 已在线程池中编码的结果
+        :return:
+        """
+        config = Config(api_key_id=api_key_id)
+        await self.set_config_data(db, config, config_data, encoded)
+        db.add(config)
+        await db.flush()
+        return config
+
+    async def bulk_create(
+        self, db: AsyncSession, items: List[tuple[int, Any]], encoded: List[EncodedConfig] | None = None
+    ) -> None:
+        """
+        批量创建配置及首个版本快照，相同内容只写入一次，每张表单条多行 INSERT 完成，由调用方提交事务
+
+        :param db:
+        :param items: (api_key_id, config_data) 列表
+        :param encoded: 已在线程池中编码的结果，与 items 一一对应
+        :return:
+        """
+        if not items:
+            return
+        if encoded is None:
+            encoded = [encode_config(config_data) for _, config_data in items]
+        now = timezone.now()
+        configs = []
+        snapshots = []
+        blobs = {}
+        for (api_key_id, _), item in zip(items, encoded):
+            hash_value = digest(item.body)
+            blobs[hash_value] = item
+            configs.append({
+                'uuid': uuid4_str(),
+                'api_key_id': api_key_id,
+                'revision': 1,
+                'content_hash': hash_value,
+                'created_time': now,
+                'updated_time': now,
+            })
+            snapshots.append({'api_key_id': api_key_id, 'revision': 1, 'data': item.stored, 'content_hash': hash_value})
+        await config_blob_dao.ensure(db, blobs)
+        await db.execute(insert(self.model), configs)
+        await config_revision_dao.bulk_create_snapshots(db, snapshots)
+
+    async def stream_active(self, db: AsyncSession, batch: int = 1000) -> AsyncIterator[Row]:
+        """
+        流式获取全部启用 API Key 的配置，服务端游标分批读取
+
+        :param db:
+        :param batch: 每批读取条数
+        :return: (key_digest, api_key_id, revision, content_hash, parent_key_id, config_data 原始存储值, config_size)
+        """
+        stmt = (
+            select(
+                APIKey.key_digest,
+                self.model.api_key_id,
+                self.model.revision,
+                self.model.content_hash,
+                self.model.parent_key_id,
+                type_coerce(ConfigBlob.data, LargeBinary).label('config_data'),
+                ConfigBlob.size.label('config_size'),
+            )
+            .join(APIKey, APIKey.id == self.model.api_key_id)
+            .join(ConfigBlob, ConfigBlob.content_hash == self.model.content_hash)
+            .where(APIKey.status == 1)
+            .execution_options(yield_per=batch)
+        )
+        result = await db.stream(stmt)
+        async for row in result:
+            yield row
+
+    async def get_states_by_api_key_ids(self, db: AsyncSession, api_key_ids: List[int]) -> dict[int, Row]:
+        """
+        批量获取配置的版本信息，不加载配置数据列
+
+        :param db:
+        :param api_key_ids:
+        :return: API Key ID 到 (id, api_key_id, revision, content_hash) 的映射
+        """
+        if not api_key_ids:
+            return {}
+        result = await db.execute(
+            select(self.model.id, self.model.api_key_id, self.model.revision, self.model.content_hash).where(
+                self.model.api_key_id.in_(api_key_ids)
+            )
+        )
+        return {row.api_key_id: row for row in result.all()}
+
+    async def bulk_update(self, db: AsyncSession, items: List[tuple[Row, Any]]) -> int:
+        """
+        批量按主键更新配置的内容引用，内容变化的配置版本号加一并写入完整快照，由调用方提交事务
+
+        :param db:
+        :param items: (get_states_by_api_key_ids 返回的版本信息, 新配置数据) 列表
+        :return: 内容发生变化的配置数量
+        """
+        now = timezone.now()
+        configs = []
+        snapshots = []
+        blobs = {}
+        for state, config_data in items:
+            encoded = encode_config(config_data)
+            hash_value = digest(encoded.body)
+            if hash_value == state.content_hash:
+                continue
+            blobs[hash_value] = encoded
+            revision = state.revision + 1
+            configs.append({
+                'id': state.id,
+                'revision': revision,
+                'content_hash': hash_value,
+                'updated_time': now,
+            })
+            snapshots.append({
+                'api_key_id': state.api_key_id,
+                'revision': revision,
+                'data': encoded.stored,
+                'content_hash': hash_value,
+            })
+        if configs:
+            await config_blob_dao.ensure(db, blobs)
+            await db.execute(update(self.model), configs)
+            await config_revision_dao.bulk_create_snapshots(db, snapshots)
+        return len(configs)
+
     async def create_or_update(self, db: AsyncSession, api_key_id: int, config_data: dict) -> Config:
         """
-        创建或更新配置
+        创建或更新配置，只 flush 不提交，由调用方提交事务
 
         :param db:
         :param api_key_id:
@@ -30,21 +395,16 @@ class CRUDConfig(CRUDPlus[Config]):
         """
         # 检查是否已存在配置
         existing_config = await self.get_by_api_key_id(db, api_key_id)
-        
+
         if existing_config:
             # 更新现有配置
-            existing_config.config_data = config_data
-            await db.commit()
-            await db.refresh(existing_config)
+            blob = await config_blob_dao.select_model_by_column(db, content_hash=existing_config.content_hash)
+            await self.set_config_data(db, existing_config, config_data, previous=blob.data if blob else None)
+            await db.flush()
             return existing_config
         else:
             # 创建新配置
-            new_config = Config(api_key_id=api_key_id, config_data=config_data)
-            db.add(new_config)
-            await db.commit()
-            await db.refresh(new_config)
-            return new_config
-
+            return await self.create(db, api_key_id, config_data)
 
     async def delete_by_id(self, db: AsyncSession, config_id: int) -> bool:
         """
@@ -57,7 +417,7 @@ class CRUDConfig(CRUDPlus[Config]):
         config = await self.select_model_by_column(db, id=config_id)
         if config:
             await db.delete(config)
-            await db.commit()
+            await db.flush()
             return True
         return False
 
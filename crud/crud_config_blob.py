@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from typing import Dict, List
+
+from sqlalchemy import LargeBinary, Row, delete, exists, insert, select, type_coerce
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy_crud_plus import CRUDPlus
+
+from backend.plugin.option.model.model_config import Config
+from backend.plugin.option.model.model_config_blob import ConfigBlob
+from backend.plugin.option.utils.storage import EncodedConfig
+from backend.utils.timezone import timezone
+
+
+class CRUDConfigBlob(CRUDPlus[ConfigBlob]):
+    async def get_existing(self, db: AsyncSession, content_hashes: List[str], *, lock: bool = False) -> set[str]:
+        """
+        获取已存在的内容哈希
+
+        :param db:
+        :param content_hashes:
+        :param lock: 是否加共享锁，防止事务提交前被并发清理
+        :return:
+        """
+        if not content_hashes:
+            return set()
+        stmt = select(self.model.content_hash).where(self.model.content_hash.in_(content_hashes))
+        if lock:
+            stmt = stmt.with_for_update(read=True)
+        result = await db.execute(stmt)
+        return set(result.scalars().all())
+
+    async def get_data(self, db: AsyncSession, content_hashes: List[str]) -> Dict[str, Row]:
+        """
+        批量获取配置内容的原始存储值
+
+        :param db:
+        :param content_hashes:
+        :return: 内容哈希到 (content_hash, data 原始存储值, size) 的映射
+        """
+        if not content_hashes:
+            return {}
+        result = await db.execute(
+            select(
+                self.model.content_hash, type_coerce(self.model.data, LargeBinary).label('data'), self.model.size
+            ).where(self.model.content_hash.in_(content_hashes))
+        )
+        return {row.content_hash: row for row in result.all()}
+
+    async def ensure(self, db: AsyncSession, blobs: Dict[str, EncodedConfig]) -> int:
+        """
+        确保配置内容已存在，只写入尚不存在的内容，由调用方提交事务
+
+        已存在的内容加共享锁，避免提交前被清理；并发写入相同内容时主键冲突，在保存点内回滚后重新比对
+
+        :param db:
+        :param blobs: 内容哈希到已编码配置的映射
+        :return: 新写入的条数
+        """
+        missing = set(blobs) - await self.get_existing(db, list(blobs), lock=True)
+        if not missing:
+            return 0
+        now = timezone.now()
+        rows = [
+            {
+                'content_hash': content_hash,
+                'data': blobs[content_hash].stored,
+                'size': len(blobs[content_hash].body),
+                'created_time': now,
+            }
+            for content_hash in sorted(missing)
+        ]
+        try:
+            async with db.begin_nested():
+                await db.execute(insert(self.model), rows)
+        except IntegrityError:
+            missing -= await self.get_existing(db, list(missing), lock=True)
+            if not missing:
+                return 0
+            await db.execute(insert(self.model), [row for row in rows if row['content_hash'] in missing])
+        return len(missing)
+
+    async def delete_unreferenced(self, db: AsyncSession, content_hashes: List[str] | None = None) -> int:
+        """
+        删除没有配置引用的内容，由调用方提交事务
+
+        :param db:
+        :param content_hashes: 待检查的内容哈希，为 None 时检查全部
+        :return: 删除的条数
+        """
+        stmt = delete(self.model).where(~exists().where(Config.content_hash == self.model.content_hash))
+        if content_hashes is not None:
+            if not content_hashes:
+                return 0
+            stmt = stmt.where(self.model.content_hash.in_(content_hashes))
+        result = await db.execute(stmt)
+        return result.rowcount
+
+
+config_blob_dao: CRUDConfigBlob = CRUDConfigBlob(ConfigBlob)
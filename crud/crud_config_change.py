@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import Row, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy_crud_plus import CRUDPlus
+
+from backend.plugin.option.model.model_config_change import ConfigChange
+from backend.utils.timezone import timezone
+
+
+class CRUDConfigChange(CRUDPlus[ConfigChange]):
+    async def bulk_create(self, db: AsyncSession, origin: str, api_key_ids: List[int], created: bool = False) -> None:
+        """
+        批量写入变更日志，由调用方提交事务
+
+        :param db:
+        :param origin: 发布变更的 worker 标识
+        :param api_key_ids:
+        :param created: 是否为新建的 Key
+        :return:
+        """
+        if not api_key_ids:
+            return
+        now = timezone.now()
+        await db.execute(
+            insert(self.model),
+            [
+                {'api_key_id': api_key_id, 'origin': origin, 'created': created, 'created_time': now}
+                for api_key_id in api_key_ids
+            ],
+        )
+
+    async def get_max_id(self, db: AsyncSession) -> int:
+        """
+        获取当前全局变更序号
+
+        :param db:
+        :return:
+        """
+        result = await db.execute(select(func.max(self.model.id)))
+        return result.scalar() or 0
+
+    async def get_after(self, db: AsyncSession, after_id: int, limit: int) -> List[Row]:
+        """
+        获取指定序号之后的变更
+
+        :param db:
+        :param after_id:
+        :param limit:
+        :return: (id, api_key_id, origin, created) 列表
+        """
+        result = await db.execute(
+            select(self.model.id, self.model.api_key_id, self.model.origin, self.model.created)
+            .where(self.model.id > after_id)
+            .order_by(self.model.id)
+            .limit(limit)
+        )
+        return list(result.all())
+
+    async def delete_before(self, db: AsyncSession, before: datetime) -> int:
+        """
+        清理过期的变更日志，由调用方提交事务
+
+        :param db:
+        :param before:
+        :return: 删除的行数
+        """
+        result = await db.execute(delete(self.model).where(self.model.created_time < before))
+        return result.rowcount
+
+
+config_change_dao: CRUDConfigChange = CRUDConfigChange(ConfigChange)
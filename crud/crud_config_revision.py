@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from typing import Any, List, NamedTuple
+
+from sqlalchemy import Row, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy_crud_plus import CRUDPlus
+
+from backend.plugin.option.conf import option_settings
+from backend.plugin.option.model.model_config_revision import ConfigRevision
+from backend.plugin.option.utils.content import canonical_json
+from backend.plugin.option.utils.json_patch import diff_json
+from backend.plugin.option.utils.storage import EncodedConfig, StoredConfig, store_body
+from backend.utils.timezone import timezone
+
+
+class RevisionData(NamedTuple):
+    """历史版本的存储值"""
+
+    is_snapshot: bool
+    stored: StoredConfig
+
+
+def encode_revision(revision: int, previous: Any, current: Any, encoded: EncodedConfig) -> RevisionData:
+    """
+    生成历史版本的存储值
+
+    按固定间隔保存完整快照，其余版本只保存相对上一版本的 JSON Patch，增量不小于完整文档时同样保存快照。
+    大文档应在线程池中调用
+
+    :param revision: 新版本号
+    :param previous: 上一版本配置，首个版本为 None
+    :param current: 新版本配置
+    :param encoded: 新版本配置的编码结果
+    :return:
+    """
+    if previous is not None and (revision - 1) % option_settings.REVISION_SNAPSHOT_INTERVAL != 0:
+        delta = canonical_json(diff_json(previous, current))
+        if len(delta) < len(encoded.body):
+            return RevisionData(False, store_body(delta))
+    return RevisionData(True, encoded.stored)
+
+
+class CRUDConfigRevision(CRUDPlus[ConfigRevision]):
+    def add(
+        self,
+        db: AsyncSession,
+        *,
+        api_key_id: int,
+        revision: int,
+        data: RevisionData,
+        content_hash: str,
+    ) -> ConfigRevision:
+        """
+        添加历史版本，由调用方提交事务
+
+        :param db:
+        :param api_key_id:
+        :param revision: 新版本号
+        :param data: encode_revision 生成的存储值
+        :param content_hash: 新版本内容哈希
+        :return:
+        """
+        config_revision = ConfigRevision(
+            api_key_id=api_key_id,
+            revision=revision,
+            is_snapshot=data.is_snapshot,
+            data=data.stored,
+            content_hash=content_hash,
+        )
+        db.add(config_revision)
+        return config_revision
+
+    async def bulk_create_snapshots(self, db: AsyncSession, items: List[dict]) -> None:
+        """
+        批量写入完整快照，单条多行 INSERT 完成，由调用方提交事务
+
+        :param db:
+        :param items: 包含 api_key_id、revision、data、content_hash 的字典列表
+        :return:
+        """
+        if not items:
+            return
+        now = timezone.now()
+        await db.execute(insert(self.model), [dict(item, is_snapshot=True, created_time=now) for item in items])
+
+    async def get_list(
+        self, db: AsyncSession, api_key_id: int, *, limit: int, before: int | None = None
+    ) -> List[Row]:
+        """
+        按版本号倒序获取历史版本摘要，不加载版本数据
+
+        :param db:
+        :param api_key_id:
+        :param limit: 返回条数
+        :param before: 游标，返回版本号小于该值的记录
+        :return: (revision, is_snapshot, content_hash, created_time) 列表
+        """
+        stmt = (
+            select(self.model.revision, self.model.is_snapshot, self.model.content_hash, self.model.created_time)
+            .where(self.model.api_key_id == api_key_id)
+            .order_by(self.model.revision.desc())
+            .limit(limit)
+        )
+        if before is not None:
+            stmt = stmt.where(self.model.revision < before)
+        result = await db.execute(stmt)
+        return list(result.all())
+
+    async def get_chain(self, db: AsyncSession, api_key_id: int, revision: int) -> List[ConfigRevision]:
+        """
+        获取重建指定版本所需的记录：最近的完整快照及其后直到该版本的全部增量
+
+        :param db:
+        :param api_key_id:
+        :param revision: 目标版本号
+        :return: 按版本号升序排列的记录
+        """
+        snapshot = (
+            select(func.max(self.model.revision))
+            .where(
+                self.model.api_key_id == api_key_id,
+                self.model.is_snapshot.is_(True),
+                self.model.revision <= revision,
+            )
+            .scalar_subquery()
+        )
+        stmt = (
+            select(self.model)
+            .where(
+                self.model.api_key_id == api_key_id,
+                self.model.revision <= revision,
+                self.model.revision >= snapshot,
+            )
+            .order_by(self.model.revision)
+        )
+        result = await db.execute(stmt)
+        return list(result.scalars().all())
+
+
+config_revision_dao: CRUDConfigRevision = CRUDConfigRevision(ConfigRevision)
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from backend.database.db import async_engine
+
+# 插件会话使用的引擎：与宿主共用连接池，注册在其上的 SQL 事件监听器只作用于插件会话，不影响宿主应用的其它查询
+option_engine = async_engine.execution_options(option_plugin=True)
+
+async_db_session = async_sessionmaker(bind=option_engine, autoflush=False, expire_on_commit=False)
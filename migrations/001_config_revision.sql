@@ -0,0 +1,9 @@
+-- 配置内容哈希与版本号，用于 ETag / If-None-Match 条件请求
+alter table sys_api_config
+    add column revision     int         not null default 1 comment '配置版本号' after config_data,
+    add column content_hash char(64)    not null default '' comment '配置内容哈希(SHA-256)' after revision;
+
+-- 存量数据的哈希仅作为不透明的版本标识，下次写入时由应用按规范化 JSON 重新计算
+update sys_api_config
+set content_hash = sha2(cast(config_data as char), 256)
+where content_hash = '';
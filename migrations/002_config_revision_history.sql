@@ -0,0 +1,23 @@
+-- 配置历史版本，增量保存并定期保存完整快照
+create table sys_api_config_revision
+(
+    id           int auto_increment comment '主键 ID'
+        primary key,
+    api_key_id   int         not null comment '关联的API Key ID',
+    revision     int         not null comment '配置版本号',
+    is_snapshot  tinyint(1)  not null comment '是否完整快照(0增量 1快照)',
+    data         json        not null comment '完整配置或相对上一版本的 JSON Patch',
+    content_hash char(64)    not null comment '该版本配置内容哈希(SHA-256)',
+    created_time datetime    not null comment '创建时间',
+    constraint uk_api_key_revision
+        unique (api_key_id, revision),
+    constraint sys_api_config_revision_ibfk_1
+        foreign key (api_key_id) references sys_api_key (id)
+            on delete cascade
+)
+    comment '配置历史版本表';
+
+-- 存量配置以当前版本作为首个完整快照
+insert into sys_api_config_revision (api_key_id, revision, is_snapshot, data, content_hash, created_time)
+select api_key_id, revision, 1, config_data, content_hash, coalesce(updated_time, created_time)
+from sys_api_config;
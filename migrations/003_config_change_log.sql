@@ -0,0 +1,13 @@
+-- 配置变更日志，OPTION_BUS_BACKEND=db 时各 worker 轮询该表失效本地缓存
+create table sys_api_config_change
+(
+    id           int auto_increment comment '主键 ID，全局变更序号'
+        primary key,
+    api_key_id   int         not null comment '变更的API Key ID',
+    origin       varchar(32) not null comment '发布变更的 worker 标识',
+    created_time datetime    not null comment '创建时间'
+)
+    comment '配置变更日志表';
+
+create index ix_sys_api_config_change_created_time
+    on sys_api_config_change (created_time);
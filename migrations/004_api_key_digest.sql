@@ -0,0 +1,13 @@
+-- API Key 改为按定长 SHA-256 摘要索引查找
+alter table sys_api_key
+    add column key_digest binary(32) null comment 'API Key的SHA-256摘要' after `key`;
+
+update sys_api_key
+set key_digest = unhex(sha2(`key`, 256))
+where key_digest is null;
+
+alter table sys_api_key
+    modify column key_digest binary(32) not null comment 'API Key的SHA-256摘要',
+    add constraint uk_api_key_digest unique (key_digest),
+    -- 旧的 varchar 唯一索引，若由 ORM 建表则名称为 ix_sys_api_key_key
+    drop index api_key_unique;
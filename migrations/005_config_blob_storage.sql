@@ -0,0 +1,10 @@
+-- 配置数据改为二进制列存储规范化 JSON，大文档 zlib 压缩；已有的 JSON 文本无需转换，读取时兼容
+alter table sys_api_config
+    modify column config_data longblob not null comment '配置数据，规范化 JSON，大文档 zlib 压缩存储';
+
+alter table sys_api_config_revision
+    modify column data longblob not null comment '完整配置或相对上一版本的 JSON Patch，大文档 zlib 压缩存储';
+
+-- 按 Key 设置的配置大小上限
+alter table sys_api_key
+    add column max_config_size int null comment '配置大小上限(字节)，为空时使用全局默认值' after status;
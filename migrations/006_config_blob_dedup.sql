@@ -0,0 +1,21 @@
+-- 配置内容按哈希去重存储，配置表只保存哈希引用
+create table sys_api_config_blob
+(
+    content_hash char(64) not null comment '配置内容哈希(SHA-256)'
+        primary key,
+    data         longblob not null comment '配置数据，规范化 JSON，大文档 zlib 压缩存储',
+    size         int      not null comment '规范化 JSON 的字节数',
+    created_time datetime not null comment '创建时间'
+)
+    comment '配置内容表';
+
+-- 相同哈希只保留一份；存量压缩内容的 size 按存储长度估算，仅用于判断是否在线程池中解析
+insert into sys_api_config_blob (content_hash, data, size, created_time)
+select c.content_hash, c.config_data, length(c.config_data), c.created_time
+from sys_api_config c
+         join (select min(id) as id from sys_api_config group by content_hash) first_config on first_config.id = c.id;
+
+alter table sys_api_config
+    add constraint sys_api_config_blob_fk
+        foreign key (content_hash) references sys_api_config_blob (content_hash),
+    drop column config_data;
@@ -0,0 +1,5 @@
+-- 配置继承：声明父 Key 的配置只存储覆盖层，读取时与父配置深度合并
+alter table sys_api_config
+    add column parent_key_id int null comment '继承的父配置 API Key ID，为空时不继承' after content_hash,
+    add constraint sys_api_config_parent_fk
+        foreign key (parent_key_id) references sys_api_key (id);
@@ -0,0 +1,4 @@
+-- 按 Key 设置的限流配额
+alter table sys_api_key
+    add column rate_limit int null comment '每秒请求数上限，为空时使用全局默认值，0 为不限流' after max_config_size,
+    add column rate_burst int null comment '突发请求数上限，为空时使用全局默认值' after rate_limit;
@@ -0,0 +1,3 @@
+-- 变更日志区分新建的 Key，各 worker 只对其它 worker 新建的 Key 更新 Key 过滤器
+alter table sys_api_config_change
+    add column created tinyint(1) not null default 0 comment '是否为新建的 API Key' after origin;
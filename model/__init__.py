@@ -3,6 +3,9 @@
 
 from backend.plugin.option.model.model_config import Config
 from backend.plugin.option.model.model_api_key import APIKey
+from backend.plugin.option.model.model_config_revision import ConfigRevision
+from backend.plugin.option.model.model_config_change import ConfigChange
+from backend.plugin.option.model.model_config_blob import ConfigBlob
 
-__all__ = ['Config', 'APIKey']
+__all__ = ['Config', 'APIKey', 'ConfigRevision', 'ConfigChange', 'ConfigBlob']
 
@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
 
-from sqlalchemy import String
+from sqlalchemy import BINARY, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from backend.common.model import DataClassBase, id_key
@@ -17,11 +17,19 @@ class APIKey(DataClassBase):
 
     id: Mapped[id_key] = mapped_column(init=False)
     uuid: Mapped[str] = mapped_column(String(50), init=False, default_factory=uuid4_str, unique=True)
-    key: Mapped[str] = mapped_column(String(100), unique=True, index=True, comment='API Key')
+    key: Mapped[str] = mapped_column(String(100), comment='API Key')
+    key_digest: Mapped[bytes] = mapped_column(BINARY(32), unique=True, comment='API Key的SHA-256摘要')
     name: Mapped[str] = mapped_column(String(50), comment='Key名称')
     status: Mapped[int] = mapped_column(default=1, comment='状态(0停用 1正常)')
+    max_config_size: Mapped[int | None] = mapped_column(default=None, comment='配置大小上限(字节)，为空时使用全局默认值')
+    rate_limit: Mapped[int | None] = mapped_column(default=None, comment='每秒请求数上限，为空时使用全局默认值，0 为不限流')
+    rate_burst: Mapped[int | None] = mapped_column(default=None, comment='突发请求数上限，为空时使用全局默认值')
     created_time: Mapped[datetime] = mapped_column(init=False, default_factory=timezone.now, comment='创建时间')
     last_used_time: Mapped[datetime | None] = mapped_column(init=False, onupdate=timezone.now, comment='最后使用时间')
 
     # 关联关系
-    configs = relationship("backend.plugin.option.model.model_config.Config", back_populates="api_key")
\ No newline at end of file
+    configs = relationship(
+        "backend.plugin.option.model.model_config.Config",
+        back_populates="api_key",
+        foreign_keys="backend.plugin.option.model.model_config.Config.api_key_id",
+    )
\ No newline at end of file
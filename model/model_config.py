@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
 
-from sqlalchemy import String, JSON, ForeignKey
+from sqlalchemy import String, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from backend.common.model import DataClassBase, id_key
@@ -18,9 +18,17 @@ class Config(DataClassBase):
     id: Mapped[id_key] = mapped_column(init=False)
     uuid: Mapped[str] = mapped_column(String(50), init=False, default_factory=uuid4_str, unique=True)
     api_key_id: Mapped[int] = mapped_column(ForeignKey("sys_api_key.id"), comment='关联的API Key ID')
-    config_data: Mapped[dict] = mapped_column(JSON, comment='配置数据')
+    revision: Mapped[int] = mapped_column(default=1, comment='配置版本号')
+    content_hash: Mapped[str] = mapped_column(
+        String(64), ForeignKey('sys_api_config_blob.content_hash'), default='', comment='配置内容哈希(SHA-256)，引用配置内容表'
+    )
+    parent_key_id: Mapped[int | None] = mapped_column(
+        ForeignKey('sys_api_key.id'), default=None, comment='继承的父配置 API Key ID，为空时不继承'
+    )
     created_time: Mapped[datetime] = mapped_column(init=False, default_factory=timezone.now, comment='创建时间')
     updated_time: Mapped[datetime] = mapped_column(init=False, default_factory=timezone.now, onupdate=timezone.now, comment='更新时间')
 
     # 关联关系
-    api_key = relationship("backend.plugin.option.model.model_api_key.APIKey", back_populates="configs")
\ No newline at end of file
+    api_key = relationship(
+        "backend.plugin.option.model.model_api_key.APIKey", back_populates="configs", foreign_keys=[api_key_id]
+    )
\ No newline at end of file
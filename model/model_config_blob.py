@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+from sqlalchemy import String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from backend.common.model import DataClassBase
+from backend.plugin.option.utils.storage import ConfigJSON
+from backend.utils.timezone import timezone
+
+
+class ConfigBlob(DataClassBase):
+    """配置内容表，相同内容只存一份，由配置表按内容哈希引用"""
+
+    __tablename__ = 'sys_api_config_blob'
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True, comment='配置内容哈希(SHA-256)')
+    data: Mapped[dict] = mapped_column(ConfigJSON, comment='配置数据，规范化 JSON，大文档 zlib 压缩存储')
+    size: Mapped[int] = mapped_column(comment='规范化 JSON 的字节数')
+    created_time: Mapped[datetime] = mapped_column(init=False, default_factory=timezone.now, comment='创建时间')
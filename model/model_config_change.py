@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+from sqlalchemy import String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from backend.common.model import DataClassBase, id_key
+from backend.utils.timezone import timezone
+
+
+class ConfigChange(DataClassBase):
+    """配置变更日志表，自增主键作为全局变更序号，供多 worker 轮询失效缓存"""
+
+    __tablename__ = 'sys_api_config_change'
+
+    id: Mapped[id_key] = mapped_column(init=False)
+    api_key_id: Mapped[int] = mapped_column(comment='变更的API Key ID')
+    origin: Mapped[str] = mapped_column(String(32), comment='发布变更的 worker 标识')
+    created: Mapped[bool] = mapped_column(default=False, comment='是否为新建的 API Key')
+    created_time: Mapped[datetime] = mapped_column(
+        init=False, default_factory=timezone.now, index=True, comment='创建时间'
+    )
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+from sqlalchemy import ForeignKey, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from backend.common.model import DataClassBase, id_key
+from backend.plugin.option.utils.storage import ConfigJSON
+from backend.utils.timezone import timezone
+
+
+class ConfigRevision(DataClassBase):
+    """配置历史版本表"""
+
+    __tablename__ = 'sys_api_config_revision'
+    __table_args__ = (UniqueConstraint('api_key_id', 'revision', name='uk_api_key_revision'),)
+
+    id: Mapped[id_key] = mapped_column(init=False)
+    api_key_id: Mapped[int] = mapped_column(ForeignKey('sys_api_key.id', ondelete='CASCADE'), comment='关联的API Key ID')
+    revision: Mapped[int] = mapped_column(comment='配置版本号')
+    is_snapshot: Mapped[bool] = mapped_column(comment='是否完整快照(0增量 1快照)')
+    data: Mapped[dict | list] = mapped_column(ConfigJSON, comment='完整配置或相对上一版本的 JSON Patch，大文档 zlib 压缩存储')
+    content_hash: Mapped[str] = mapped_column(String(64), comment='该版本配置内容哈希(SHA-256)')
+    created_time: Mapped[datetime] = mapped_column(init=False, default_factory=timezone.now, comment='创建时间')
@@ -4,36 +4,88 @@ create table sys_api_key
         primary key,
     uuid           varchar(50) not null comment 'UUID',
     `key`          varchar(100) not null comment 'API Key',
+    key_digest     binary(32)   not null comment 'API Key的SHA-256摘要',
     name           varchar(50) not null comment 'Key名称',
     status         tinyint(1)  not null comment '状态(0停用 1正常)',
+    max_config_size int        null comment '配置大小上限(字节)，为空时使用全局默认值',
+    rate_limit     int         null comment '每秒请求数上限，为空时使用全局默认值，0 为不限流',
+    rate_burst     int         null comment '突发请求数上限，为空时使用全局默认值',
     created_time   datetime    not null comment '创建时间',
     last_used_time datetime    null comment '最后使用时间',
     constraint uuid
         unique (uuid),
-    constraint api_key_unique
-        unique (`key`)
+    constraint uk_api_key_digest
+        unique (key_digest)
 )
     comment 'API Key表';
 
 create index ix_sys_api_key_id
     on sys_api_key (id);
 
+create table sys_api_config_blob
+(
+    content_hash char(64)    not null comment '配置内容哈希(SHA-256)'
+        primary key,
+    data         longblob    not null comment '配置数据，规范化 JSON，大文档 zlib 压缩存储',
+    size         int         not null comment '规范化 JSON 的字节数',
+    created_time datetime    not null comment '创建时间'
+)
+    comment '配置内容表';
+
 create table sys_api_config
 (
     id           int auto_increment comment '主键 ID'
         primary key,
     uuid         varchar(50) not null comment 'UUID',
     api_key_id   int         not null comment '关联的API Key ID',
-    config_data  json        not null comment '配置数据',
+    revision     int         not null default 1 comment '配置版本号',
+    content_hash char(64)    not null comment '配置内容哈希(SHA-256)，引用配置内容表',
+    parent_key_id int        null comment '继承的父配置 API Key ID，为空时不继承',
     created_time datetime    not null comment '创建时间',
     updated_time datetime    null comment '更新时间',
     constraint uuid
         unique (uuid),
     constraint sys_api_config_ibfk_1
         foreign key (api_key_id) references sys_api_key (id)
-            on delete cascade
+            on delete cascade,
+    constraint sys_api_config_blob_fk
+        foreign key (content_hash) references sys_api_config_blob (content_hash),
+    constraint sys_api_config_parent_fk
+        foreign key (parent_key_id) references sys_api_key (id)
 )
     comment 'API Key配置表';
 
+create table sys_api_config_revision
+(
+    id           int auto_increment comment '主键 ID'
+        primary key,
+    api_key_id   int         not null comment '关联的API Key ID',
+    revision     int         not null comment '配置版本号',
+    is_snapshot  tinyint(1)  not null comment '是否完整快照(0增量 1快照)',
+    data         longblob    not null comment '完整配置或相对上一版本的 JSON Patch，大文档 zlib 压缩存储',
+    content_hash char(64)    not null comment '该版本配置内容哈希(SHA-256)',
+    created_time datetime    not null comment '创建时间',
+    constraint uk_api_key_revision
+        unique (api_key_id, revision),
+    constraint sys_api_config_revision_ibfk_1
+        foreign key (api_key_id) references sys_api_key (id)
+            on delete cascade
+)
+    comment '配置历史版本表';
+
+create table sys_api_config_change
+(
+    id           int auto_increment comment '主键 ID，全局变更序号'
+        primary key,
+    api_key_id   int         not null comment '变更的API Key ID',
+    origin       varchar(32) not null comment '发布变更的 worker 标识',
+    created      tinyint(1)  not null default 0 comment '是否为新建的 API Key',
+    created_time datetime    not null comment '创建时间'
+)
+    comment '配置变更日志表';
+
+create index ix_sys_api_config_change_created_time
+    on sys_api_config_change (created_time);
+
 INSERT INTO fba.sys_menu (title, name, path, sort, icon, type, component, perms, status, display, cache, link, remark, parent_id, created_time, updated_time)
 VALUES ('配置下发', 'Option', 'option', 7, 'eos-icons:admin', 0, '/plugins/option/views/index', null, 1, 1, 1, '', null, null, now(), null);
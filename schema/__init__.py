@@ -9,7 +9,18 @@ from backend.plugin.option.schema.schema_config import (
     APIKeyInfo,
     ConfigInfo,
     APIKeyOnlyResponse,
-    UpdateConfigRequest
+    UpdateConfigRequest,
+    WatchConfigResponse,
+    BatchConfigRequest,
+    BatchConfigItem,
+    BatchConfigResponse,
+    ConfigRevisionInfo,
+    ConfigRevisionList,
+    BatchSaveConfigRequest,
+    SavedAPIKey,
+    ConfigTransferLine,
+    ImportConfigError,
+    ImportConfigResult
 )
 from backend.plugin.option.schema.schema_api_key import (
     NameRequest,
@@ -25,6 +36,17 @@ __all__ = [
     'ConfigInfo',
     'APIKeyOnlyResponse',
     'UpdateConfigRequest',
+    'WatchConfigResponse',
+    'BatchConfigRequest',
+    'BatchConfigItem',
+    'BatchConfigResponse',
+    'ConfigRevisionInfo',
+    'ConfigRevisionList',
+    'BatchSaveConfigRequest',
+    'SavedAPIKey',
+    'ConfigTransferLine',
+    'ImportConfigError',
+    'ImportConfigResult',
     'NameRequest',
     'APIKeyResponse'
 ]
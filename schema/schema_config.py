@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 from typing import Dict, List, Optional, Any
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 
 
@@ -11,6 +11,17 @@ class ConfigRequest(BaseModel):
     config_data: Any  # 配置数据，允许任意类型
 
 
+class BatchSaveConfigRequest(BaseModel):
+    """批量保存配置请求模型"""
+    configs: List[ConfigRequest]  # 配置列表
+
+
+class SavedAPIKey(BaseModel):
+    """批量保存配置后生成的API Key"""
+    name: str  # API Key的名称
+    api_key: str  # API Key
+
+
 class APIKeyOnlyResponse(BaseModel):
     """只返回API Key的响应模型"""
     api_key: str  # API Key
@@ -21,6 +32,29 @@ class ConfigDataResponse(BaseModel):
     config_data: Any  # 配置数据，允许任意类型
 
 
+class WatchConfigResponse(BaseModel):
+    """长轮询返回的配置数据及版本号"""
+    config_data: Any  # 配置数据，允许任意类型
+    revision: int  # 配置版本号
+
+
+class BatchConfigRequest(BaseModel):
+    """批量获取配置请求模型"""
+    api_keys: List[str]  # API Key 列表
+
+
+class BatchConfigItem(BaseModel):
+    """批量获取配置的单项结果，成功时 error 为空"""
+    config_data: Any = None  # 配置数据，允许任意类型
+    revision: Optional[int] = None  # 配置版本号
+    error: Optional[str] = None  # 错误信息
+
+
+class BatchConfigResponse(BaseModel):
+    """批量获取配置响应模型"""
+    configs: Dict[str, BatchConfigItem]  # API Key 到结果的映射
+
+
 class UpdateConfigRequest(BaseModel):
     """更新配置请求模型"""
     config_data: Any  # 配置数据，允许任意类型
@@ -33,9 +67,51 @@ class ConfigResponse(BaseModel):
     config_data: Any  # 配置数据，允许任意类型
 
 
+class ConfigRevisionInfo(BaseModel):
+    """配置历史版本摘要"""
+    revision: int  # 配置版本号
+    is_snapshot: bool  # 是否完整快照
+    content_hash: str  # 该版本配置内容哈希
+    created_time: datetime
+
+
+class ConfigRevisionList(BaseModel):
+    """配置历史版本列表"""
+    revisions: List[ConfigRevisionInfo]
+    next_cursor: Optional[int] = None  # 下一页游标，为空表示没有更多数据
+
+
+class ConfigTransferLine(BaseModel):
+    """配置导出/导入的单行记录，NDJSON 每行一条"""
+    key: str = Field(min_length=1, max_length=100)  # API Key
+    name: str = Field(min_length=1, max_length=50)  # API Key的名称
+    status: int = 1  # API Key状态
+    config_data: Any = None  # 配置数据，为空表示该 Key 未配置；声明了 parent_key 时为相对父配置的覆盖层
+    parent_key: Optional[str] = Field(None, max_length=100)  # 父配置的 API Key，可出现在文件中的任意位置
+    revision: Optional[int] = None  # 导出时的配置版本号，导入时忽略
+    created_time: Optional[datetime] = None  # 导出时的创建时间，导入时忽略
+
+
+class ImportConfigError(BaseModel):
+    """导入失败的行"""
+    line: int  # 行号，从 1 开始
+    msg: str  # 失败原因
+
+
+class ImportConfigResult(BaseModel):
+    """配置导入结果"""
+    created: int = 0  # 新建的 API Key 数量
+    updated: int = 0  # 配置内容发生变化的数量
+    unchanged: int = 0  # 已存在且内容未变化的数量
+    skipped: int = 0  # skip 模式下跳过的已存在 Key 数量
+    failed: int = 0  # 解析或校验失败的行数
+    errors: List[ImportConfigError] = []  # 失败明细，最多保留前若干条
+
+
 class APIKeyInfo(BaseModel):
     key: str
     name: str
+    status: Optional[int] = None
     created_time: datetime
     last_used_time: Optional[datetime] = None
 
@@ -43,8 +119,11 @@ class APIKeyInfo(BaseModel):
 class ConfigInfo(BaseModel):
     api_key_id: int
     api_key: APIKeyInfo
+    revision: Optional[int] = None  # 配置版本号，未配置时为空
+    updated_time: Optional[datetime] = None
 
 
 class SysConfigInfo(BaseModel):
     configs: List[ConfigInfo]
+    next_cursor: Optional[int] = None  # 下一页游标，为空表示没有更多数据
     model_config = ConfigDict(from_attributes=True)
@@ -5,8 +5,9 @@ import re
 
 from backend.common.exception import errors
 from backend.plugin.option.crud.crud_api_key import api_key_dao
-from backend.database.db import async_db_session
+from backend.plugin.option.database import async_db_session
 from backend.plugin.option.schema.schema_api_key import NameRequest
+from backend.plugin.option.service.usage_service import usage_service
 
 
 class APIKeyService:
@@ -38,6 +39,7 @@ class APIKeyService:
 
             # 创建API Key记录
             await api_key_dao.create(db, key=api_key, name=obj.name)
+            await db.commit()
             return api_key
 
     @staticmethod
@@ -65,8 +67,8 @@ class APIKeyService:
             if not key_record or not key_record.status:
                 return False
 
-            # 更新最后使用时间
-            await api_key_dao.update_last_used_time(db, api_key)
+            # 记录使用时间，由后台任务批量回写
+            usage_service.touch(key_record.id)
             return True
 
 
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import uuid
+
+from datetime import timedelta
+from typing import Any, Callable, List
+
+from backend.common.log import log
+from backend.plugin.option.database import async_db_session
+from backend.plugin.option.conf import option_settings
+from backend.plugin.option.crud.crud_config_change import config_change_dao
+from backend.plugin.option.utils.cache import config_cache
+from backend.plugin.option.utils.tasks import create_background_task
+from backend.utils.timezone import timezone
+
+# 变更处理函数，参数为 API Key ID 列表，为 None 表示可能遗漏了变更，需要全部失效
+ChangeHandler = Callable[[List[int] | None], None]
+# 后端收到其它 worker 的变更时调用，参数为 (发布者标识, API Key ID 列表, 是否为新建的 Key)
+ReceiveCallback = Callable[[str, List[int], bool], None]
+
+
+class ConfigBusBackend:
+    """配置变更广播后端"""
+
+    async def publish(self, origin: str, api_key_ids: List[int], created: bool) -> None:
+        """
+        广播变更
+
+        :param origin: 发布变更的 worker 标识
+        :param api_key_ids: API Key ID 列表
+        :param created: 是否为新建的 Key
+        :return:
+        """
+        raise NotImplementedError
+
+    async def listen(self, on_receive: ReceiveCallback) -> None:
+        """
+        持续接收变更直到被取消，连接异常时直接抛出，由调用方重连
+
+        :param on_receive: 收到变更时的回调
+        :return:
+        """
+        raise NotImplementedError
+
+
+class RedisConfigBusBackend(ConfigBusBackend):
+    """Redis 发布/订阅后端，client 需提供 redis.asyncio.Redis 的 publish 与 pubsub 接口"""
+
+    def __init__(self, client: Any, channel: str) -> None:
+        self.client = client
+        self.channel = channel
+
+    async def publish(self, origin: str, api_key_ids: List[int], created: bool) -> None:
+        await self.client.publish(
+            self.channel, json.dumps({'origin': origin, 'ids': api_key_ids, 'created': created})
+        )
+
+    async def listen(self, on_receive: ReceiveCallback) -> None:
+        pubsub = self.client.pubsub()
+        try:
+            await pubsub.subscribe(self.channel)
+            async for message in pubsub.listen():
+                if message['type'] != 'message':
+                    continue
+                try:
+                    payload = json.loads(message['data'])
+                    on_receive(payload['origin'], [int(i) for i in payload['ids']], bool(payload.get('created')))
+                except (TypeError, ValueError, KeyError):
+                    continue
+        finally:
+            await pubsub.reset()
+
+
+class DBPollingConfigBusBackend(ConfigBusBackend):
+    """
+    数据库轮询后端，变更写入变更日志表，各 worker 按全局变更序号增量拉取
+
+    自增序号在插入时分配，序号较小的事务可能晚于较大的提交；每次轮询从游标之前 lookback 个序号开始读取，
+    并按序号去重，晚提交的变更在下一次轮询时补上
+    """
+
+    def __init__(self, *, interval: float, batch: int, lookback: int, retention: int) -> None:
+        self.interval = interval
+        self.batch = batch
+        self.lookback = lookback
+        self.retention = retention
+
+    async def publish(self, origin: str, api_key_ids: List[int], created: bool) -> None:
+        async with async_db_session.begin() as db:
+            await config_change_dao.bulk_create(db, origin, api_key_ids, created)
+
+    async def listen(self, on_receive: ReceiveCallback) -> None:
+        async with async_db_session() as db:
+            last_id = await config_change_dao.get_max_id(db)
+            # 启动前已提交的变更不再处理，只记录回看窗口内已见过的序号
+            seen = {row.id for row in await config_change_dao.get_after(db, last_id - self.lookback, self.lookback)}
+        polls = 0
+        while True:
+            await asyncio.sleep(self.interval)
+            async with async_db_session() as db:
+                rows = await config_change_dao.get_after(db, last_id - self.lookback, self.batch + len(seen))
+            for row in rows:
+                if row.id in seen:
+                    continue
+                seen.add(row.id)
+                on_receive(row.origin, [row.api_key_id], row.created)
+            if rows:
+                last_id = max(last_id, rows[-1].id)
+                seen = {change_id for change_id in seen if change_id > last_id - self.lookback}
+            polls += 1
+            if polls * self.interval >= self.retention / 10:
+                polls = 0
+                await self._cleanup()
+
+    async def _cleanup(self) -> None:
+        """内部方法：清理超过保留时长的变更日志"""
+        async with async_db_session.begin() as db:
+            await config_change_dao.delete_before(db, timezone.now() - timedelta(seconds=self.retention))
+
+
+class ConfigBus:
+    """
+    配置变更总线
+
+    写路径提交后发布变更，本进程内的处理函数立即执行，再由后端广播到其它 worker；
+    新建 Key 的变更另外分发给只关心其它 worker 新建 Key 的处理函数（本进程新建的 Key 由写路径直接处理）；
+    后端连接中断后重连时按全部变更处理，保证各 worker 在有限时间内收敛
+    """
+
+    def __init__(self, backend: ConfigBusBackend | None) -> None:
+        self.backend = backend
+        self.origin = uuid.uuid4().hex
+        self._handlers: List[ChangeHandler] = []
+        self._created_handlers: List[ChangeHandler] = []
+        self._listener: asyncio.Task | None = None
+
+    def subscribe(self, handler: ChangeHandler) -> None:
+        """
+        注册变更处理函数
+
+        :param handler:
+        :return:
+        """
+        self._handlers.append(handler)
+
+    def subscribe_created(self, handler: ChangeHandler) -> None:
+        """
+        注册其它 worker 新建 Key 的处理函数，后端重连时同样以 None 调用
+
+        :param handler:
+        :return:
+        """
+        self._created_handlers.append(handler)
+
+    def start(self) -> None:
+        """启动后台接收任务，重复调用无副作用"""
+        if self.backend is None:
+            return
+        if self._listener is None or self._listener.done():
+            self._listener = create_background_task(self._run())
+
+    async def publish(self, *api_key_ids: int, created: bool = False) -> None:
+        """
+        发布配置变更
+
+        :param api_key_ids: API Key ID
+        :param created: 是否为新建的 Key，发布方需自行登记到 Key 过滤器
+        :return:
+        """
+        ids = list(api_key_ids)
+        self._dispatch(self._handlers, ids)
+        if self.backend is None:
+            return
+        self.start()
+        try:
+            await self.backend.publish(self.origin, ids, created)
+        except Exception as e:
+            log.warning(f'配置变更广播失败: {e}')
+
+    @staticmethod
+    def _dispatch(handlers: List[ChangeHandler], api_key_ids: List[int] | None) -> None:
+        """内部方法：依次调用变更处理函数"""
+        for handler in handlers:
+            try:
+                handler(api_key_ids)
+            except Exception as e:
+                log.warning(f'配置变更处理失败: {e}')
+
+    def _on_receive(self, origin: str, api_key_ids: List[int], created: bool) -> None:
+        """内部方法：忽略本进程发布的变更"""
+        if origin == self.origin:
+            return
+        self._dispatch(self._handlers, api_key_ids)
+        if created:
+            self._dispatch(self._created_handlers, api_key_ids)
+
+    async def _run(self) -> None:
+        """内部方法：后台接收变更，异常时全部失效并重连"""
+        while True:
+            try:
+                await self.backend.listen(self._on_receive)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning(f'配置变更订阅异常: {e}')
+            self._dispatch(self._handlers, None)
+            self._dispatch(self._created_handlers, None)
+            await asyncio.sleep(1)
+
+    async def shutdown(self) -> None:
+        """停止后台接收任务"""
+        listener, self._listener = self._listener, None
+        if listener is not None and not listener.done():
+            listener.cancel()
+            try:
+                await listener
+            except asyncio.CancelledError:
+                pass
+
+
+def _build_backend() -> ConfigBusBackend | None:
+    """内部方法：按配置创建广播后端"""
+    if option_settings.BUS_BACKEND == 'redis':
+        from backend.database.redis import redis_client
+
+        return RedisConfigBusBackend(redis_client, option_settings.BUS_CHANNEL)
+    if option_settings.BUS_BACKEND == 'db':
+        return DBPollingConfigBusBackend(
+            interval=option_settings.BUS_POLL_INTERVAL,
+            batch=option_settings.BUS_POLL_BATCH,
+            lookback=option_settings.BUS_POLL_LOOKBACK,
+            retention=option_settings.BUS_RETENTION,
+        )
+    return None
+
+
+config_bus: ConfigBus = ConfigBus(_build_backend())
+config_bus.subscribe(config_cache.invalidate_ids)
@@ -1,13 +1,42 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import asyncio
+
 from typing import Dict, List, Tuple, Any, Callable, TypeVar
 from functools import wraps
 
+from starlette.concurrency import run_in_threadpool
+
 from backend.common.exception import errors
+from backend.common.log import log
+from backend.plugin.option.conf import option_settings
 from backend.plugin.option.crud.crud_config import config_dao
 from backend.plugin.option.crud.crud_api_key import api_key_dao
+from backend.plugin.option.crud.crud_config_blob import config_blob_dao
+from backend.plugin.option.crud.crud_config_revision import RevisionData, encode_revision
 from backend.plugin.option.service.api_key_service import APIKeyService
-from backend.database.db import async_db_session
+from backend.plugin.option.service.bus_service import config_bus
+from backend.plugin.option.service.inherit_service import config_inherit_service
+from backend.plugin.option.service.key_filter_service import key_filter_service
+from backend.plugin.option.service.metrics_service import metrics_service
+from backend.plugin.option.service.profile_service import profile_service
+from backend.plugin.option.service.rate_limit_service import RateLimitScope, rate_limit_service
+from backend.plugin.option.service.snapshot_service import DB_UNAVAILABLE_ERRORS, snapshot_service
+from backend.plugin.option.service.usage_service import usage_service
+from backend.plugin.option.service.watch_service import watch_service
+from backend.plugin.option.utils.cache import ConfigEntry, config_cache, document_cache
+from backend.plugin.option.utils.content import digest, etag_matches, make_etag
+from backend.plugin.option.utils.encoding import IDENTITY, negotiate_encoding
+from backend.plugin.option.utils.json_patch import (
+    JsonPatchError,
+    JsonPatchTestFailed,
+    apply_json_patch,
+    diff_merge_patch,
+    merge_patch,
+)
+from backend.plugin.option.utils.storage import EncodedConfig, decode_config, encode_config
+from backend.plugin.option.utils.json_pointer import JsonPointerError, JsonPointerNotFound, resolve_pointer
+from backend.plugin.option.database import async_db_session
 
 # 定义类型变量用于装饰器
 T = TypeVar('T')
@@ -26,24 +55,41 @@ def db_transaction(func: Callable[..., T]) -> Callable[..., T]:
                 result = await func(*args, **kwargs)
                 return result
             except errors.NotFoundError:
-                await db.rollback()
+                with profile_service.stage('rollback'):
+                    await db.rollback()
+                metrics_service.rollbacks.inc('NotFoundError')
                 raise
             except Exception as e:
-                await db.rollback()
-                # 如果是自定义错误，直接抛出
-                if isinstance(e, errors.CustomError):
+                with profile_service.stage('rollback'):
+                    await db.rollback()
+                metrics_service.rollbacks.inc(type(e).__name__)
+                # 业务异常（RequestError、ConflictError 等）及 HTTP 错误保留原状态码和消息直接抛出
+                if isinstance(e, (errors.BaseExceptionMixin, errors.HTTPError)):
                     raise
                 # 否则包装为 ForbiddenError
                 raise errors.ForbiddenError(msg=f'操作失败: {str(e)}')
     return wrapper
 
 
+def db_readonly(func: Callable[..., T]) -> Callable[..., T]:
+    """
+    只读数据库会话装饰器，不做提交和回滚处理，会话关闭时自动释放连接
+    """
+    @wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        async with async_db_session() as db:
+            kwargs['db'] = db
+            return await func(*args, **kwargs)
+    return wrapper
+
+
+@metrics_service.instrument_class
 class ConfigService:
     @staticmethod
     @db_transaction
     async def save_config(*, db: Any, name: str, config_data: Any) -> Tuple[str, Any]:
         """
-        保存配置并生成API Key
+        保存配置并生成API Key，API Key 与配置在同一事务中提交
 
         :param db: 数据库会话
         :param name: API Key名称
@@ -58,71 +104,676 @@ class ConfigService:
         if not api_key_record:
             raise errors.ForbiddenError(msg='API Key创建失败')
 
-        # 保存配置
-        config = await config_dao.create_or_update(db, api_key_record.id, config_data)
+        # 保存配置，序列化及压缩在线程池中执行
+        encoded = await ConfigService._encode_config(config_data, option_settings.CONFIG_MAX_SIZE)
+        config = await config_dao.create(db, api_key_record.id, config_data, encoded)
         if not config:
             raise errors.ForbiddenError(msg='配置保存失败')
 
-        return api_key, config.config_data
+        with profile_service.stage('commit'):
+            await db.commit()
+        key_filter_service.add(api_key)
+        await config_bus.publish(api_key_record.id, created=True)
+        return api_key, config_data
 
     @staticmethod
     @db_transaction
-    async def get_config(*, db: Any, api_key: str) -> Any:
+    async def save_configs(*, db: Any, items: List[Tuple[str, Any]]) -> List[Tuple[str, str]]:
         """
-        获取配置
+        批量保存配置并生成API Key，全部成功或全部回滚
+
+        每个配置与 save-config 同样受默认配置大小上限约束，序列化及压缩在一次线程池调用中完成
 
         :param db: 数据库会话
+        :param items: (API Key名称, 配置数据) 列表
+        :return: (API Key名称, API Key) 列表，与输入顺序一致
+        """
+        if len(items) > option_settings.BATCH_MAX_SAVE:
+            raise errors.RequestError(msg=f'单次最多保存 {option_settings.BATCH_MAX_SAVE} 个配置')
+
+        def encode_all() -> List[EncodedConfig]:
+            return [
+                ConfigService._check_size(encode_config(config_data), option_settings.CONFIG_MAX_SIZE)
+                for _, config_data in items
+            ]
+
+        encoded = await run_in_threadpool(encode_all)
+        keys = [(APIKeyService.generate_api_key(), name) for name, _ in items]
+        key_ids = await api_key_dao.bulk_create(db, [{'key': api_key, 'name': name} for api_key, name in keys])
+        if len(key_ids) != len(keys):
+            raise errors.ForbiddenError(msg='API Key创建失败')
+
+        await config_dao.bulk_create(
+            db, [(key_ids[api_key], config_data) for (api_key, _), (_, config_data) in zip(keys, items)], encoded
+        )
+        with profile_service.stage('commit'):
+            await db.commit()
+        for api_key, _ in keys:
+            key_filter_service.add(api_key)
+        await config_bus.publish(*key_ids.values(), created=True)
+        return [(name, api_key) for api_key, name in keys]
+
+    @staticmethod
+    async def get_config(*, api_key: str, if_none_match: str | None = None) -> ConfigEntry:
+        """
+        获取配置，优先读取进程内缓存
+
+        携带 If-None-Match 且缓存未命中时，先只加载元数据并写入缓存，ETag 命中则不加载配置数据，
+        之后的条件请求直接由缓存应答，需要配置数据时再加载完整条目替换；
+        快照模式为 serve 时只读快照，为 fallback 时数据库不可用改由快照应答
+
         :param api_key: API Key
-        :return: 配置数据
+        :param if_none_match: If-None-Match 请求头
+        :return: 配置缓存条目，条件请求命中时 config_data 可能未加载
         """
-        # 验证API Key
-        key_record = await APIKeyService.get_api_key_record(db, api_key)
-        if not key_record:
-            raise errors.ForbiddenError(msg='无效的API Key')
-        if not key_record.status:
+        if snapshot_service.serving:
+            return ConfigService._get_snapshot_config(api_key)
+        config_bus.start()
+        with profile_service.stage('cache'):
+            entry = config_cache.get(api_key)
+        if entry is None:
+            with profile_service.stage('key-filter'):
+                might_exist = key_filter_service.might_exist(api_key)
+            if not might_exist:
+                raise errors.ForbiddenError(msg='无效的API Key')
+        try:
+            if entry is None and if_none_match:
+                generation = config_cache.generation
+                with profile_service.stage('load-meta'):
+                    entry = await ConfigService._load_config_meta(api_key=api_key)
+                config_cache.set(api_key, entry, generation=generation)
+            if entry is None or not (entry.loaded or (entry.status and etag_matches(if_none_match, entry.etag))):
+                generation = config_cache.generation
+                with profile_service.stage('load'):
+                    entry = await ConfigService._load_config_entry(api_key=api_key)
+                config_cache.set(api_key, entry, generation=generation)
+        except DB_UNAVAILABLE_ERRORS as e:
+            # 数据库不可用时由快照应答，不写入缓存，恢复后重新读库
+            with profile_service.stage('snapshot'):
+                return snapshot_service.fallback(api_key, e)
+
+        if not entry.status:
             raise errors.ForbiddenError(msg='API Key已被禁用')
 
-        # 获取配置
-        config = await config_dao.get_by_api_key_id(db, key_record.id)
-        if not config:
+        # 记录使用时间，由后台任务批量回写
+        with profile_service.stage('usage'):
+            usage_service.touch(entry.api_key_id)
+        return entry
+
+    @staticmethod
+    async def check_rate_limit(*, api_key: str, scope: RateLimitScope, client_ip: str | None = None) -> None:
+        """
+        按 API Key 的配额限流，超过配额时返回 429
+
+        缓存未命中时先经 Key 过滤器校验，再只加载元数据写入缓存，写接口及只发条件请求的 Key 同样按自身配额限流；
+        无效或已停用的 Key 不分配令牌桶，由后续校验拒绝，避免大量无效 Key 挤掉有效 Key 的令牌桶
+
+        :param api_key: API Key
+        :param scope: read 为读取配置，write 为更新配置
+        :param client_ip: 客户端 IP
+        :return:
+        """
+        if not rate_limit_service.enabled:
+            return
+        entry = config_cache.peek(api_key)
+        if entry is None:
+            try:
+                with profile_service.stage('load-meta'):
+                    entry = await ConfigService._load_cached_meta(api_key=api_key)
+            except errors.ForbiddenError:
+                return
+            except DB_UNAVAILABLE_ERRORS:
+                # 数据库不可用时按全局默认配额限流
+                entry = None
+        if entry is not None and not entry.status:
+            return
+        await rate_limit_service.check(api_key, scope, client_ip, entry=entry)
+
+    @staticmethod
+    async def _load_cached_meta(*, api_key: str) -> ConfigEntry:
+        """
+        内部方法：缓存未命中时只加载元数据并写入缓存
+
+        :param api_key: API Key
+        :return: 只读快照模式下为快照中的完整条目
+        """
+        if snapshot_service.serving:
+            return ConfigService._get_snapshot_config(api_key)
+        config_bus.start()
+        if not key_filter_service.might_exist(api_key):
+            raise errors.ForbiddenError(msg='无效的API Key')
+        generation = config_cache.generation
+        entry = await ConfigService._load_config_meta(api_key=api_key)
+        config_cache.set(api_key, entry, generation=generation)
+        return entry
+
+    @staticmethod
+    def _get_snapshot_config(api_key: str) -> ConfigEntry:
+        """
+        内部方法：只读快照模式下由快照应答，不访问数据库
+
+        :param api_key: API Key
+        :return: 配置缓存条目
+        """
+        # 缓存条目来自快照，先检查快照文件是否已重新编译，否则命中缓存的 Key 在缓存过期前一直读到旧快照
+        snapshot_service.refresh()
+        entry = config_cache.get(api_key)
+        if entry is None or not entry.loaded:
+            with profile_service.stage('snapshot'):
+                entry = snapshot_service.lookup(api_key)
+            if entry is None:
+                raise errors.ForbiddenError(msg='无效的API Key')
+            config_cache.set(api_key, entry)
+        return entry
+
+    @staticmethod
+    async def render_config(entry: ConfigEntry, accept_encoding: str | None = None) -> Tuple[bytes, str]:
+        """
+        获取预序列化、按 Accept-Encoding 预压缩的 get-config 响应体
+
+        序列化及压缩结果随缓存条目保存，同一版本只计算一次；大文档在线程池中处理，避免阻塞事件循环
+
+        :param entry: 配置缓存条目
+        :param accept_encoding: Accept-Encoding 请求头
+        :return: (响应体, 压缩编码)
+        """
+        encoded = entry.get_encoded(IDENTITY)
+        if encoded is None:
+            with profile_service.stage('serialize'):
+                encoded = await run_in_threadpool(lambda: entry.body)
+        metrics_service.config_bytes.observe(len(encoded), 'read')
+        encoding = negotiate_encoding(accept_encoding, len(encoded))
+        if encoding == IDENTITY:
+            return encoded, encoding
+        encoded = entry.get_encoded(encoding)
+        if encoded is None:
+            with profile_service.stage('compress'):
+                encoded = await run_in_threadpool(entry.encode, encoding)
+        return encoded, encoding
+
+    @staticmethod
+    def project_config(config_data: Any, pointers: List[str]) -> Any:
+        """
+        按 JSON Pointer 提取配置片段
+
+        :param config_data: 已解析的配置数据
+        :param pointers: JSON Pointer 列表
+        :return: 单个指针时返回该片段，多个指针时返回指针到片段的映射
+        """
+        fragments = {}
+        for pointer in pointers:
+            try:
+                fragments[pointer] = resolve_pointer(config_data, pointer)
+            except JsonPointerError as e:
+                raise errors.RequestError(msg=str(e))
+            except JsonPointerNotFound:
+                raise errors.NotFoundError(msg=f'配置中不存在路径: {pointer}')
+        if len(pointers) == 1:
+            return fragments[pointers[0]]
+        return fragments
+
+    @staticmethod
+    async def watch_config(*, api_key: str, revision: int, timeout: float | None = None) -> ConfigEntry | None:
+        """
+        长轮询等待配置变更
+
+        :param api_key: API Key
+        :param revision: 客户端当前的配置版本号
+        :param timeout: 最长等待秒数
+        :return: 版本号不同时返回最新配置，超时返回 None
+        """
+        timeout = min(timeout or option_settings.WATCH_TIMEOUT, option_settings.WATCH_MAX_TIMEOUT)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        # 注册等待者需要 API Key ID，缓存中有该 Key 时直接取用，每轮只读取一次配置；
+        # 未命中时先读取一次，之后的读取命中缓存
+        entry = config_cache.peek(api_key)
+        if entry is None:
+            entry = await ConfigService.get_config(api_key=api_key)
+        while True:
+            # 先注册等待者再比对版本号，避免比对与等待之间的变更被遗漏
+            async with watch_service.watch(entry.api_key_id) as changed:
+                entry = await ConfigService.get_config(api_key=api_key)
+                if entry.revision != revision:
+                    return entry
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return None
+                done, _ = await asyncio.wait({changed}, timeout=remaining)
+                if not done:
+                    return None
+
+    @staticmethod
+    @db_readonly
+    async def _load_config_meta(*, db: Any, api_key: str) -> ConfigEntry:
+        """
+        内部方法：只加载 API Key 状态及配置内容哈希
+
+        :param db: 数据库会话
+        :param api_key: API Key
+        :return: 不含配置数据的缓存条目
+        """
+        row = await config_dao.get_by_api_key(db, api_key, with_data=False)
+        if not row:
+            key_filter_service.mark_invalid(api_key)
+            raise errors.ForbiddenError(msg='无效的API Key')
+        if not row.status:
+            # 已停用的 Key 不含配置数据，与完整条目相同
+            return ConfigEntry(api_key_id=row.api_key_id, status=row.status)
+        if not row.content_hash:
+            return ConfigEntry(
+                api_key_id=row.api_key_id,
+                status=row.status,
+                revision=row.revision or 0,
+                rate_limit=row.rate_limit,
+                rate_burst=row.rate_burst,
+                max_config_size=row.max_config_size,
+                loaded=False,
+            )
+        resolution_key, revision = await config_inherit_service.resolve_meta(db, row)
+        return ConfigEntry(
+            api_key_id=row.api_key_id,
+            status=row.status,
+            revision=revision,
+            etag=make_etag(resolution_key),
+            rate_limit=row.rate_limit,
+            rate_burst=row.rate_burst,
+            max_config_size=row.max_config_size,
+            loaded=False,
+        )
+
+    @staticmethod
+    async def _build_entry(db: Any, row: Any) -> ConfigEntry | None:
+        """
+        内部方法：由联表查询行构建配置缓存条目
+
+        相同内容的 Key 共享按内容哈希缓存的已解析文档及响应体，声明了父 Key 的配置合并父配置后返回；
+        大文档在线程池中解压和解析，避免阻塞事件循环
+
+        :param db: 数据库会话，解析继承配置时加载父配置
+        :param row: config_dao.get_by_api_key 返回的查询行
+        :return: 配置缓存条目，Key 正常但未配置时返回 None
+        """
+        if not row.status:
+            return ConfigEntry(api_key_id=row.api_key_id, status=row.status)
+        if row.revision is None:
+            return None
+        document, resolution_key, revision = await config_inherit_service.resolve(db, row)
+        return ConfigEntry.from_document(
+            document,
+            api_key_id=row.api_key_id,
+            status=row.status,
+            revision=revision,
+            etag=make_etag(resolution_key),
+            rate_limit=row.rate_limit,
+            rate_burst=row.rate_burst,
+            max_config_size=row.max_config_size,
+        )
+
+    @staticmethod
+    @db_readonly
+    async def _load_config_entry(*, db: Any, api_key: str) -> ConfigEntry:
+        """
+        内部方法：单次联表查询加载 API Key 状态及配置数据
+
+        :param db: 数据库会话
+        :param api_key: API Key
+        :return: 配置缓存条目
+        """
+        row = await config_dao.get_by_api_key(db, api_key)
+        if not row:
+            key_filter_service.mark_invalid(api_key)
+            raise errors.ForbiddenError(msg='无效的API Key')
+        entry = await ConfigService._build_entry(db, row)
+        if entry is None:
             raise errors.NotFoundError(msg='未找到配置数据')
+        return entry
+
+    @staticmethod
+    async def get_configs(*, api_keys: List[str], client_ip: str | None = None) -> Dict[str, ConfigEntry | str]:
+        """
+        批量获取配置，缓存未命中的 Key 通过一次 IN 联表查询加载
+
+        每个有效 Key 按自身读取配额各取一个令牌，超过配额的 Key 单独返回错误信息；
+        限流只在加载之后进行，未命中的 Key 一次加载后写入缓存，之后超过配额的请求不再访问数据库
+
+        :param api_keys: API Key 列表
+        :param client_ip: 客户端 IP
+        :return: API Key 到配置缓存条目或错误信息的映射
+        """
+        api_keys = list(dict.fromkeys(api_keys))
+        if len(api_keys) > option_settings.BATCH_MAX_KEYS:
+            raise errors.RequestError(msg=f'单次最多获取 {option_settings.BATCH_MAX_KEYS} 个配置')
+
+        config_bus.start()
+        results: Dict[str, ConfigEntry | str] = {}
+        missing = []
+        for api_key in api_keys:
+            entry = config_cache.get(api_key)
+            if entry is not None and entry.loaded:
+                results[api_key] = entry
+            elif entry is not None or key_filter_service.might_exist(api_key):
+                missing.append(api_key)
+            else:
+                results[api_key] = '无效的API Key'
+
+        if missing:
+            generation = config_cache.generation
+            entries = await ConfigService._load_config_entries(api_keys=missing)
+            for api_key in missing:
+                if api_key not in entries:
+                    key_filter_service.mark_invalid(api_key)
+                    results[api_key] = '无效的API Key'
+                    continue
+                entry = entries[api_key]
+                if entry is None:
+                    results[api_key] = '未找到配置数据'
+                    continue
+                config_cache.set(api_key, entry, generation=generation)
+                results[api_key] = entry
+
+        allowed = []
+        for api_key, entry in results.items():
+            if isinstance(entry, str):
+                continue
+            if not entry.status:
+                results[api_key] = 'API Key已被禁用'
+                continue
+            allowed.append(api_key)
+        outcomes = await asyncio.gather(
+            *(rate_limit_service.check(api_key, 'read', client_ip, entry=results[api_key]) for api_key in allowed),
+            return_exceptions=True,
+        )
+        for api_key, outcome in zip(allowed, outcomes):
+            if isinstance(outcome, errors.HTTPError):
+                results[api_key] = outcome.detail
+                continue
+            if isinstance(outcome, BaseException):
+                raise outcome
+            usage_service.touch(results[api_key].api_key_id)
+        return {api_key: results[api_key] for api_key in api_keys}
+
+    @staticmethod
+    @db_readonly
+    async def _load_config_entries(*, db: Any, api_keys: List[str]) -> Dict[str, ConfigEntry | None]:
+        """
+        内部方法：批量联表查询 API Key 状态及配置数据并构建缓存条目
 
-        # 更新最后使用时间
-        await api_key_dao.update_last_used_time(db, api_key)
-        return config.config_data
+        :param db: 数据库会话
+        :param api_keys: API Key 列表
+        :return: API Key 到配置缓存条目的映射，未配置时为 None，不存在的 Key 不返回
+        """
+        rows = await config_dao.get_by_api_keys(db, api_keys)
+        return {row.key: await ConfigService._build_entry(db, row) for row in rows}
 
     @staticmethod
     @db_transaction
-    async def update_config(*, db: Any, api_key: str, config_data: Any) -> Any:
+    async def update_config(*, db: Any, api_key: str, config_data: Any, if_match: str | None = None) -> Any:
         """
         根据API Key更新配置数据
 
         :param db: 数据库会话
         :param api_key: API Key
         :param config_data: 新的配置数据
+        :param if_match: If-Match 请求头，与当前 ETag 不一致时拒绝更新
         :return: 更新后的配置数据
         """
-        # 验证API Key
-        key_record = await APIKeyService.get_api_key_record(db, api_key)
-        if not key_record:
+        return await ConfigService._write_config_data(db, api_key, lambda _: config_data, if_match)
+
+    @staticmethod
+    @db_transaction
+    async def patch_config(*, db: Any, api_key: str, patch: Any, patch_type: str, if_match: str | None = None) -> Any:
+        """
+        根据API Key局部更新配置数据
+
+        :param db: 数据库会话
+        :param api_key: API Key
+        :param patch: 补丁内容
+        :param patch_type: 'merge' 为 RFC 7396 Merge Patch，'json' 为 RFC 6902 JSON Patch
+        :param if_match: If-Match 请求头，与当前 ETag 不一致时拒绝更新
+        :return: 更新后的配置数据
+        """
+        def apply(current: Any) -> Any:
+            try:
+                if patch_type == 'json':
+                    return apply_json_patch(current, patch)
+                return merge_patch(current, patch)
+            except JsonPatchTestFailed as e:
+                raise errors.ConflictError(msg=str(e))
+            except JsonPatchError as e:
+                raise errors.RequestError(msg=str(e))
+
+        return await ConfigService._write_config_data(db, api_key, apply, if_match)
+
+    @staticmethod
+    async def _write_config_data(
+        db: Any,
+        api_key: str,
+        build: Callable[[Any], Any],
+        if_match: str | None = None,
+    ) -> Any:
+        """
+        内部方法：加锁读取配置、校验前置条件并在同一事务内写入新配置
+
+        声明了父 Key 的配置读写的均为自身覆盖层，提交后连同全部后代一起广播失效
+
+        :param db: 数据库会话
+        :param api_key: API Key
+        :param build: 由当前配置数据生成新配置数据的函数
+        :param if_match: If-Match 请求头
+        :return: 更新后的配置数据
+        """
+        # 单次联表查询验证API Key并获取配置
+        with profile_service.stage('lock'):
+            row = await config_dao.get_model_by_api_key(db, api_key, for_update=True)
+        if not row:
             raise errors.ForbiddenError(msg='无效的API Key')
-        if not key_record.status:
+        api_key_id, status, config, _, max_size, stored = row
+        if not status:
             raise errors.ForbiddenError(msg='API Key已被禁用')
-
-        # 获取配置
-        config = await config_dao.get_by_api_key_id(db, key_record.id)
         if not config:
             raise errors.NotFoundError(msg='未找到配置数据')
+        if if_match is not None:
+            resolution_key, _ = await config_inherit_service.resolve_meta(db, config)
+            if not etag_matches(if_match, make_etag(resolution_key)):
+                raise errors.HTTPError(code=412, msg='配置已被修改，请重新获取后再更新')
+
+        previous_hash = config.content_hash
+        next_revision = config.revision + 1
+        max_size = max_size or option_settings.CONFIG_MAX_SIZE
+
+        def apply(raw: bytes) -> Tuple[Any, EncodedConfig, RevisionData | None]:
+            # 解码、生成、编码及历史版本增量在同一次线程池调用中完成，大文档不阻塞事件循环
+            current = decode_config(raw)
+            config_data = build(current)
+            encoded = ConfigService._check_size(encode_config(config_data), max_size)
+            if digest(encoded.body) == previous_hash:
+                return config_data, encoded, None
+            return config_data, encoded, encode_revision(next_revision, current, config_data, encoded)
+
+        # 更新配置，内容已存在时只更新哈希引用
+        with profile_service.stage('build'):
+            config_data, encoded, revision_data = await run_in_threadpool(apply, stored)
+            changed = await config_dao.set_config_data(db, config, config_data, encoded, revision_data=revision_data)
+            descendants = await config_inherit_service.get_descendant_ids(db, [api_key_id]) if changed else []
+        with profile_service.stage('commit'):
+            await db.commit()
+        with profile_service.stage('publish'):
+            await config_bus.publish(api_key_id, *descendants)
+        if changed:
+            await ConfigService._release_blobs([previous_hash])
 
-        # 更新配置
-        config.config_data = config_data
-        await db.commit()
-        await db.refresh(config)
+        # 记录使用时间，由后台任务批量回写
+        usage_service.touch(api_key_id)
 
-        # 更新最后使用时间
-        await api_key_dao.update_last_used_time(db, api_key)
+        return config_data
 
-        return config.config_data
+    @staticmethod
+    @db_transaction
+    async def set_rate_limit(*, db: Any, api_key_id: int, rate_limit: int | None, rate_burst: int | None) -> None:
+        """
+        设置 API Key 的限流配额，提交后广播失效，各 worker 重新加载时生效
+
+        :param db: 数据库会话
+        :param api_key_id: API Key ID
+        :param rate_limit: 每秒请求数上限，0 为不限流，为空时恢复全局默认值
+        :param rate_burst: 突发请求数上限，为空时使用全局默认值
+        :return:
+        """
+        count = await api_key_dao.update_rate_limit(db, api_key_id, rate_limit, rate_burst)
+        if not count:
+            raise errors.NotFoundError(msg='API Key不存在')
+        with profile_service.stage('commit'):
+            await db.commit()
+        await config_bus.publish(api_key_id)
+
+    @staticmethod
+    @db_transaction
+    async def set_config_parent(*, db: Any, api_key_id: int, parent_key_id: int | None) -> dict:
+        """
+        设置或解除配置继承，解析结果保持不变
+
+        自身覆盖层按新的父配置重新生成（解除继承时为完整配置），并以完整快照写入新版本；
+        新版本号保证有效版本号递增，便于长轮询客户端感知变化
+
+        :param db: 数据库会话
+        :param api_key_id: API Key ID
+        :param parent_key_id: 父配置 API Key ID，为空时解除继承
+        :return: 新的父配置 API Key ID、版本号及覆盖层
+        """
+        row = await config_dao.get_model_with_data(db, api_key_id, for_update=True)
+        if not row:
+            raise errors.NotFoundError(msg=f'未找到 API Key ID 为 {api_key_id} 的配置数据')
+        config = row[0]
+        if config.parent_key_id == parent_key_id:
+            raise errors.RequestError(msg='继承关系未变化')
+        current, _, old_revision = await config_inherit_service.resolve(db, row)
+
+        parent_data = None
+        new_parent_revision = 0
+        if parent_key_id is not None:
+            if parent_key_id == api_key_id:
+                raise errors.RequestError(msg='不能继承自身')
+            parent_row = await config_dao.get_model_with_data(db, parent_key_id)
+            if not parent_row:
+                raise errors.NotFoundError(msg=f'未找到 API Key ID 为 {parent_key_id} 的配置数据')
+            parents = [parent_row, *await config_inherit_service.get_parents(db, parent_row.parent_key_id)]
+            if any(parent.api_key_id == api_key_id for parent in parents):
+                raise errors.RequestError(msg='继承关系不能形成环')
+            depth = len(parents) + await config_inherit_service.get_subtree_depth(db, api_key_id)
+            if depth > option_settings.CONFIG_INHERIT_MAX_DEPTH:
+                raise errors.RequestError(msg=f'配置继承不能超过 {option_settings.CONFIG_INHERIT_MAX_DEPTH} 层')
+            parent_document, _, new_parent_revision = await config_inherit_service.resolve(db, parent_row)
+            parent_data = parent_document.config_data
+
+        def rebase() -> Any:
+            if parent_key_id is None:
+                return current.config_data
+            overlay = diff_merge_patch(parent_data, current.config_data)
+            if merge_patch(parent_data, overlay) != current.config_data:
+                raise errors.RequestError(msg='配置包含 null 值，无法表示为相对父配置的覆盖层')
+            return overlay
+
+        overlay = await run_in_threadpool(rebase)
+        encoded = await ConfigService._encode_config(overlay, option_settings.CONFIG_MAX_SIZE)
+        previous_hash = config.content_hash
+        revision = max(config.revision + 1, old_revision - new_parent_revision + 1)
+        config.parent_key_id = parent_key_id
+        changed = await config_dao.set_config_data(db, config, overlay, encoded, revision=revision)
+        descendants = await config_inherit_service.get_descendant_ids(db, [api_key_id])
+        with profile_service.stage('commit'):
+            await db.commit()
+        await config_bus.publish(api_key_id, *descendants)
+        if changed:
+            await ConfigService._release_blobs([previous_hash])
+        return {'parent_key_id': parent_key_id, 'revision': revision + new_parent_revision, 'overlay': overlay}
+
+    @staticmethod
+    async def _release_blobs(content_hashes: List[str]) -> None:
+        """
+        内部方法：提交后删除不再被引用的配置内容，失败时只记录日志，留待 gc_blobs 清理
+
+        :param content_hashes: 内容哈希列表
+        :return:
+        """
+        try:
+            async with async_db_session() as db:
+                await config_blob_dao.delete_unreferenced(db, content_hashes)
+                await db.commit()
+        except Exception as e:
+            log.warning(f'清理配置内容失败: {e}')
+
+    @staticmethod
+    @db_transaction
+    async def gc_blobs(*, db: Any) -> int:
+        """
+        删除全部不再被引用的配置内容
+
+        :param db: 数据库会话
+        :return: 删除的条数
+        """
+        count = await config_blob_dao.delete_unreferenced(db)
+        with profile_service.stage('commit'):
+            await db.commit()
+        return count
+
+    @staticmethod
+    async def _encode_config(config_data: Any, max_size: int) -> EncodedConfig:
+        """
+        内部方法：在线程池中序列化、压缩配置并校验大小
+
+        :param config_data: 配置数据
+        :param max_size: 规范化 JSON 的大小上限
+        :return:
+        """
+        return ConfigService._check_size(await run_in_threadpool(encode_config, config_data), max_size)
+
+    @staticmethod
+    def _check_size(encoded: EncodedConfig, max_size: int) -> EncodedConfig:
+        """
+        内部方法：校验规范化 JSON 的大小
+
+        :param encoded: 已编码的配置
+        :param max_size: 大小上限
+        :return:
+        """
+        if len(encoded.body) > max_size:
+            raise errors.HTTPError(code=413, msg=f'配置大小 {len(encoded.body)} 字节超过上限 {max_size} 字节')
+        return encoded
+
+    @staticmethod
+    def get_body_size_limit(api_key: str) -> int:
+        """
+        获取读取更新请求体时的大小上限，不访问数据库，用于读取请求体前按 Content-Length 拒绝
+
+        缓存中有该 Key 时取其配置大小上限，否则取请求体上限，写入时再按加锁读取的上限校验
+
+        :param api_key: API Key
+        :return: 字节数
+        """
+        entry = config_cache.peek(api_key)
+        if entry is None:
+            return option_settings.CONFIG_MAX_REQUEST_SIZE
+        return entry.max_config_size or option_settings.CONFIG_MAX_SIZE
+
+    @staticmethod
+    @db_transaction
+    async def set_config_size_limit(*, db: Any, api_key_id: int, max_config_size: int | None) -> None:
+        """
+        设置 API Key 的配置大小上限
+
+        :param db: 数据库会话
+        :param api_key_id: API Key ID
+        :param max_config_size: 字节数，为空时恢复全局默认值
+        :return:
+        """
+        count = await api_key_dao.update_max_config_size(db, api_key_id, max_config_size)
+        if not count:
+            raise errors.NotFoundError(msg='API Key不存在')
+        with profile_service.stage('commit'):
+            await db.commit()
+        await config_bus.publish(api_key_id)
 
     @staticmethod
     async def _delete_config_and_api_key(db: Any, config=None, api_key=None) -> None:
@@ -133,15 +784,26 @@ class ConfigService:
         :param config: 配置对象
         :param api_key: API Key对象
         """
+        if api_key:
+            children = await config_dao.get_child_ids(db, [api_key.id])
+            if children:
+                raise errors.ConflictError(msg=f'有 {len(children)} 个 Key 继承该配置，请先解除继承')
+
         # 先删除配置
+        content_hash = None
         if config:
+            content_hash = config.content_hash
             await db.delete(config)
-            await db.commit()
 
         # 再删除API Key
         if api_key:
             await db.delete(api_key)
+
+        # 同一事务提交，flush 时按依赖顺序先删除配置
+        with profile_service.stage('commit'):
             await db.commit()
+        if content_hash:
+            await ConfigService._release_blobs([content_hash])
 
     @staticmethod
     @db_transaction
@@ -163,6 +825,7 @@ class ConfigService:
 
         # 删除配置和API Key
         await ConfigService._delete_config_and_api_key(db, config, key_record)
+        await config_bus.publish(key_record.id)
         return True
 
     @staticmethod
@@ -199,7 +862,9 @@ class ConfigService:
             config = await config_dao.get_by_api_key_id(db, id_value)
 
         # 删除配置和API Key
+        api_key_id = api_key.id
         await ConfigService._delete_config_and_api_key(db, config, api_key)
+        await config_bus.publish(api_key_id)
         return True
 
     # 兼容旧的方法名
@@ -232,7 +897,7 @@ class ConfigService:
         内部方法：构建配置信息字典
 
         :param api_key_record: API Key记录
-        :param config_obj: 配置对象
+        :param config_obj: 配置对象或包含 revision、updated_time 的查询行
         :return: 配置信息字典
         """
         # 处理API Key的显示
@@ -243,38 +908,45 @@ class ConfigService:
             'api_key': {
                 'key': masked_key,
                 'name': api_key_record.name,
+                'status': api_key_record.status,
                 'created_time': api_key_record.created_time,
                 'last_used_time': api_key_record.last_used_time
-            }
+            },
+            'revision': config_obj.revision if config_obj else None,
+            'updated_time': config_obj.updated_time if config_obj else None
         }
 
     @staticmethod
-    @db_transaction
-    async def get_sys_config_info(*, db: Any) -> dict:
+    @db_readonly
+    async def get_sys_config_info(
+        *,
+        db: Any,
+        page_size: int = 20,
+        after_id: int | None = None,
+        name: str | None = None,
+        status: int | None = None,
+    ) -> dict:
         """
-        获取系统配置和API Key信息，API Key会被部分加密显示
+        按游标分页获取系统配置和API Key信息，API Key会被部分加密显示
 
         :param db: 数据库会话
-        :return: 包含系统配置和API Key信息的字典
+        :param page_size: 每页条数
+        :param after_id: 游标，上一页返回的 next_cursor
+        :param name: 名称模糊匹配
+        :param status: 状态过滤
+        :return: 包含系统配置和API Key信息及下一页游标的字典
         """
-        # 获取所有API Key记录
-        api_key_records = await api_key_dao.get_all(db)
-        if not api_key_records:
-            return {
-                'configs': []
-            }
-
-        configs_list = []
-        for api_key_record in api_key_records:
-            # 获取配置
-            config_obj = await config_dao.get_by_api_key_id(db, api_key_record.id)
-
-            # 构建配置信息
-            config_info = ConfigService._build_config_info(api_key_record, config_obj)
-            configs_list.append(config_info)
-
+        # 多取一条用于判断是否还有下一页
+        rows = await api_key_dao.get_page_with_config(
+            db, limit=page_size + 1, after_id=after_id, name=name, status=status
+        )
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        configs_list = [ConfigService._build_config_info(row[0], row) for row in rows]
         return {
-            'configs': configs_list
+            'configs': configs_list,
+            'next_cursor': rows[-1][0].id if has_more else None
         }
 
     @staticmethod
@@ -294,5 +966,20 @@ class ConfigService:
         
         return api_key_record.key
 
+    @staticmethod
+    def get_cache_stats() -> dict:
+        """
+        获取配置缓存、共享文档缓存、无效 Key 过滤、限流及配置快照统计信息
+
+        :return: 命中、未命中、淘汰及拒绝等计数
+        """
+        return dict(
+            config_cache.stats(),
+            documents=document_cache.stats(),
+            key_filter=key_filter_service.stats(),
+            rate_limit=rate_limit_service.stats(),
+            snapshot=snapshot_service.stats(),
+        )
+
 
 config_service: ConfigService = ConfigService()
\ No newline at end of file
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from typing import Any, List, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from backend.common.exception import errors
+from backend.plugin.option.conf import option_settings
+from backend.plugin.option.crud.crud_config import config_dao
+from backend.plugin.option.crud.crud_config_blob import config_blob_dao
+from backend.plugin.option.utils.cache import ConfigDocument, document_cache
+from backend.plugin.option.utils.content import digest
+from backend.plugin.option.utils.json_patch import merge_patch
+from backend.plugin.option.utils.storage import decode_config
+
+
+def _merge_levels(base: Any, raws: List[bytes], from_root: bool) -> List[Any]:
+    """
+    内部方法：依次解码各级覆盖层并合并
+
+    :param base: 已解析的上一级结果，from_root 时忽略
+    :param raws: 由远及近的覆盖层原始存储值
+    :param from_root: 首个覆盖层是否为根配置
+    :return: 每一级的合并结果
+    """
+    results = []
+    for index, raw in enumerate(raws):
+        overlay = decode_config(raw)
+        base = overlay if from_root and index == 0 else merge_patch(base, overlay)
+        results.append(base)
+    return results
+
+
+class ConfigInheritService:
+    """
+    配置继承
+
+    声明了父 Key 的配置只存储覆盖层，读取时按 RFC 7396 Merge Patch 深度合并到父配置的解析结果上。
+    解析结果以父配置解析键和自身内容哈希派生的解析键存入共享文档缓存，任一祖先变化时解析键随之变化；
+    按 Key 的配置缓存由写入方连同全部后代一起广播失效。
+    继承配置对外的 ETag 取解析键，版本号为自身及各级父配置版本号之和
+    """
+
+    @staticmethod
+    def resolution_key(parent_key: str, content_hash: str) -> str:
+        """
+        由父配置解析键及自身内容哈希派生解析键
+
+        :param parent_key: 父配置解析键，根配置的解析键即其内容哈希
+        :param content_hash: 自身内容哈希
+        :return:
+        """
+        return digest(f'{parent_key}:{content_hash}'.encode())
+
+    @staticmethod
+    async def get_parents(db: Any, parent_key_id: int | None) -> List[Any]:
+        """
+        获取父配置链
+
+        :param db: 数据库会话
+        :param parent_key_id: 父配置 API Key ID
+        :return: 由近及远的 (api_key_id, parent_key_id, revision, content_hash) 列表
+        """
+        if parent_key_id is None:
+            return []
+        parents = await config_dao.get_parents(db, parent_key_id, option_settings.CONFIG_INHERIT_MAX_DEPTH)
+        if len(parents) > option_settings.CONFIG_INHERIT_MAX_DEPTH:
+            raise errors.ServerError(msg=f'配置继承超过 {option_settings.CONFIG_INHERIT_MAX_DEPTH} 层')
+        return parents
+
+    @staticmethod
+    def _resolution_keys(levels: List[Any]) -> List[str]:
+        keys = []
+        for level in levels:
+            keys.append(ConfigInheritService.resolution_key(keys[-1], level.content_hash) if keys else level.content_hash)
+        return keys
+
+    @staticmethod
+    async def resolve_meta(db: Any, row: Any) -> Tuple[str, int]:
+        """
+        只计算解析键及有效版本号，不加载配置数据
+
+        :param db: 数据库会话
+        :param row: 包含 parent_key_id、revision、content_hash 的查询行或配置对象
+        :return: (解析键, 有效版本号)
+        """
+        if row.parent_key_id is None:
+            return row.content_hash, row.revision
+        levels = [*reversed(await ConfigInheritService.get_parents(db, row.parent_key_id)), row]
+        return ConfigInheritService._resolution_keys(levels)[-1], sum(level.revision for level in levels)
+
+    @staticmethod
+    async def resolve(db: Any, row: Any) -> Tuple[ConfigDocument, str, int]:
+        """
+        解析配置，复用共享文档缓存中最近一级的解析结果，只加载其下各级的覆盖层
+
+        大文档在线程池中解码及合并
+
+        :param db: 数据库会话
+        :param row: config_dao.get_by_api_key 返回的查询行
+        :return: (已解析文档, 解析键, 有效版本号)
+        """
+        levels = [*reversed(await ConfigInheritService.get_parents(db, row.parent_key_id)), row]
+        keys = ConfigInheritService._resolution_keys(levels)
+        revision = sum(level.revision for level in levels)
+
+        # 自下而上查找已缓存的最近一级
+        start, base = 0, None
+        for index in range(len(levels) - 1, -1, -1):
+            base = document_cache.get(keys[index])
+            if base is not None:
+                start = index + 1
+                break
+        if start == len(levels):
+            return base, keys[-1], revision
+
+        blobs = {row.content_hash: (row.config_data, row.config_size or 0)}
+        ancestors = [level.content_hash for level in levels[start:-1]]
+        for content_hash, blob in (await config_blob_dao.get_data(db, ancestors)).items():
+            blobs[content_hash] = (blob.data, blob.size)
+        if any(content_hash not in blobs for content_hash in ancestors):
+            raise errors.ServerError(msg='父配置内容不存在')
+        raws = [blobs[level.content_hash][0] for level in levels[start:]]
+        size = sum(blobs[level.content_hash][1] for level in levels[start:])
+        args = (base.config_data if base else None, raws, start == 0)
+        if size >= option_settings.CONFIG_THREADPOOL_MIN_SIZE:
+            results = await run_in_threadpool(_merge_levels, *args)
+        else:
+            results = _merge_levels(*args)
+
+        document = base
+        for key, config_data in zip(keys[start:], results):
+            document = ConfigDocument(config_data)
+            document_cache.set(key, document)
+        return document, keys[-1], revision
+
+    @staticmethod
+    async def get_descendant_ids(db: Any, api_key_ids: List[int]) -> List[int]:
+        """
+        获取直接或间接继承指定配置的全部 API Key ID
+
+        :param db: 数据库会话
+        :param api_key_ids:
+        :return: 不含 api_key_ids 自身
+        """
+        seen = set(api_key_ids)
+        descendants = []
+        level = list(api_key_ids)
+        for _ in range(option_settings.CONFIG_INHERIT_MAX_DEPTH):
+            level = [child for child in await config_dao.get_child_ids(db, level) if child not in seen]
+            if not level:
+                break
+            seen.update(level)
+            descendants.extend(level)
+        return descendants
+
+    @staticmethod
+    async def get_subtree_depth(db: Any, api_key_id: int) -> int:
+        """
+        获取继承指定配置的后代层数
+
+        :param db: 数据库会话
+        :param api_key_id:
+        :return: 没有后代时为 0
+        """
+        seen = {api_key_id}
+        level = [api_key_id]
+        depth = 0
+        while level and depth <= option_settings.CONFIG_INHERIT_MAX_DEPTH:
+            level = [child for child in await config_dao.get_child_ids(db, level) if child not in seen]
+            if level:
+                seen.update(level)
+                depth += 1
+        return depth
+
+
+config_inherit_service: ConfigInheritService = ConfigInheritService()
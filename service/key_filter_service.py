@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+
+from typing import Any, List
+
+from backend.common.log import log
+from backend.plugin.option.database import async_db_session
+from backend.plugin.option.conf import option_settings
+from backend.plugin.option.crud.crud_api_key import api_key_dao
+from backend.plugin.option.service.bus_service import config_bus
+from backend.plugin.option.utils.bloom import BloomFilter
+from backend.plugin.option.utils.cache import TTLLRUCache
+from backend.plugin.option.utils.security import key_digest
+from backend.plugin.option.utils.tasks import create_background_task
+
+
+class KeyFilterService:
+    """
+    无效 API Key 过滤
+
+    布隆过滤器保存全部有效 Key 的摘要，不在其中的 Key 无需查询数据库即可拒绝；
+    数据库确认无效的 Key 进入短时负缓存，拦截反复使用的过期 Key
+    """
+
+    def __init__(self, *, enabled: bool, error_rate: float, rebuild_interval: float) -> None:
+        self.enabled = enabled
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self.negative_cache: TTLLRUCache[str, bool] = TTLLRUCache(
+            maxsize=option_settings.NEGATIVE_CACHE_MAXSIZE,
+            ttl=option_settings.NEGATIVE_CACHE_TTL,
+        )
+        self.bloom_rejections = 0
+        self.negative_rejections = 0
+        self._bloom: BloomFilter | None = None
+        self._building: list[bytes] | None = None
+        self._reset = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._loading: set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        """启动后台构建任务，重复调用无副作用"""
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = create_background_task(self._run())
+
+    def might_exist(self, api_key: str) -> bool:
+        """
+        判断 API Key 是否可能有效，返回 False 时可直接拒绝
+
+        :param api_key: API Key
+        :return:
+        """
+        if not self.enabled:
+            return True
+        self.start()
+        if self.negative_cache.get(api_key):
+            self.negative_rejections += 1
+            return False
+        if self._bloom is not None and key_digest(api_key) not in self._bloom:
+            self.bloom_rejections += 1
+            return False
+        return True
+
+    def mark_invalid(self, api_key: str) -> None:
+        """
+        记录数据库确认无效的 API Key
+
+        :param api_key: API Key
+        :return:
+        """
+        if self.enabled:
+            self.negative_cache.set(api_key, True)
+
+    def add(self, api_key: str) -> None:
+        """
+        登记新建的 API Key
+
+        :param api_key: API Key
+        :return:
+        """
+        self.negative_cache.invalidate(api_key)
+        self._add_digests([key_digest(api_key)])
+
+    def _add_digests(self, digests: List[bytes]) -> None:
+        """内部方法：加入过滤器，构建期间同时暂存，构建完成后补入新过滤器"""
+        if self._building is not None:
+            self._building.extend(digests)
+        if self._bloom is not None:
+            for digest in digests:
+                self._bloom.add(digest)
+            if self._bloom.count > self._bloom.capacity:
+                self._invalidate()
+
+    def _invalidate(self) -> None:
+        """内部方法：停用过滤器（全部放行）并立即重建"""
+        self._bloom = None
+        self._reset.set()
+
+    def on_created(self, api_key_ids: List[int] | None) -> None:
+        """
+        配置变更总线处理函数，只接收其它 worker 新建的 Key，需补入本进程的过滤器并移出负缓存；
+        更新、删除不影响过滤器，本进程新建的 Key 由写路径通过 add 登记
+
+        构建期间同样需要处理，新建的 Key 暂存后补入新过滤器，避免遗漏构建快照之后提交的 Key；
+        过滤器尚未就绪时仍需清除负缓存
+
+        :param api_key_ids: API Key ID 列表，为 None 时重新构建
+        :return:
+        """
+        if not self.enabled:
+            return
+        if api_key_ids is None:
+            self.negative_cache.clear()
+            self._invalidate()
+            return
+        task = create_background_task(self._load_ids(api_key_ids))
+        self._loading.add(task)
+        task.add_done_callback(self._loading.discard)
+
+    async def _load_ids(self, api_key_ids: List[int]) -> None:
+        """内部方法：查询新建 Key 的摘要并加入过滤器，同时清除其负缓存"""
+        try:
+            async with async_db_session() as db:
+                rows = await api_key_dao.get_digests_by_ids(db, api_key_ids)
+            for row in rows:
+                self.negative_cache.invalidate(row.key)
+            self._add_digests([row.key_digest for row in rows])
+        except Exception as e:
+            # 无法确认时停用过滤器并重建，宁可多查询也不误拒
+            self._invalidate()
+            log.warning(f'API Key 过滤器更新失败: {e}')
+
+    async def _run(self) -> None:
+        """内部方法：启动时构建过滤器，并定期重建以剔除已删除的 Key"""
+        while True:
+            try:
+                self._reset.clear()
+                await self._rebuild()
+                await asyncio.wait_for(self._reset.wait(), timeout=self.rebuild_interval)
+            except asyncio.TimeoutError:
+                continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning(f'API Key 过滤器构建失败: {e}')
+                await asyncio.sleep(10)
+
+    async def _rebuild(self) -> None:
+        """内部方法：从数据库流式读取全部摘要构建新过滤器后整体替换"""
+        self._building = []
+        try:
+            digests = []
+            async with async_db_session() as db:
+                async for digest in api_key_dao.stream_digests(db):
+                    digests.append(digest)
+            # 预留一倍余量，容纳重建间隔内新建的 Key
+            bloom = BloomFilter(capacity=max(len(digests) * 2, 1024), error_rate=self.error_rate)
+            for digest in digests + self._building:
+                bloom.add(digest)
+            self._bloom = bloom
+        finally:
+            self._building = None
+
+    def stats(self) -> dict[str, Any]:
+        """
+        过滤统计信息
+
+        :return:
+        """
+        bloom = self._bloom
+        return {
+            'enabled': self.enabled,
+            'ready': bloom is not None,
+            'bloom_bits': bloom.size if bloom else 0,
+            'bloom_hashes': bloom.hashes if bloom else 0,
+            'bloom_items': bloom.count if bloom else 0,
+            'bloom_rejections': self.bloom_rejections,
+            'negative_rejections': self.negative_rejections,
+            'negative_cache': self.negative_cache.stats(),
+        }
+
+
+key_filter_service: KeyFilterService = KeyFilterService(
+    enabled=option_settings.KEY_FILTER_ENABLED,
+    error_rate=option_settings.KEY_FILTER_ERROR_RATE,
+    rebuild_interval=option_settings.KEY_FILTER_REBUILD_INTERVAL,
+)
+config_bus.subscribe_created(key_filter_service.on_created)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import hmac
+import inspect
+import time
+
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from backend.plugin.option.conf import option_settings
+from backend.plugin.option.database import option_engine
+from backend.plugin.option.service.key_filter_service import key_filter_service
+from backend.plugin.option.service.rate_limit_service import rate_limit_service
+from backend.plugin.option.utils.cache import TTLLRUCache, config_cache, document_cache
+from backend.plugin.option.utils.metrics import SIZE_BUCKETS, MetricsRegistry, registry
+
+T = TypeVar('T')
+
+# 当前正在执行的服务方法，SQL 执行事件据此归属数据库耗时
+_current_method: ContextVar[str] = ContextVar('option_current_method', default='other')
+
+
+class MetricsService:
+    """
+    配置服务运行指标
+
+    计数只在事件循环线程中更新，不加锁；缓存类指标在抓取时从已有统计读取，不在请求路径上额外计数
+    """
+
+    def __init__(self, metrics: MetricsRegistry) -> None:
+        self.registry = metrics
+        self.requests = metrics.counter(
+            'option_http_requests_total', '按路由、方法及状态码统计的请求数', ('route', 'method', 'status')
+        )
+        self.request_seconds = metrics.histogram(
+            'option_http_request_duration_seconds', '按路由统计的请求耗时', ('route', 'method')
+        )
+        self.request_bytes = metrics.histogram(
+            'option_http_request_size_bytes', '按路由统计的请求体大小', ('route', 'method'), SIZE_BUCKETS
+        )
+        self.response_bytes = metrics.histogram(
+            'option_http_response_size_bytes', '按路由统计的响应体大小，流式响应不统计', ('route', 'method'), SIZE_BUCKETS
+        )
+        self.config_bytes = metrics.histogram(
+            'option_config_payload_bytes', '未压缩的配置序列化大小', ('operation',), SIZE_BUCKETS
+        )
+        self.service_calls = metrics.counter('option_service_calls_total', '服务方法调用次数', ('method',))
+        self.db_queries = metrics.counter('option_db_queries_total', '按服务方法统计的 SQL 执行次数', ('method',))
+        self.db_seconds = metrics.counter('option_db_seconds_total', '按服务方法统计的 SQL 执行耗时', ('method',))
+        self.rollbacks = metrics.counter('option_db_rollbacks_total', 'db_transaction 按异常类型统计的回滚次数', ('exception',))
+        metrics.callback(
+            'option_cache_lookups_total', '缓存查找次数', self._cache_lookups, ('cache', 'result'), 'counter'
+        )
+        metrics.callback('option_cache_hit_ratio', '缓存命中率', self._cache_hit_ratio, ('cache',))
+        metrics.callback('option_cache_entries', '缓存条目数', self._cache_entries, ('cache',))
+        metrics.callback(
+            'option_key_filter_rejections_total', '无效 API Key 拦截次数', self._key_filter_rejections, ('filter',), 'counter'
+        )
+        metrics.callback(
+            'option_rate_limited_total', '被限流拒绝的请求数', self._rate_limited, ('scope',), 'counter'
+        )
+
+    @staticmethod
+    def _rate_limited() -> Dict[Tuple[str, ...], float]:
+        return {(scope,): count for scope, count in rate_limit_service.rejections.items()}
+
+    @staticmethod
+    def _caches() -> Dict[str, TTLLRUCache]:
+        return {'config': config_cache, 'document': document_cache, 'negative': key_filter_service.negative_cache}
+
+    def _cache_lookups(self) -> Dict[Tuple[str, ...], float]:
+        values = {}
+        for name, cache in self._caches().items():
+            values[(name, 'hit')] = cache.hits
+            values[(name, 'miss')] = cache.misses
+        return values
+
+    def _cache_hit_ratio(self) -> Dict[Tuple[str, ...], float]:
+        values = {}
+        for name, cache in self._caches().items():
+            lookups = cache.hits + cache.misses
+            values[(name,)] = cache.hits / lookups if lookups else 0.0
+        return values
+
+    def _cache_entries(self) -> Dict[Tuple[str, ...], float]:
+        return {(name,): len(cache) for name, cache in self._caches().items()}
+
+    @staticmethod
+    def _key_filter_rejections() -> Dict[Tuple[str, ...], float]:
+        return {
+            ('bloom',): key_filter_service.bloom_rejections,
+            ('negative',): key_filter_service.negative_rejections,
+        }
+
+    def instrument_engine(self, engine: AsyncEngine) -> None:
+        """
+        监听引擎的 SQL 执行事件，按当前服务方法统计次数和耗时
+
+        传入插件会话的引擎，宿主应用的 SQL 不计入
+
+        :param engine:
+        :return:
+        """
+        sync_engine = engine.sync_engine
+        if event.contains(sync_engine, 'before_cursor_execute', self._before_execute):
+            return
+        event.listen(sync_engine, 'before_cursor_execute', self._before_execute)
+        event.listen(sync_engine, 'after_cursor_execute', self._after_execute)
+        event.listen(sync_engine, 'handle_error', self._on_error)
+
+    @staticmethod
+    def _before_execute(conn: Any, *args: Any) -> None:
+        conn.info.setdefault('option_query_started', []).append(time.perf_counter())
+
+    def _after_execute(self, conn: Any, *args: Any) -> None:
+        started = conn.info['option_query_started'].pop()
+        method = _current_method.get()
+        self.db_queries.inc(method)
+        self.db_seconds.inc(method, amount=time.perf_counter() - started)
+
+    def _on_error(self, context: Any) -> None:
+        # 执行失败时不会触发 after_cursor_execute，在此弹出开始时间并计入
+        conn = context.connection
+        if conn is not None and conn.info.get('option_query_started'):
+            self._after_execute(conn)
+
+    def instrument_class(self, cls: type[T]) -> type[T]:
+        """
+        类装饰器，为全部异步静态方法统计调用次数，并将方法内的 SQL 执行归属到该方法
+
+        嵌套调用时归属到最内层的方法
+
+        :param cls:
+        :return:
+        """
+        for name, attr in list(vars(cls).items()):
+            if isinstance(attr, staticmethod) and inspect.iscoroutinefunction(attr.__func__):
+                setattr(cls, name, staticmethod(self._track(f'{cls.__name__}.{name}', attr.__func__)))
+        return cls
+
+    def _track(self, method: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            self.service_calls.inc(method)
+            token = _current_method.set(method)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _current_method.reset(token)
+        return wrapper
+
+    def observe_request(
+        self, route: str, method: str, status: int, seconds: float, request_size: str | None, response_size: str | None
+    ) -> None:
+        """
+        记录一次请求
+
+        :param route: 路由模板
+        :param method: 请求方法
+        :param status: 状态码
+        :param seconds: 耗时
+        :param request_size: 请求 Content-Length
+        :param response_size: 响应 Content-Length，流式响应为空
+        :return:
+        """
+        self.requests.inc(route, method, str(status))
+        self.request_seconds.observe(seconds, route, method)
+        if request_size and request_size.isdigit():
+            self.request_bytes.observe(int(request_size), route, method)
+        if response_size and response_size.isdigit():
+            self.response_bytes.observe(int(response_size), route, method)
+
+    @staticmethod
+    def is_allowed(client_ip: str | None, authorization: str | None) -> bool:
+        """
+        判断请求能否读取指标：客户端 IP 在白名单内，或配置了令牌且请求携带 Bearer 令牌
+
+        :param client_ip: 客户端 IP
+        :param authorization: Authorization 请求头
+        :return:
+        """
+        if client_ip is not None and client_ip in option_settings.METRICS_ALLOWED_IPS:
+            return True
+        if not option_settings.METRICS_TOKEN or not authorization:
+            return False
+        scheme, _, token = authorization.partition(' ')
+        if scheme.lower() != 'bearer':
+            return False
+        # 请求头由客户端提供，compare_digest 不接受含非 ASCII 字符的 str，编码后比较
+        return hmac.compare_digest(token.strip().encode(), option_settings.METRICS_TOKEN.encode())
+
+    def render(self) -> str:
+        """
+        生成 Prometheus 文本格式指标
+
+        :return:
+        """
+        return self.registry.render()
+
+
+metrics_service: MetricsService = MetricsService(registry)
+metrics_service.instrument_engine(option_engine)
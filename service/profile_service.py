@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import hashlib
+import hmac
+import random
+import time
+
+from collections import deque
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from backend.database.db import uuid4_str
+from backend.plugin.option.conf import option_settings
+from backend.plugin.option.database import option_engine
+from backend.utils.timezone import timezone
+
+PROFILE_HEADER = 'X-Option-Profile'
+
+_current_profile: ContextVar['RequestProfile | None'] = ContextVar('option_current_profile', default=None)
+
+
+@dataclass(slots=True)
+class RequestProfile:
+    """单个请求的阶段耗时及 SQL 记录"""
+
+    id: str
+    route: str
+    method: str
+    sampled: bool
+    started_at: datetime
+    started: float = field(default_factory=time.perf_counter)
+    status: int | None = None
+    total_ms: float | None = None
+    stages: List[Dict[str, Any]] = field(default_factory=list)
+    queries: List[Dict[str, Any]] = field(default_factory=list)
+
+    def offset_ms(self, moment: float) -> float:
+        return round((moment - self.started) * 1000, 3)
+
+    def server_timing(self) -> str:
+        """
+        汇总同名阶段及 SQL 耗时，生成 Server-Timing 响应头
+
+        :return:
+        """
+        durations: Dict[str, float] = {}
+        for stage in self.stages:
+            durations[stage['name']] = durations.get(stage['name'], 0) + stage['duration_ms']
+        if self.queries:
+            durations['db'] = sum(query['duration_ms'] for query in self.queries)
+        parts = [f'{name};dur={duration:.3f}' for name, duration in durations.items()]
+        if self.queries:
+            parts[-1] += f';desc="{len(self.queries)} queries"'
+        parts.append(f'total;dur={self.total_ms:.3f}')
+        return ', '.join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'route': self.route,
+            'method': self.method,
+            'started_at': self.started_at,
+            'status': self.status,
+            'total_ms': self.total_ms,
+            'stages': self.stages,
+            'queries': self.queries,
+        }
+
+
+class _Stage:
+    """记录一个阶段的耗时，作为同步上下文管理器使用，可包含 await"""
+
+    __slots__ = ('profile', 'name', 'started')
+
+    def __init__(self, profile: RequestProfile, name: str) -> None:
+        self.profile = profile
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc: Any) -> None:
+        ended = time.perf_counter()
+        self.profile.stages.append({
+            'name': self.name,
+            'start_ms': self.profile.offset_ms(self.started),
+            'duration_ms': round((ended - self.started) * 1000, 3),
+        })
+
+
+class _NullStage:
+    """未开启剖析时使用的空上下文管理器"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NULL_STAGE = _NullStage()
+
+
+class ProfileService:
+    """
+    按需的请求剖析
+
+    全局开启（管理员设置）或请求携带有效签名头时，记录服务内各阶段及 SQL 的耗时并返回 Server-Timing 响应头；
+    被采样的请求写入固定长度的环形缓冲，供管理接口读取。未开启时各埋点只做一次 ContextVar 读取
+    """
+
+    def __init__(self, *, enabled: bool, sample_rate: float, buffer_size: int) -> None:
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.profiles: deque[RequestProfile] = deque(maxlen=buffer_size)
+
+    @staticmethod
+    def sign(expires: int) -> str:
+        """
+        生成剖析请求头的值
+
+        :param expires: 过期时间戳（秒）
+        :return: <expires>.<signature>
+        """
+        signature = hmac.new(option_settings.PROFILE_SECRET.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+        return f'{expires}.{signature}'
+
+    @staticmethod
+    def verify(value: str | None) -> bool:
+        """
+        校验剖析请求头，未配置密钥时一律无效
+
+        :param value: 请求头的值
+        :return:
+        """
+        if not value or not option_settings.PROFILE_SECRET:
+            return False
+        expires, _, _ = value.partition('.')
+        if not (expires.isascii() and expires.isdigit()):
+            return False
+        # 请求头由客户端提供，格式异常一律视为无效，不能让异常逃出路由
+        try:
+            if int(expires) < time.time():
+                return False
+            return hmac.compare_digest(value.encode(), ProfileService.sign(int(expires)).encode())
+        except (ValueError, UnicodeEncodeError):
+            return False
+
+    def begin(self, route: str, method: str, header: str | None) -> Token | None:
+        """
+        判断请求是否需要剖析，需要时创建剖析记录并绑定到当前上下文
+
+        :param route: 路由模板
+        :param method: 请求方法
+        :param header: 剖析请求头
+        :return: 用于 finish 的上下文令牌，不剖析时为 None
+        """
+        requested = self.verify(header)
+        if not requested and not self.enabled:
+            return None
+        profile = RequestProfile(
+            id=uuid4_str(),
+            route=route,
+            method=method,
+            sampled=requested or random.random() < self.sample_rate,
+            started_at=timezone.now(),
+        )
+        return _current_profile.set(profile)
+
+    def finish(self, token: Token, status: int) -> RequestProfile:
+        """
+        结束剖析，被采样时写入环形缓冲
+
+        :param token: begin 返回的令牌
+        :param status: 响应状态码
+        :return:
+        """
+        profile = _current_profile.get()
+        _current_profile.reset(token)
+        profile.status = status
+        profile.total_ms = profile.offset_ms(time.perf_counter())
+        if profile.sampled:
+            self.profiles.append(profile)
+        return profile
+
+    @staticmethod
+    def stage(name: str) -> _Stage | _NullStage:
+        """
+        记录一个阶段的耗时，未开启剖析时返回空上下文管理器
+
+        :param name: 阶段名称，作为 Server-Timing 指标名，只使用字母、数字和连字符
+        :return:
+        """
+        profile = _current_profile.get()
+        if profile is None:
+            return _NULL_STAGE
+        return _Stage(profile, name)
+
+    def get_profiles(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        获取最近的剖析记录，新记录在前
+
+        :param limit: 条数
+        :return:
+        """
+        return [profile.to_dict() for profile in list(self.profiles)[::-1][:limit]]
+
+    def configure(self, *, enabled: bool | None = None, sample_rate: float | None = None) -> Dict[str, Any]:
+        """
+        运行时调整全局剖析开关及采样率，只影响当前 worker
+
+        :param enabled:
+        :param sample_rate:
+        :return: 当前设置
+        """
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        return {
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'buffer_size': self.profiles.maxlen,
+            'buffered': len(self.profiles),
+            'header_enabled': bool(option_settings.PROFILE_SECRET),
+        }
+
+    def instrument_engine(self, engine: AsyncEngine) -> None:
+        """
+        监听引擎的 SQL 执行事件，记录剖析中请求的语句及耗时
+
+        传入插件会话的引擎，同一请求中宿主应用（如鉴权）的 SQL 不记录
+
+        :param engine:
+        :return:
+        """
+        sync_engine = engine.sync_engine
+        if event.contains(sync_engine, 'before_cursor_execute', self._before_execute):
+            return
+        event.listen(sync_engine, 'before_cursor_execute', self._before_execute)
+        event.listen(sync_engine, 'after_cursor_execute', self._after_execute)
+        event.listen(sync_engine, 'handle_error', self._on_error)
+
+    @staticmethod
+    def _before_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        if _current_profile.get() is not None:
+            conn.info.setdefault('option_profile_started', []).append(time.perf_counter())
+
+    @staticmethod
+    def _after_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        profile = _current_profile.get()
+        stack = conn.info.get('option_profile_started')
+        if profile is None or not stack:
+            return
+        started = stack.pop()
+        if len(profile.queries) < option_settings.PROFILE_MAX_QUERIES:
+            profile.queries.append({
+                'statement': statement[: option_settings.PROFILE_MAX_STATEMENT],
+                'start_ms': profile.offset_ms(started),
+                'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+            })
+
+    @staticmethod
+    def _on_error(context: Any) -> None:
+        conn = context.connection
+        if conn is not None and conn.info.get('option_profile_started'):
+            ProfileService._after_execute(conn, None, context.statement or '')
+
+
+profile_service: ProfileService = ProfileService(
+    enabled=option_settings.PROFILE_ENABLED,
+    sample_rate=option_settings.PROFILE_SAMPLE_RATE,
+    buffer_size=option_settings.PROFILE_BUFFER_SIZE,
+)
+profile_service.instrument_engine(option_engine)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import math
+import time
+
+from typing import Any, Dict, Literal, Tuple
+
+from backend.common.exception import errors
+from backend.common.log import log
+from backend.plugin.option.conf import option_settings
+from backend.plugin.option.service.profile_service import profile_service
+from backend.plugin.option.utils.cache import ConfigEntry, config_cache
+from backend.plugin.option.utils.rate_limit import RedisTokenBucketLimiter, TokenBucketLimiter
+from backend.plugin.option.utils.security import key_digest
+
+RateLimitScope = Literal['read', 'write']
+
+
+class RateLimitService:
+    """
+    按 API Key 的令牌桶限流
+
+    读、写各用一个令牌桶，可选再按客户端 IP 区分；配额取调用方传入的缓存条目中该 Key 的设置，
+    未传入时取配置缓存，均没有时使用全局默认值，限流检查本身不访问数据库。
+    配置了共享后端时多个 worker 共用令牌桶，共享后端出错后的 backend_retry 秒内直接使用进程内令牌桶
+    """
+
+    def __init__(
+        self,
+        *,
+        enabled: bool,
+        rate: int,
+        burst: int,
+        by_ip: bool,
+        local: TokenBucketLimiter,
+        shared: RedisTokenBucketLimiter | None = None,
+        backend_retry: float = 5,
+    ) -> None:
+        self.enabled = enabled
+        self.rate = rate
+        self.burst = burst
+        self.by_ip = by_ip
+        self.local = local
+        self.shared = shared
+        self.backend_retry = backend_retry
+        self.rejections: Dict[str, int] = {'read': 0, 'write': 0}
+        self.backend_errors = 0
+        self._shared_failed = False
+        self._shared_retry_at = 0.0
+
+    def get_quota(self, api_key: str, entry: ConfigEntry | None = None) -> Tuple[int, int]:
+        """
+        获取 API Key 的限流配额
+
+        只设置了每秒请求数时，突发请求数按全局默认的突发倍数换算
+
+        :param api_key: API Key
+        :param entry: 该 Key 的缓存条目，为空时取配置缓存
+        :return: (每秒请求数, 突发请求数)，每秒请求数为 0 表示不限流
+        """
+        if entry is None:
+            entry = config_cache.peek(api_key)
+        if entry is None or entry.rate_limit is None:
+            rate, burst = self.rate, max(self.burst, self.rate)
+        else:
+            rate = entry.rate_limit
+            burst = max(math.ceil(rate * self.burst / self.rate), rate) if self.rate > 0 else rate
+        if entry is not None and entry.rate_burst is not None:
+            burst = entry.rate_burst
+        return rate, burst
+
+    async def check(
+        self,
+        api_key: str,
+        scope: RateLimitScope,
+        client_ip: str | None = None,
+        *,
+        entry: ConfigEntry | None = None,
+    ) -> None:
+        """
+        取一个令牌，令牌不足时返回 429
+
+        :param api_key: API Key
+        :param scope: read 为读取配置，write 为更新配置
+        :param client_ip: 客户端 IP，开启 RATE_LIMIT_BY_IP 时参与分桶
+        :param entry: 该 Key 的缓存条目，为空时取配置缓存
+        :return:
+        """
+        if not self.enabled:
+            return
+        rate, burst = self.get_quota(api_key, entry)
+        if rate <= 0:
+            return
+        bucket = f'{scope}:{key_digest(api_key).hex()}'
+        if self.by_ip and client_ip:
+            bucket = f'{bucket}:{client_ip}'
+        with profile_service.stage('rate-limit'):
+            retry_after = await self._acquire(bucket, rate, burst)
+        if retry_after > 0:
+            self.rejections[scope] += 1
+            raise errors.HTTPError(
+                code=429,
+                msg='请求过于频繁，请稍后重试',
+                headers={'Retry-After': str(max(1, math.ceil(retry_after)))},
+            )
+
+    async def _acquire(self, bucket: str, rate: int, burst: int) -> float:
+        """
+        内部方法：优先从共享后端取令牌，失败时退回进程内令牌桶，并在重试间隔内不再访问共享后端
+
+        :param bucket: 桶标识
+        :param rate: 每秒请求数
+        :param burst: 突发请求数
+        :return: 需要等待的秒数
+        """
+        if self.shared is not None and time.monotonic() >= self._shared_retry_at:
+            try:
+                retry_after = await self.shared.acquire(bucket, rate, burst)
+            except Exception as e:
+                self.backend_errors += 1
+                self._shared_retry_at = time.monotonic() + self.backend_retry
+                if not self._shared_failed:
+                    self._shared_failed = True
+                    log.warning(f'共享限流后端不可用，{self.backend_retry} 秒内改用进程内令牌桶: {e}')
+            else:
+                if self._shared_failed:
+                    self._shared_failed = False
+                    log.info('共享限流后端已恢复')
+                return retry_after
+        return self.local.acquire(bucket, rate, burst)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        限流统计信息
+
+        :return:
+        """
+        return {
+            'enabled': self.enabled,
+            'backend': 'redis' if self.shared is not None else 'memory',
+            'rate': self.rate,
+            'burst': self.burst,
+            'buckets': len(self.local),
+            'rejections': dict(self.rejections),
+            'backend_errors': self.backend_errors,
+        }
+
+
+def _build_shared() -> RedisTokenBucketLimiter | None:
+    """内部方法：按配置创建共享限流后端"""
+    if option_settings.RATE_LIMIT_BACKEND == 'redis':
+        from backend.database.redis import redis_client
+
+        return RedisTokenBucketLimiter(redis_client, option_settings.RATE_LIMIT_REDIS_PREFIX)
+    return None
+
+
+rate_limit_service: RateLimitService = RateLimitService(
+    enabled=option_settings.RATE_LIMIT_ENABLED,
+    rate=option_settings.RATE_LIMIT_RATE,
+    burst=option_settings.RATE_LIMIT_BURST,
+    by_ip=option_settings.RATE_LIMIT_BY_IP,
+    local=TokenBucketLimiter(max_buckets=option_settings.RATE_LIMIT_MAX_BUCKETS),
+    shared=_build_shared(),
+    backend_retry=option_settings.RATE_LIMIT_BACKEND_RETRY,
+)
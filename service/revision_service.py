@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from typing import Any
+
+from backend.common.exception import errors
+from backend.plugin.option.crud.crud_config import config_dao
+from backend.plugin.option.crud.crud_config_revision import config_revision_dao
+from backend.plugin.option.service.config_service import ConfigService, db_readonly, db_transaction
+from backend.plugin.option.utils.json_patch import JsonPatchError, apply_json_patch
+
+
+class ConfigRevisionService:
+    @staticmethod
+    async def _get_api_key_id(db: Any, api_key: str) -> int:
+        """
+        内部方法：验证API Key并返回其ID
+
+        :param db: 数据库会话
+        :param api_key: API Key
+        :return: API Key ID
+        """
+        row = await config_dao.get_by_api_key(db, api_key, with_data=False)
+        if not row:
+            raise errors.ForbiddenError(msg='无效的API Key')
+        if not row.status:
+            raise errors.ForbiddenError(msg='API Key已被禁用')
+        return row.api_key_id
+
+    @staticmethod
+    async def _reconstruct(db: Any, api_key_id: int, revision: int) -> Any:
+        """
+        内部方法：从最近的完整快照依次应用增量，重建指定版本的配置
+
+        :param db: 数据库会话
+        :param api_key_id: API Key ID
+        :param revision: 版本号
+        :return: 该版本的配置数据
+        """
+        chain = await config_revision_dao.get_chain(db, api_key_id, revision)
+        if not chain or chain[-1].revision != revision:
+            raise errors.NotFoundError(msg=f'未找到版本 {revision}')
+        document = chain[0].data
+        try:
+            for item in chain[1:]:
+                document = item.data if item.is_snapshot else apply_json_patch(document, item.data)
+        except JsonPatchError as e:
+            raise errors.ServerError(msg=f'版本 {revision} 重建失败: {e}')
+        return document
+
+    @staticmethod
+    @db_readonly
+    async def get_revisions(*, db: Any, api_key: str, limit: int = 20, before: int | None = None) -> dict:
+        """
+        获取配置历史版本列表
+
+        :param db: 数据库会话
+        :param api_key: API Key
+        :param limit: 每页条数
+        :param before: 游标，上一页返回的 next_cursor
+        :return: 包含历史版本摘要及下一页游标的字典
+        """
+        api_key_id = await ConfigRevisionService._get_api_key_id(db, api_key)
+        rows = await config_revision_dao.get_list(db, api_key_id, limit=limit + 1, before=before)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'revisions': [row._asdict() for row in rows],
+            'next_cursor': rows[-1].revision if has_more else None
+        }
+
+    @staticmethod
+    @db_readonly
+    async def get_revision(*, db: Any, api_key: str, revision: int) -> Any:
+        """
+        获取指定版本的配置数据
+
+        :param db: 数据库会话
+        :param api_key: API Key
+        :param revision: 版本号
+        :return: 该版本的配置数据
+        """
+        api_key_id = await ConfigRevisionService._get_api_key_id(db, api_key)
+        return await ConfigRevisionService._reconstruct(db, api_key_id, revision)
+
+    @staticmethod
+    @db_transaction
+    async def rollback(*, db: Any, api_key: str, revision: int, if_match: str | None = None) -> Any:
+        """
+        回滚到指定版本，回滚结果作为新版本写入，历史记录保持不变
+
+        :param db: 数据库会话
+        :param api_key: API Key
+        :param revision: 目标版本号
+        :param if_match: If-Match 请求头，与当前 ETag 不一致时拒绝回滚
+        :return: 回滚后的配置数据
+        """
+        api_key_id = await ConfigRevisionService._get_api_key_id(db, api_key)
+        document = await ConfigRevisionService._reconstruct(db, api_key_id, revision)
+        return await ConfigService._write_config_data(db, api_key, lambda _: document, if_match)
+
+
+config_revision_service: ConfigRevisionService = ConfigRevisionService()
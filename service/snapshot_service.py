@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import os
+import sys
+import time
+
+from typing import Any, Dict
+
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from backend.common.log import log
+from backend.plugin.option.database import async_db_session
+from backend.plugin.option.conf import option_settings
+from backend.plugin.option.crud.crud_config import config_dao
+from backend.plugin.option.service.inherit_service import config_inherit_service
+from backend.plugin.option.utils.cache import ConfigDocument, ConfigEntry, config_cache, document_cache
+from backend.plugin.option.utils.content import make_etag
+from backend.plugin.option.utils.encoding import IDENTITY, serialize_config_response
+from backend.plugin.option.utils.security import key_digest
+from backend.plugin.option.utils.snapshot import SnapshotError, SnapshotReader, SnapshotWriter
+from backend.plugin.option.utils.storage import decode_config
+
+# 视为数据库不可用、可改由快照应答的异常
+DB_UNAVAILABLE_ERRORS = (SQLAlchemyError, OSError)
+
+
+class SnapshotService:
+    """
+    配置快照
+
+    将全部启用 Key 的配置编译为只读快照文件，get-config 可直接由快照应答（serve），
+    或在数据库不可用时改由快照应答（fallback）；快照文件更新后按修改时间自动重新加载
+    """
+
+    def __init__(self, *, mode: str, path: str, reload_interval: float, verify: bool) -> None:
+        self.mode = mode
+        self.path = path
+        self.reload_interval = reload_interval
+        self.verify = verify
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+        self._reader: SnapshotReader | None = None
+        self._mtime: float | None = None
+        self._checked = 0.0
+
+    @property
+    def serving(self) -> bool:
+        return self.mode == 'serve'
+
+    @property
+    def fallback_enabled(self) -> bool:
+        return self.mode == 'fallback'
+
+    def _get_reader(self) -> SnapshotReader | None:
+        """
+        获取快照读取器，超过检查间隔时按文件修改时间重新加载
+
+        :return: 快照文件不存在或无效时返回 None
+        """
+        now = time.monotonic()
+        if self._checked and now - self._checked < self.reload_interval:
+            return self._reader
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return self._reader
+        if mtime == self._mtime:
+            return self._reader
+        try:
+            reader = SnapshotReader(self.path, verify=self.verify)
+        except (OSError, SnapshotError) as e:
+            log.error(f'加载配置快照失败: {e}')
+            return self._reader
+        previous, self._reader, self._mtime = self._reader, reader, mtime
+        if previous is not None:
+            previous.close()
+            # 快照应答的缓存条目来自旧快照
+            if self.serving:
+                config_cache.invalidate_ids(None)
+        log.info(f'已加载配置快照 {self.path}: {reader.count} 个 Key，版本 {reader.version}')
+        return reader
+
+    def refresh(self) -> None:
+        """
+        检查快照文件是否更新，更新时重新加载并清空由旧快照应答的缓存条目
+
+        serve 模式下每次读取配置前调用，缓存命中的 Key 也能换用重新编译的快照；未到检查间隔时只比较一次时间
+
+        :return:
+        """
+        self._get_reader()
+
+    def lookup(self, api_key: str) -> ConfigEntry | None:
+        """
+        从快照查找配置
+
+        :param api_key: API Key
+        :return: 快照中不存在或没有可用快照时返回 None
+        """
+        reader = self._get_reader()
+        record = reader.get(key_digest(api_key)) if reader is not None else None
+        if record is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        document = document_cache.get(record.content_hash)
+        if document is None:
+            document = ConfigDocument(json.loads(record.body)['config_data'], {IDENTITY: record.body})
+            document_cache.set(record.content_hash, document)
+        return ConfigEntry.from_document(
+            document,
+            api_key_id=record.api_key_id,
+            status=1,
+            revision=record.revision,
+            etag=make_etag(record.content_hash),
+        )
+
+    def fallback(self, api_key: str, error: BaseException) -> ConfigEntry:
+        """
+        数据库不可用时改由快照应答
+
+        :param api_key: API Key
+        :param error: 数据库异常，快照中不存在或未开启回退时重新抛出
+        :return:
+        """
+        entry = self.lookup(api_key) if self.fallback_enabled else None
+        if entry is None:
+            raise error
+        self.fallbacks += 1
+        log.warning(f'数据库不可用，由配置快照应答: {error}')
+        return entry
+
+    async def compile(self, path: str | None = None) -> Dict[str, Any]:
+        """
+        将全部启用 Key 的配置编译为快照文件
+
+        响应体与 get-config 完全一致；序列化及写文件在线程池中按批执行
+
+        :param path: 输出路径，默认 SNAPSHOT_PATH
+        :return: 快照概要
+        """
+        path = path or self.path
+        batch_size = option_settings.TRANSFER_BATCH_SIZE
+
+        def write_batch(rows: list) -> None:
+            for row in rows:
+                # 相同内容的 Key 共用同一份响应体，只序列化一次
+                body = None
+                if not writer.has_body(row.content_hash):
+                    body = serialize_config_response(decode_config(row.config_data))
+                writer.add(row.key_digest, row.api_key_id, row.revision, row.content_hash, body)
+
+        def write_resolved(items: list) -> None:
+            for key_digest, api_key_id, revision, resolution_key, document in items:
+                body = None
+                if not writer.has_body(resolution_key):
+                    body = document.bodies.get(IDENTITY) or serialize_config_response(document.config_data)
+                writer.add(key_digest, api_key_id, revision, resolution_key, body)
+
+        with SnapshotWriter(path) as writer:
+            async with async_db_session() as db:
+                rows = []
+                children = []
+                async for row in config_dao.stream_active(db, batch_size):
+                    if row.parent_key_id is not None:
+                        children.append(row)
+                        continue
+                    rows.append(row)
+                    if len(rows) >= batch_size:
+                        await run_in_threadpool(write_batch, rows)
+                        rows = []
+                if rows:
+                    await run_in_threadpool(write_batch, rows)
+                # 继承父配置的 Key 在游标读取结束后逐个解析
+                for start in range(0, len(children), batch_size):
+                    resolved = []
+                    for row in children[start:start + batch_size]:
+                        document, resolution_key, revision = await config_inherit_service.resolve(db, row)
+                        resolved.append((row.key_digest, row.api_key_id, revision, resolution_key, document))
+                    await run_in_threadpool(write_resolved, resolved)
+            info = await run_in_threadpool(writer.commit)
+        log.info(f'已生成配置快照 {info.path}: {info.count} 个 Key，{info.size} 字节')
+        return info._asdict()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        快照统计信息
+
+        :return:
+        """
+        reader = self._reader
+        return {
+            'mode': self.mode,
+            'path': self.path,
+            'loaded': reader is not None,
+            'count': reader.count if reader else 0,
+            'version': reader.version if reader else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'fallbacks': self.fallbacks,
+        }
+
+
+snapshot_service: SnapshotService = SnapshotService(
+    mode=option_settings.SNAPSHOT_MODE,
+    path=option_settings.SNAPSHOT_PATH,
+    reload_interval=option_settings.SNAPSHOT_RELOAD_INTERVAL,
+    verify=option_settings.SNAPSHOT_VERIFY,
+)
+
+
+if __name__ == '__main__':
+    # python -m backend.plugin.option.service.snapshot_service [输出路径]
+    print(asyncio.run(snapshot_service.compile(sys.argv[1] if len(sys.argv) > 1 else None)))
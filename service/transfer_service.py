@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import json
+
+from typing import Any, AsyncIterator, Dict, List, Literal, Tuple
+
+from pydantic import ValidationError
+
+from backend.common.exception import errors
+from backend.common.log import log
+from backend.plugin.option.database import async_db_session
+from backend.plugin.option.conf import option_settings
+from backend.plugin.option.crud.crud_api_key import api_key_dao
+from backend.plugin.option.crud.crud_config import config_dao
+from backend.plugin.option.schema.schema_config import ConfigTransferLine, ImportConfigError, ImportConfigResult
+from backend.plugin.option.service.bus_service import config_bus
+from backend.plugin.option.service.inherit_service import config_inherit_service
+from backend.plugin.option.service.key_filter_service import key_filter_service
+
+ImportMode = Literal['upsert', 'skip']
+ImportLine = Tuple[int, ConfigTransferLine]
+
+
+class ConfigTransferService:
+    """
+    全量配置 NDJSON 导出/导入
+
+    导出通过服务端游标分批读取并逐批写出，导入逐行解析请求体并按批写入，
+    内存占用只与批大小有关，与配置总量无关。
+    继承配置导出覆盖层及父配置的 key，导入时在父 Key 写入后恢复继承关系
+    """
+
+    @staticmethod
+    async def export_configs() -> AsyncIterator[bytes]:
+        """
+        导出全部 API Key 及配置，每行一个 JSON 对象
+
+        :return: NDJSON 字节块，每块包含一批记录
+        """
+        batch = option_settings.TRANSFER_BATCH_SIZE
+        async with async_db_session() as db:
+            lines = []
+            async for row in api_key_dao.stream_with_config(db, batch):
+                lines.append(
+                    json.dumps(
+                        {
+                            'key': row.key,
+                            'name': row.name,
+                            'status': row.status,
+                            'created_time': row.created_time.isoformat() if row.created_time else None,
+                            'revision': row.revision,
+                            'config_data': row.config_data,
+                            'parent_key': row.parent_key,
+                        },
+                        ensure_ascii=False,
+                        separators=(',', ':'),
+                    )
+                )
+                if len(lines) >= batch:
+                    yield ('\n'.join(lines) + '\n').encode('utf-8')
+                    lines = []
+            if lines:
+                yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+    @staticmethod
+    async def import_configs(*, chunks: AsyncIterator[bytes], mode: ImportMode = 'upsert') -> ImportConfigResult:
+        """
+        从 NDJSON 字节流导入配置，每批在一个事务中提交
+
+        无法解析的行记入失败明细并继续；同一批次中重复的 Key 以后出现的为准。
+        父 Key 尚未写入的继承关系暂存，全部批次写入后再恢复；无法恢复的按完整配置保留并记入失败明细。
+        某一批写入失败时已提交的批次保留，返回错误说明已处理到的行号
+
+        :param chunks: 请求体字节流
+        :param mode: upsert 覆盖已存在 Key 的名称、状态和配置，skip 跳过已存在的 Key
+        :return: 导入结果统计
+        """
+        if mode not in ('upsert', 'skip'):
+            raise errors.RequestError(msg='mode 仅支持 upsert 或 skip')
+        result = ImportConfigResult()
+        batch: Dict[str, ImportLine] = {}
+        deferred: List[ImportLine] = []
+        line_no = 0
+
+        async def flush() -> None:
+            nonlocal deferred
+            # 后出现的同一 Key 为准，丢弃其先前暂存的继承关系
+            deferred = [(no, item) for no, item in deferred if item.key not in batch]
+            try:
+                deferred.extend(await ConfigTransferService._import_batch(list(batch.values()), mode, result))
+            except (errors.BaseExceptionMixin, errors.HTTPError):
+                raise
+            except Exception as e:
+                log.error(f'配置导入失败: {e}')
+                first = min(no for no, _ in batch.values())
+                raise errors.ForbiddenError(msg=f'导入失败，第 {first} 行之前的数据已提交: {e}')
+            batch.clear()
+
+        async for line in ConfigTransferService._iter_lines(chunks):
+            line_no += 1
+            if not line.strip():
+                continue
+            try:
+                item = ConfigTransferLine.model_validate_json(line)
+            except ValidationError as e:
+                result.failed += 1
+                if len(result.errors) < option_settings.TRANSFER_MAX_ERRORS:
+                    detail = e.errors()[0]
+                    loc = '.'.join(str(part) for part in detail['loc'])
+                    result.errors.append(ImportConfigError(line=line_no, msg=f'{loc} {detail["msg"]}'.strip()))
+                continue
+            if item.key in batch:
+                batch.pop(item.key)
+            batch[item.key] = (line_no, item)
+            if len(batch) >= option_settings.TRANSFER_BATCH_SIZE:
+                await flush()
+        if batch:
+            await flush()
+        if deferred:
+            await ConfigTransferService._link_deferred(deferred, result)
+        return result
+
+    @staticmethod
+    async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """
+        将字节流切分为行，不缓存整个请求体，单行超过请求体上限时拒绝
+
+        :param chunks:
+        :return:
+        """
+        pending = b''
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            pending += chunk
+            *lines, pending = pending.split(b'\n')
+            for line in lines:
+                yield line
+            if len(pending) > option_settings.CONFIG_MAX_REQUEST_SIZE:
+                raise errors.HTTPError(code=413, msg=f'单行超过上限 {option_settings.CONFIG_MAX_REQUEST_SIZE} 字节')
+        if pending:
+            yield pending
+
+    @staticmethod
+    async def _import_batch(items: List[ImportLine], mode: ImportMode, result: ImportConfigResult) -> List[ImportLine]:
+        """
+        在一个事务中写入一批记录并恢复继承关系，提交后更新 Key 过滤器并广播变更
+
+        :param items: (行号, 记录) 列表，Key 已去重
+        :param mode:
+        :param result: 累加统计
+        :return: 父 Key 尚未写入、需暂存的记录
+        """
+        async with async_db_session() as db:
+            try:
+                existing = await api_key_dao.get_ids_by_keys(db, [item.key for _, item in items])
+                new_items = [item for _, item in items if item.key not in existing]
+                key_ids = await api_key_dao.bulk_create(
+                    db, [{'key': item.key, 'name': item.name, 'status': item.status} for item in new_items]
+                )
+                await config_dao.bulk_create(
+                    db, [(key_ids[item.key], item.config_data) for item in new_items if item.config_data is not None]
+                )
+                result.created += len(new_items)
+
+                created_ids = list(key_ids.values())
+                changed_ids = []
+                if mode == 'skip':
+                    result.skipped += len(existing)
+                elif existing:
+                    old_items = [item for _, item in items if item.key in existing]
+                    await api_key_dao.bulk_update(
+                        db,
+                        [{'id': existing[item.key], 'name': item.name, 'status': item.status} for item in old_items],
+                    )
+                    with_data = [item for item in old_items if item.config_data is not None]
+                    states = await config_dao.get_states_by_api_key_ids(db, [existing[item.key] for item in with_data])
+                    missing = [item for item in with_data if existing[item.key] not in states]
+                    await config_dao.bulk_create(db, [(existing[item.key], item.config_data) for item in missing])
+                    updated = len(missing) + await config_dao.bulk_update(
+                        db, [(states[existing[item.key]], item.config_data) for item in with_data if existing[item.key] in states]
+                    )
+                    result.updated += updated
+                    result.unchanged += len(old_items) - updated
+                    changed_ids.extend(existing[item.key] for item in old_items)
+                    # 继承被覆盖配置的 Key 一并失效
+                    changed_ids.extend(
+                        await config_inherit_service.get_descendant_ids(db, [existing[item.key] for item in old_items])
+                    )
+                # 覆盖已存在的 Key 时以记录为准，未声明父 Key 的解除继承
+                links = [
+                    (no, item)
+                    for no, item in items
+                    if item.config_data is not None
+                    and (item.parent_key is not None or (mode == 'upsert' and item.key in existing))
+                    and (mode == 'upsert' or item.key not in existing)
+                ]
+                linked_ids, deferred = await ConfigTransferService._link_parents(db, links, result, final=False)
+                changed_ids.extend(linked_ids)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+        for item in new_items:
+            key_filter_service.add(item.key)
+        if created_ids:
+            await config_bus.publish(*created_ids, created=True)
+        if changed_ids:
+            await config_bus.publish(*changed_ids)
+        return deferred
+
+    @staticmethod
+    async def _link_deferred(items: List[ImportLine], result: ImportConfigResult) -> None:
+        """
+        全部批次写入后恢复暂存的继承关系
+
+        :param items: 暂存的 (行号, 记录) 列表
+        :param result: 累加统计
+        :return:
+        """
+        async with async_db_session() as db:
+            try:
+                changed_ids, _ = await ConfigTransferService._link_parents(db, items, result, final=True)
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                log.error(f'配置继承关系恢复失败: {e}')
+                raise errors.ForbiddenError(msg=f'配置已导入，但继承关系恢复失败: {e}')
+        if changed_ids:
+            await config_bus.publish(*changed_ids)
+
+    @staticmethod
+    async def _link_parents(
+        db: Any, items: List[ImportLine], result: ImportConfigResult, *, final: bool
+    ) -> Tuple[List[int], List[ImportLine]]:
+        """
+        按父配置的 key 设置继承关系，由调用方提交事务
+
+        父 Key 未配置、形成环或超过继承层数的记录解除继承，按完整配置保留并记入失败明细
+
+        :param db: 数据库会话
+        :param items: (行号, 记录) 列表，parent_key 为空时解除继承
+        :param result: 累加统计
+        :param final: 父 Key 不存在时是否记为失败，否则返回待暂存
+        :return: (继承关系变化的 API Key ID 及其后代, 需暂存的记录)
+        """
+        if not items:
+            return [], []
+        ids = await api_key_dao.get_ids_by_keys(
+            db, list({key for _, item in items for key in (item.key, item.parent_key) if key is not None})
+        )
+        parents: Dict[int, int | None] = {}
+        lines: Dict[int, int] = {}
+        deferred = []
+        for line_no, item in items:
+            if item.key not in ids:
+                continue
+            if item.parent_key is not None and item.parent_key not in ids:
+                if final:
+                    ConfigTransferService._link_failed(result, line_no, f'父配置 Key 不存在: {item.parent_key}')
+                else:
+                    deferred.append((line_no, item))
+                continue
+            parents[ids[item.key]] = ids[item.parent_key] if item.parent_key is not None else None
+            lines[ids[item.key]] = line_no
+        await config_dao.bulk_update_parents(db, parents)
+
+        # 全部写入后再校验，同一批次内互相引用的记录也能正确判断
+        invalid = {}
+        max_depth = option_settings.CONFIG_INHERIT_MAX_DEPTH
+        for api_key_id, parent_key_id in parents.items():
+            if parent_key_id is None:
+                continue
+            chain = await config_dao.get_parents(db, parent_key_id, max_depth)
+            if not chain or chain[0].api_key_id != parent_key_id:
+                invalid[api_key_id] = '父配置 Key 未配置'
+            elif any(parent.api_key_id == api_key_id for parent in chain):
+                invalid[api_key_id] = '继承关系不能形成环'
+            elif len(chain) + await config_inherit_service.get_subtree_depth(db, api_key_id) > max_depth:
+                invalid[api_key_id] = f'配置继承不能超过 {max_depth} 层'
+        if invalid:
+            await config_dao.bulk_update_parents(db, {api_key_id: None for api_key_id in invalid})
+            for api_key_id, msg in invalid.items():
+                ConfigTransferService._link_failed(result, lines[api_key_id], msg)
+
+        changed_ids = list(parents)
+        changed_ids.extend(await config_inherit_service.get_descendant_ids(db, changed_ids))
+        return changed_ids, deferred
+
+    @staticmethod
+    def _link_failed(result: ImportConfigResult, line_no: int, msg: str) -> None:
+        """内部方法：记录无法恢复继承关系的行，该行按完整配置保留"""
+        result.failed += 1
+        if len(result.errors) < option_settings.TRANSFER_MAX_ERRORS:
+            result.errors.append(ImportConfigError(line=line_no, msg=f'{msg}，已按完整配置导入'))
+
+
+config_transfer_service: ConfigTransferService = ConfigTransferService()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+
+from datetime import datetime
+
+from backend.common.log import log
+from backend.plugin.option.database import async_db_session
+from backend.plugin.option.conf import option_settings
+from backend.plugin.option.crud.crud_api_key import api_key_dao
+from backend.plugin.option.utils.tasks import create_background_task
+from backend.utils.timezone import timezone
+
+
+class UsageService:
+    """
+    API Key 使用记录缓冲
+
+    读路径只在内存中记录最后使用时间，由后台任务定期合并为一条 UPDATE 写回，
+    避免每次读取都变成一次写事务
+    """
+
+    def __init__(self, *, interval: float, max_pending: int) -> None:
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending: dict[int, datetime] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def touch(self, api_key_id: int) -> None:
+        """
+        记录 API Key 的使用
+
+        :param api_key_id: API Key ID
+        :return:
+        """
+        self._pending[api_key_id] = timezone.now()
+        if self._task is None or self._task.done():
+            self._task = create_background_task(self._run())
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        """内部方法：后台定期刷新，任务被取消（进程退出）时最后刷新一次"""
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                await self.flush()
+        except asyncio.CancelledError:
+            await self.flush()
+            raise
+
+    async def flush(self) -> int:
+        """
+        将缓冲的使用记录写回数据库
+
+        :return: 更新的行数
+        """
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        try:
+            async with async_db_session.begin() as db:
+                return await api_key_dao.bulk_update_last_used_time(db, pending)
+        except BaseException as e:
+            # 写回失败或被取消则放回缓冲区，保留期间产生的更新记录
+            for api_key_id, used_time in pending.items():
+                self._pending.setdefault(api_key_id, used_time)
+            if not isinstance(e, Exception):
+                raise
+            log.warning(f'API Key 使用时间回写失败: {e}')
+            return 0
+
+    async def shutdown(self) -> None:
+        """停止后台任务并刷新剩余记录"""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+
+usage_service: UsageService = UsageService(
+    interval=option_settings.USAGE_FLUSH_INTERVAL,
+    max_pending=option_settings.USAGE_FLUSH_MAX_PENDING,
+)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List
+
+from backend.plugin.option.service.bus_service import config_bus
+
+
+class WatchService:
+    """
+    配置变更等待
+
+    订阅配置变更总线，本进程及其它 worker 的变更都会唤醒对应的等待者
+    """
+
+    def __init__(self) -> None:
+        self._waiters: dict[int, set[asyncio.Future]] = {}
+
+    @asynccontextmanager
+    async def watch(self, api_key_id: int) -> AsyncIterator[asyncio.Future]:
+        """
+        注册变更等待者，配置变更时 future 完成
+
+        :param api_key_id: API Key ID
+        :return:
+        """
+        config_bus.start()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(api_key_id, set()).add(waiter)
+        try:
+            yield waiter
+        finally:
+            waiters = self._waiters.get(api_key_id)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._waiters[api_key_id]
+
+    def on_change(self, api_key_ids: List[int] | None) -> None:
+        """
+        唤醒变更的 API Key 的全部等待者
+
+        :param api_key_ids: API Key ID 列表，为 None 时唤醒全部等待者重新比对版本
+        :return:
+        """
+        targets = list(self._waiters) if api_key_ids is None else api_key_ids
+        for api_key_id in targets:
+            for waiter in self._waiters.pop(api_key_id, ()):
+                if not waiter.done():
+                    waiter.set_result(None)
+
+
+watch_service: WatchService = WatchService()
+config_bus.subscribe(watch_service.on_change)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+option 插件测试
+
+在 fba 项目根目录执行 ``pytest backend/plugin/option/tests``，需安装 aiosqlite。
+与基准测试相同，在进程内挂载插件路由并连接临时 SQLite 文件，不加载 JWT 中间件，管理接口携带任意 Bearer 令牌即可访问
+"""
+import asyncio
+import os
+import tempfile
+
+from pathlib import Path
+from typing import AsyncIterator, Iterator
+
+# 测试只在本进程内运行，不依赖 Redis
+os.environ.setdefault('OPTION_BUS_BACKEND', 'none')
+
+import httpx
+import pytest
+
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from backend.common.exception.exception_handler import register_exception
+from backend.plugin.option.api.router import v1
+from backend.plugin.option.bench.bench_option import create_tables, install_session
+from backend.plugin.option.service.rate_limit_service import rate_limit_service
+
+
+@pytest.fixture(scope='session')
+def anyio_backend() -> str:
+    return 'asyncio'
+
+
+@pytest.fixture(scope='session', autouse=True)
+def database() -> Iterator[None]:
+    # 每个用例运行在各自的事件循环中，不复用连接
+    with tempfile.TemporaryDirectory() as temp_dir:
+        engine = create_async_engine(f'sqlite+aiosqlite:///{Path(temp_dir) / "test_option.db"}', poolclass=NullPool)
+        install_session(engine)
+        asyncio.run(create_tables(engine))
+        yield
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch: pytest.MonkeyPatch) -> None:
+    # 限流相关用例自行开启
+    monkeypatch.setattr(rate_limit_service, 'enabled', False)
+
+
+@pytest.fixture
+async def client() -> AsyncIterator[httpx.AsyncClient]:
+    app = FastAPI()
+    register_exception(app)
+    app.include_router(v1)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        yield client
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from typing import Any
+
+import httpx
+
+from backend.core.conf import settings
+
+BASE_PATH = f'{settings.FASTAPI_API_V1_PATH}/option'
+AUTH = {'Authorization': 'Bearer test'}
+
+
+async def save_config(client: httpx.AsyncClient, config_data: Any, name: str = 'test') -> str:
+    """
+    保存配置，返回生成的 API Key
+
+    :param client:
+    :param config_data: 配置数据
+    :param name: API Key 名称
+    :return:
+    """
+    response = await client.post(f'{BASE_PATH}/save-config', json={'name': name, 'config_data': config_data})
+    assert response.status_code == 200, response.text
+    return response.json()['data']
+
+
+async def get_api_key_id(client: httpx.AsyncClient, name: str) -> int:
+    """
+    按名称获取 API Key ID，名称需唯一
+
+    :param client:
+    :param name: API Key 名称
+    :return:
+    """
+    response = await client.get(f'{BASE_PATH}/get-sys-config-info', params={'name': name}, headers=AUTH)
+    assert response.status_code == 200, response.text
+    (config,) = response.json()['data']['configs']
+    return config['api_key_id']
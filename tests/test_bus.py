@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+
+import pytest
+
+from backend.plugin.option.service.bus_service import (
+    ConfigBus,
+    ConfigBusBackend,
+    DBPollingConfigBusBackend,
+    RedisConfigBusBackend,
+)
+
+pytestmark = pytest.mark.anyio
+
+CHANNEL = 'test:option:config_changed'
+
+
+class LocalRedis:
+    """redis.asyncio.Redis 发布/订阅接口的进程内替身"""
+
+    def __init__(self) -> None:
+        self.subscribers: Dict[str, List[asyncio.Queue]] = {}
+
+    async def publish(self, channel: str, message: str) -> int:
+        queues = self.subscribers.get(channel, [])
+        for queue in queues:
+            queue.put_nowait({'type': 'message', 'channel': channel, 'data': message.encode()})
+        return len(queues)
+
+    def pubsub(self) -> 'LocalPubSub':
+        return LocalPubSub(self)
+
+
+class LocalPubSub:
+    def __init__(self, redis: LocalRedis) -> None:
+        self.redis = redis
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.channels: List[str] = []
+
+    async def subscribe(self, *channels: str) -> None:
+        for channel in channels:
+            self.redis.subscribers.setdefault(channel, []).append(self.queue)
+            self.channels.append(channel)
+            self.queue.put_nowait({'type': 'subscribe', 'channel': channel, 'data': 1})
+
+    async def listen(self) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            yield await self.queue.get()
+
+    async def reset(self) -> None:
+        for channel in self.channels:
+            self.redis.subscribers[channel].remove(self.queue)
+        self.channels.clear()
+
+
+class Recorder:
+    """记录总线分发给处理函数的 API Key ID"""
+
+    def __init__(self, subscribe: Callable[[Callable], None]) -> None:
+        self.calls: List[List[int] | None] = []
+        subscribe(self.calls.append)
+
+    @property
+    def ids(self) -> List[int]:
+        return sorted(i for call in self.calls if call for i in call)
+
+
+async def wait_until(predicate: Callable[[], bool], timeout: float = 5) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, 'timed out'
+        await asyncio.sleep(0.01)
+
+
+async def check_delivery(publisher: ConfigBus, subscriber: ConfigBus, settle: Callable[[], Awaitable[None]]) -> None:
+    """
+    发布方立即在本进程分发，订阅方由后端收到，发布方不重复处理自己的变更；
+    新建 Key 的变更只分发给其它 worker 的新建处理函数
+    """
+    published = Recorder(publisher.subscribe)
+    received = Recorder(subscriber.subscribe)
+    published_created = Recorder(publisher.subscribe_created)
+    received_created = Recorder(subscriber.subscribe_created)
+    publisher.start()
+    subscriber.start()
+    try:
+        await settle()
+        await publisher.publish(1, 2)
+        assert published.calls == [[1, 2]]
+        await wait_until(lambda: received.ids == [1, 2])
+        await subscriber.publish(3)
+        await wait_until(lambda: published.ids == [1, 2, 3])
+        assert received.ids == [1, 2, 3]
+        assert received_created.calls == []
+
+        await publisher.publish(4, created=True)
+        await wait_until(lambda: received_created.calls == [[4]])
+        assert received.ids == [1, 2, 3, 4]
+        assert published.ids == [1, 2, 3, 4]
+        assert published_created.calls == []
+        assert None not in published.calls + received.calls
+    finally:
+        await publisher.shutdown()
+        await subscriber.shutdown()
+
+
+async def test_none_backend_dispatches_locally() -> None:
+    bus = ConfigBus(None)
+    recorder = Recorder(bus.subscribe)
+    created = Recorder(bus.subscribe_created)
+    bus.start()
+    await bus.publish(1, 2)
+    await bus.publish(3, created=True)
+    assert recorder.calls == [[1, 2], [3]]
+    assert created.calls == []
+    await bus.shutdown()
+
+
+async def test_redis_backend() -> None:
+    redis = LocalRedis()
+    publisher = ConfigBus(RedisConfigBusBackend(redis, CHANNEL))
+    subscriber = ConfigBus(RedisConfigBusBackend(redis, CHANNEL))
+
+    async def settle() -> None:
+        await wait_until(lambda: len(redis.subscribers.get(CHANNEL, [])) == 2)
+
+    await check_delivery(publisher, subscriber, settle)
+
+
+async def test_redis_backend_skips_malformed_messages() -> None:
+    redis = LocalRedis()
+    subscriber = ConfigBus(RedisConfigBusBackend(redis, CHANNEL))
+    received = Recorder(subscriber.subscribe)
+    subscriber.start()
+    try:
+        await wait_until(lambda: bool(redis.subscribers.get(CHANNEL)))
+        await redis.publish(CHANNEL, 'not json')
+        await redis.publish(CHANNEL, '{"origin": "other"}')
+        await redis.publish(CHANNEL, '{"origin": "other", "ids": [4]}')
+        await wait_until(lambda: received.ids == [4])
+    finally:
+        await subscriber.shutdown()
+
+
+async def test_db_polling_backend() -> None:
+    def backend() -> ConfigBusBackend:
+        return DBPollingConfigBusBackend(interval=0.01, batch=100, lookback=10, retention=86400)
+
+    async def settle() -> None:
+        # 轮询后端启动时以当前最大序号为游标，之前写入的变更不处理，等待双方完成首次读取
+        await asyncio.sleep(0.2)
+
+    await check_delivery(ConfigBus(backend()), ConfigBus(backend()), settle)
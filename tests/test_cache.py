@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from backend.plugin.option.utils.cache import ConfigCache, ConfigEntry, TTLLRUCache
+
+
+def entry(api_key_id: int) -> ConfigEntry:
+    return ConfigEntry(api_key_id=api_key_id, status=1, config_data={'id': api_key_id})
+
+
+def test_invalidating_other_key_keeps_fill() -> None:
+    cache: TTLLRUCache[str, int] = TTLLRUCache(maxsize=10, ttl=60)
+    generation = cache.generation
+    cache.invalidate('b')
+    cache.set('a', 1, generation=generation)
+    assert cache.get('a') == 1
+
+
+def test_invalidating_same_key_drops_fill() -> None:
+    cache: TTLLRUCache[str, int] = TTLLRUCache(maxsize=10, ttl=60)
+    generation = cache.generation
+    cache.invalidate('a')
+    cache.set('a', 1, generation=generation)
+    assert cache.get('a') is None
+    cache.set('a', 2, generation=cache.generation)
+    assert cache.get('a') == 2
+
+
+def test_clear_drops_every_fill() -> None:
+    cache: TTLLRUCache[str, int] = TTLLRUCache(maxsize=10, ttl=60)
+    generation = cache.generation
+    cache.clear()
+    cache.set('a', 1, generation=generation)
+    assert cache.get('a') is None
+    cache.set('a', 2, generation=cache.generation)
+    assert cache.get('a') == 2
+
+
+def test_evicted_stamps_drop_older_fills() -> None:
+    cache: TTLLRUCache[int, int] = TTLLRUCache(maxsize=10, ttl=60)
+    generation = cache.generation
+    for key in range(cache._stamp_limit + 1):
+        cache.invalidate(key)
+    # 最早的失效记录已被淘汰，无法确认回源期间 Key 是否失效过
+    cache.set(-1, 1, generation=generation)
+    assert cache.get(-1) is None
+    cache.set(-1, 2, generation=cache.generation)
+    assert cache.get(-1) == 2
+
+
+def test_invalidate_uncached_id_drops_only_its_fill() -> None:
+    cache = ConfigCache(maxsize=10, ttl=60)
+    generation = cache.generation
+    cache.invalidate_ids([1])
+    cache.set('key-1', entry(1), generation=generation)
+    cache.set('key-2', entry(2), generation=generation)
+    assert cache.get('key-1') is None
+    assert cache.get('key-2') is not None
+
+
+def test_invalidate_cached_id() -> None:
+    cache = ConfigCache(maxsize=10, ttl=60)
+    cache.set('key-1', entry(1))
+    cache.invalidate_ids([1])
+    assert cache.get('key-1') is None
+    cache.set('key-1', entry(1), generation=cache.generation)
+    cache.invalidate_ids(None)
+    assert len(cache) == 0
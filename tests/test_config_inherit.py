@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import uuid
+
+from typing import Any, Tuple
+
+import httpx
+import pytest
+
+from backend.plugin.option.conf import option_settings
+from backend.plugin.option.tests.helpers import AUTH, BASE_PATH, get_api_key_id, save_config
+
+pytestmark = pytest.mark.anyio
+
+
+async def create(client: httpx.AsyncClient, config_data: Any) -> Tuple[str, int]:
+    name = f'inherit-{uuid.uuid4().hex}'
+    api_key = await save_config(client, config_data, name=name)
+    return api_key, await get_api_key_id(client, name)
+
+
+async def set_parent(client: httpx.AsyncClient, api_key_id: int, parent_key_id: int) -> httpx.Response:
+    return await client.put(
+        f'{BASE_PATH}/api-key/{api_key_id}/parent', params={'parent_key_id': parent_key_id}, headers=AUTH
+    )
+
+
+async def test_set_parent_keeps_resolved_config(client: httpx.AsyncClient) -> None:
+    _, parent_id = await create(client, {'a': 1, 'b': 1})
+    api_key, child_id = await create(client, {'a': 1, 'b': 2})
+    response = await set_parent(client, child_id, parent_id)
+    assert response.status_code == 200, response.text
+    assert response.json()['data']['overlay'] == {'b': 2}
+    response = await client.get(f'{BASE_PATH}/get-config', headers={'api-key': api_key})
+    assert response.json()['config_data'] == {'a': 1, 'b': 2}
+
+
+async def test_self_parent_returns_400(client: httpx.AsyncClient) -> None:
+    _, api_key_id = await create(client, {'a': 1})
+    response = await set_parent(client, api_key_id, api_key_id)
+    assert response.status_code == 400
+    assert response.json()['msg'] == '不能继承自身'
+
+
+async def test_cycle_returns_400(client: httpx.AsyncClient) -> None:
+    _, parent_id = await create(client, {'a': 1})
+    _, child_id = await create(client, {'a': 1})
+    assert (await set_parent(client, child_id, parent_id)).status_code == 200
+    response = await set_parent(client, parent_id, child_id)
+    assert response.status_code == 400
+    assert response.json()['msg'] == '继承关系不能形成环'
+
+
+async def test_depth_limit_returns_400(client: httpx.AsyncClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(option_settings, 'CONFIG_INHERIT_MAX_DEPTH', 1)
+    _, root_id = await create(client, {'a': 1})
+    _, middle_id = await create(client, {'a': 1})
+    _, leaf_id = await create(client, {'a': 1})
+    assert (await set_parent(client, middle_id, root_id)).status_code == 200
+    response = await set_parent(client, leaf_id, middle_id)
+    assert response.status_code == 400
+    assert '1 层' in response.json()['msg']
+
+
+async def test_null_overlay_returns_400(client: httpx.AsyncClient) -> None:
+    _, parent_id = await create(client, {'a': 1})
+    _, child_id = await create(client, {'a': None})
+    response = await set_parent(client, child_id, parent_id)
+    assert response.status_code == 400
+    assert 'null' in response.json()['msg']
+
+
+async def test_delete_parent_with_children_returns_409(client: httpx.AsyncClient) -> None:
+    _, parent_id = await create(client, {'a': 1})
+    _, child_id = await create(client, {'a': 1})
+    assert (await set_parent(client, child_id, parent_id)).status_code == 200
+    response = await client.delete(f'{BASE_PATH}/delete-key-by-id/{parent_id}', headers=AUTH)
+    assert response.status_code == 409
+    assert response.json()['msg'] == '有 1 个 Key 继承该配置，请先解除继承'
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import pytest
+
+from backend.plugin.option.utils.json_patch import JsonPatchError, JsonPatchTestFailed, apply_json_patch, diff_json
+
+
+def check(value: object, expected: object) -> None:
+    apply_json_patch({'a': value}, [{'op': 'test', 'path': '/a', 'value': expected}])
+
+
+@pytest.mark.parametrize(
+    ('value', 'expected'),
+    [(1, 1.0), (1.0, 1), ([1, {'b': 2.0}], [1.0, {'b': 2}]), (0, -0.0)],
+)
+def test_numbers_compare_numerically(value: object, expected: object) -> None:
+    check(value, expected)
+
+
+@pytest.mark.parametrize(('value', 'expected'), [(1, True), (True, 1), (0, False), (1, '1'), (None, 0), ({'b': 1}, [1])])
+def test_types_stay_distinct(value: object, expected: object) -> None:
+    with pytest.raises(JsonPatchTestFailed):
+        check(value, expected)
+
+
+def test_diff_keeps_number_type() -> None:
+    assert diff_json({'a': 1}, {'a': 1.0}) == [{'op': 'replace', 'path': '/a', 'value': 1.0}]
+
+
+@pytest.mark.parametrize(
+    'operation',
+    [{'op': 'add', 'path': 1, 'value': 1}, {'op': 'move', 'from': None, 'path': '/a'}, {'op': 'replace', 'path': '/a/²', 'value': 1}],
+)
+def test_invalid_operations(operation: dict) -> None:
+    with pytest.raises(JsonPatchError):
+        apply_json_patch({'a': [1]}, [operation])
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import httpx
+import pytest
+
+from backend.plugin.option.tests.helpers import BASE_PATH, save_config
+
+pytestmark = pytest.mark.anyio
+
+JSON_PATCH = {'Content-Type': 'application/json-patch+json'}
+
+
+async def patch(client: httpx.AsyncClient, api_key: str, operations: list) -> httpx.Response:
+    return await client.patch(
+        f'{BASE_PATH}/update-config', headers={'api-key': api_key, **JSON_PATCH}, json=operations
+    )
+
+
+async def test_json_patch_applies(client: httpx.AsyncClient) -> None:
+    api_key = await save_config(client, {'a': 1, 'b': [1, 2]})
+    response = await patch(client, api_key, [{'op': 'replace', 'path': '/a', 'value': 2}, {'op': 'add', 'path': '/b/-', 'value': 3}])
+    assert response.status_code == 200
+    assert response.json()['data'] == {'a': 2, 'b': [1, 2, 3]}
+
+
+async def test_failed_test_op_returns_409(client: httpx.AsyncClient) -> None:
+    api_key = await save_config(client, {'a': 1})
+    response = await patch(client, api_key, [{'op': 'test', 'path': '/a', 'value': 2}])
+    assert response.status_code == 409
+    assert response.json()['msg']
+
+
+async def test_invalid_patch_returns_400(client: httpx.AsyncClient) -> None:
+    api_key = await save_config(client, {'a': 1})
+    response = await patch(client, api_key, [{'op': 'remove', 'path': '/missing'}])
+    assert response.status_code == 400
+    assert response.json()['msg']
+
+    response = await patch(client, api_key, [{'op': 'move', 'path': '/a'}])
+    assert response.status_code == 400
+
+
+async def test_failed_patch_keeps_config(client: httpx.AsyncClient) -> None:
+    api_key = await save_config(client, {'a': 1})
+    response = await patch(client, api_key, [{'op': 'replace', 'path': '/a', 'value': 2}, {'op': 'test', 'path': '/a', 'value': 1}])
+    assert response.status_code == 409
+    response = await client.get(f'{BASE_PATH}/get-config', headers={'api-key': api_key})
+    assert response.json()['config_data'] == {'a': 1}
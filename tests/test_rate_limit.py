@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import httpx
+import pytest
+
+from backend.plugin.option.service.rate_limit_service import rate_limit_service
+from backend.plugin.option.tests.helpers import BASE_PATH, save_config
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def rate_limited(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(rate_limit_service, 'enabled', True)
+    monkeypatch.setattr(rate_limit_service, 'shared', None)
+    monkeypatch.setattr(rate_limit_service, 'rate', 1)
+    monkeypatch.setattr(rate_limit_service, 'burst', 1)
+
+
+async def get_configs(client: httpx.AsyncClient, api_keys: list) -> dict:
+    response = await client.post(f'{BASE_PATH}/get-configs', json={'api_keys': api_keys})
+    assert response.status_code == 200, response.text
+    return response.json()['configs']
+
+
+@pytest.mark.usefixtures('rate_limited')
+async def test_get_config_returns_429(client: httpx.AsyncClient) -> None:
+    api_key = await save_config(client, {'a': 1})
+    assert (await client.get(f'{BASE_PATH}/get-config', headers={'api-key': api_key})).status_code == 200
+    response = await client.get(f'{BASE_PATH}/get-config', headers={'api-key': api_key})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+
+@pytest.mark.usefixtures('rate_limited')
+async def test_get_configs_charges_each_key(client: httpx.AsyncClient) -> None:
+    first = await save_config(client, {'a': 1})
+    second = await save_config(client, {'b': 2})
+    configs = await get_configs(client, [first, second])
+    assert configs[first]['config_data'] == {'a': 1}
+    assert configs[second]['config_data'] == {'b': 2}
+
+    configs = await get_configs(client, [first, second])
+    assert configs[first]['error'] == '请求过于频繁，请稍后重试'
+    assert configs[second]['error'] == '请求过于频繁，请稍后重试'
+    # 批量读取与 get-config 共用读取配额
+    assert (await client.get(f'{BASE_PATH}/get-config', headers={'api-key': first})).status_code == 429
+
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import httpx
+import pytest
+
+from backend.plugin.option.conf import option_settings
+from backend.plugin.option.tests.helpers import AUTH, BASE_PATH
+
+pytestmark = pytest.mark.anyio
+
+
+async def save_configs(client: httpx.AsyncClient, configs: list) -> httpx.Response:
+    return await client.post(f'{BASE_PATH}/save-configs', json={'configs': configs}, headers=AUTH)
+
+
+async def test_save_configs(client: httpx.AsyncClient) -> None:
+    response = await save_configs(client, [{'name': 'batch-a', 'config_data': {'a': 1}}, {'name': 'batch-b', 'config_data': [1]}])
+    assert response.status_code == 200, response.text
+    saved = response.json()['data']
+    assert [item['name'] for item in saved] == ['batch-a', 'batch-b']
+    response = await client.get(f'{BASE_PATH}/get-config', headers={'api-key': saved[1]['api_key']})
+    assert response.json()['config_data'] == [1]
+
+
+async def test_too_many_configs_returns_400(client: httpx.AsyncClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(option_settings, 'BATCH_MAX_SAVE', 1)
+    response = await save_configs(client, [{'name': 'batch', 'config_data': {}}] * 2)
+    assert response.status_code == 400
+    assert response.json()['msg'] == '单次最多保存 1 个配置'
+
+
+async def test_oversized_config_returns_413(client: httpx.AsyncClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(option_settings, 'CONFIG_MAX_SIZE', 64)
+    response = await save_configs(client, [{'name': 'batch', 'config_data': {}}, {'name': 'batch', 'config_data': 'x' * 100}])
+    assert response.status_code == 413
+
+
+async def test_oversized_body_returns_413(client: httpx.AsyncClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(option_settings, 'CONFIG_MAX_REQUEST_SIZE', 64)
+    response = await save_configs(client, [{'name': 'batch', 'config_data': 'x' * 100}])
+    assert response.status_code == 413
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import pytest
+
+from backend.plugin.option.service.metrics_service import _current_method
+from backend.plugin.option.service.profile_service import _current_profile, profile_service
+from backend.plugin.option.utils.tasks import create_background_task
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_background_task_does_not_inherit_method() -> None:
+    async def current_method() -> str:
+        return _current_method.get()
+
+    token = _current_method.set('ConfigService.get_config')
+    try:
+        task = create_background_task(current_method())
+    finally:
+        _current_method.reset(token)
+    assert await task == 'other'
+
+
+async def test_background_task_does_not_inherit_profile(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def current_profile() -> object:
+        return _current_profile.get()
+
+    monkeypatch.setattr(profile_service, 'enabled', True)
+    token = profile_service.begin('/get-config', 'GET', None)
+    try:
+        task = create_background_task(current_profile())
+    finally:
+        profile_service.finish(token, 200)
+    assert await task is None
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import json
+import uuid
+
+import httpx
+import pytest
+
+from backend.common.exception import errors
+from backend.plugin.option.service.transfer_service import ConfigTransferService
+from backend.plugin.option.tests.helpers import AUTH, BASE_PATH
+
+pytestmark = pytest.mark.anyio
+
+
+def ndjson(*lines: dict) -> bytes:
+    return ''.join(json.dumps(line) + '\n' for line in lines).encode()
+
+
+async def import_configs(client: httpx.AsyncClient, body: bytes) -> httpx.Response:
+    return await client.post(
+        f'{BASE_PATH}/import-configs', content=body, headers={**AUTH, 'Content-Type': 'application/x-ndjson'}
+    )
+
+
+async def test_import_configs(client: httpx.AsyncClient) -> None:
+    key = f'wilmar-{uuid.uuid4().hex}'
+    response = await import_configs(client, ndjson({'key': key, 'name': 'imported', 'status': 1, 'config_data': {'a': 1}}))
+    assert response.status_code == 200, response.text
+    assert response.json()['data']['created'] == 1
+    response = await client.get(f'{BASE_PATH}/get-config', headers={'api-key': key})
+    assert response.json()['config_data'] == {'a': 1}
+
+
+async def test_invalid_line_is_reported(client: httpx.AsyncClient) -> None:
+    response = await import_configs(client, b'{"key": 1}\n')
+    assert response.status_code == 200
+    data = response.json()['data']
+    assert data['failed'] == 1
+    assert data['errors'][0]['line'] == 1
+
+
+@pytest.mark.parametrize(
+    ('error', 'status'),
+    [(errors.RequestError(msg='bad'), 400), (errors.ConflictError(msg='bad'), 409), (errors.ForbiddenError(msg='bad'), 403)],
+)
+async def test_batch_error_keeps_status(
+    client: httpx.AsyncClient, monkeypatch: pytest.MonkeyPatch, error: Exception, status: int
+) -> None:
+    async def import_batch(*args, **kwargs):
+        raise error
+
+    monkeypatch.setattr(ConfigTransferService, '_import_batch', staticmethod(import_batch))
+    key = f'wilmar-{uuid.uuid4().hex}'
+    response = await import_configs(client, ndjson({'key': key, 'name': 'imported', 'status': 1, 'config_data': {}}))
+    assert response.status_code == status
+    assert response.json()['msg'] == 'bad'
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+
+import httpx
+import pytest
+
+from backend.plugin.option.service.config_service import ConfigService
+from backend.plugin.option.tests.helpers import BASE_PATH, save_config
+
+pytestmark = pytest.mark.anyio
+
+
+async def watch(client: httpx.AsyncClient, api_key: str, revision: int, timeout: float = 0.2) -> httpx.Response:
+    return await client.get(
+        f'{BASE_PATH}/watch-config', headers={'api-key': api_key}, params={'revision': revision, 'timeout': timeout}
+    )
+
+
+async def test_returns_changed_config(client: httpx.AsyncClient) -> None:
+    api_key = await save_config(client, {'a': 1})
+    response = await watch(client, api_key, 0)
+    assert response.status_code == 200
+    assert response.json() == {'config_data': {'a': 1}, 'revision': 1}
+
+
+async def test_times_out_without_change(client: httpx.AsyncClient) -> None:
+    api_key = await save_config(client, {'a': 1})
+    assert (await watch(client, api_key, 1)).status_code == 304
+
+
+async def test_wakes_on_update(client: httpx.AsyncClient) -> None:
+    api_key = await save_config(client, {'a': 1})
+    waiting = asyncio.ensure_future(watch(client, api_key, 1, timeout=5))
+    await asyncio.sleep(0.1)
+    response = await client.put(f'{BASE_PATH}/update-config', headers={'api-key': api_key}, json={'config_data': {'a': 2}})
+    assert response.status_code == 200
+    response = await waiting
+    assert response.status_code == 200
+    assert response.json() == {'config_data': {'a': 2}, 'revision': 2}
+
+
+async def test_reads_config_once_when_cached(client: httpx.AsyncClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    api_key = await save_config(client, {'a': 1})
+    assert (await client.get(f'{BASE_PATH}/get-config', headers={'api-key': api_key})).status_code == 200
+    get_config = ConfigService.get_config
+    calls = []
+
+    async def counting_get_config(**kwargs):
+        calls.append(kwargs['api_key'])
+        return await get_config(**kwargs)
+
+    monkeypatch.setattr(ConfigService, 'get_config', staticmethod(counting_get_config))
+    assert (await watch(client, api_key, 0)).status_code == 200
+    assert calls == [api_key]
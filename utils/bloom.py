@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import math
+
+
+class BloomFilter:
+    """
+    基于 SHA-256 摘要的布隆过滤器
+
+    元素本身即为均匀分布的摘要，直接切分摘要做双重哈希，无需再次计算哈希
+    """
+
+    def __init__(self, *, capacity: int, error_rate: float) -> None:
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _indexes(self, digest: bytes):
+        """内部方法：由摘要生成各哈希位置"""
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:16], 'big') | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, digest: bytes) -> None:
+        """
+        添加元素
+
+        :param digest: 32 字节摘要
+        :return:
+        """
+        for index in self._indexes(digest):
+            self._bits[index >> 3] |= 1 << (index & 7)
+        self.count += 1
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self._bits[index >> 3] & (1 << (index & 7)) for index in self._indexes(digest))
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Generic, Hashable, TypeVar
+
+from backend.plugin.option.conf import option_settings
+from backend.plugin.option.utils.encoding import IDENTITY, encode_body, serialize_config_response
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class TTLLRUCache(Generic[K, V]):
+    """
+    有界的 TTL + LRU 进程内缓存
+
+    事件循环内单线程访问，无需加锁；maxsize 或 ttl 小于等于 0 时缓存关闭
+    """
+
+    def __init__(self, *, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        # 失效时钟：每次失效递增，并记录各 Key 最近一次失效的时刻；记录数超过上限时淘汰最早的记录，
+        # 并把其时刻并入下限，回源开始于下限之前的写入一律放弃
+        self._clock = 0
+        self._floor = 0
+        self._stamps: OrderedDict[K, int] = OrderedDict()
+        self._stamp_limit = max(maxsize, 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    @property
+    def generation(self) -> int:
+        """
+        当前失效时钟
+
+        回源前记录该值并在写入时传回，期间同一 Key 失效过则放弃写入，其它 Key 的失效不影响本次写入
+        """
+        return self._clock
+
+    def get(self, key: K) -> V | None:
+        """
+        获取缓存
+
+        :param key:
+        :return:
+        """
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self._on_remove(key, value)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: K) -> V | None:
+        """
+        读取未过期的缓存，不计入命中统计，也不调整淘汰顺序
+
+        :param key:
+        :return:
+        """
+        item = self._data.get(key)
+        if item is None or item[0] <= time.monotonic():
+            return None
+        return item[1]
+
+    def set(self, key: K, value: V, *, generation: int | None = None) -> None:
+        """
+        写入缓存
+
+        :param key:
+        :param value:
+        :param generation: 回源前的失效时钟，期间该 Key 失效过则放弃写入
+        :return:
+        """
+        if not self.enabled:
+            return
+        if generation is not None and self._is_stale(self._stamps, key, generation):
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            evicted_key, (_, evicted) = self._data.popitem(last=False)
+            self._on_remove(evicted_key, evicted)
+            self.evictions += 1
+
+    def invalidate(self, key: K) -> None:
+        """
+        使指定缓存失效
+
+        :param key:
+        :return:
+        """
+        self._stamp(self._stamps, key)
+        item = self._data.pop(key, None)
+        if item is not None:
+            self._on_remove(key, item[1])
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._clock += 1
+        self._floor = self._clock
+        self._stamps.clear()
+        self.invalidations += len(self._data)
+        for key, (_, value) in self._data.items():
+            self._on_remove(key, value)
+        self._data.clear()
+
+    def _stamp(self, stamps: OrderedDict[Any, int], key: Any) -> None:
+        """内部方法：推进失效时钟并记录 Key 的失效时刻"""
+        self._clock += 1
+        stamps[key] = self._clock
+        stamps.move_to_end(key)
+        while len(stamps) > self._stamp_limit:
+            _, stamp = stamps.popitem(last=False)
+            self._floor = max(self._floor, stamp)
+
+    def _is_stale(self, stamps: OrderedDict[Any, int], key: Any, generation: int) -> bool:
+        """内部方法：回源开始后 Key 是否失效过，无法确认时视为失效"""
+        return generation < self._floor or stamps.get(key, 0) > generation
+
+    def _on_remove(self, key: K, value: V) -> None:
+        """条目被淘汰、过期或失效时调用，子类可覆盖以维护索引"""
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        缓存统计信息
+
+        :return:
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+
+@dataclass(slots=True)
+class ConfigDocument:
+    """按内容哈希共享的已解析配置数据，及其序列化、压缩后的 get-config 响应体"""
+
+    config_data: Any
+    bodies: dict[str, bytes] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class ConfigEntry:
+    """
+    已解析的 API Key 状态及配置数据
+
+    由 ConfigDocument 构建时与其共享配置数据及响应体，相同内容的 Key 只解析、序列化和压缩一次
+    """
+
+    api_key_id: int
+    status: int
+    config_data: Any = None
+    revision: int = 0
+    etag: str | None = None
+    rate_limit: int | None = None
+    rate_burst: int | None = None
+    max_config_size: int | None = None
+    # 为 False 时只含状态、ETag、限流配额及大小上限，配置数据在需要时再加载
+    loaded: bool = True
+    _bodies: dict[str, bytes] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_document(
+        cls,
+        document: ConfigDocument,
+        *,
+        api_key_id: int,
+        status: int,
+        revision: int,
+        etag: str | None,
+        rate_limit: int | None = None,
+        rate_burst: int | None = None,
+        max_config_size: int | None = None,
+    ) -> 'ConfigEntry':
+        return cls(
+            api_key_id=api_key_id,
+            status=status,
+            config_data=document.config_data,
+            revision=revision,
+            etag=etag,
+            rate_limit=rate_limit,
+            rate_burst=rate_burst,
+            max_config_size=max_config_size,
+            _bodies=document.bodies,
+        )
+
+    @property
+    def body(self) -> bytes:
+        """序列化后的 get-config 响应体，每个版本只序列化一次"""
+        body = self._bodies.get(IDENTITY)
+        if body is None:
+            body = self._bodies[IDENTITY] = serialize_config_response(self.config_data)
+        return body
+
+    def get_encoded(self, encoding: str) -> bytes | None:
+        """
+        获取已缓存的压缩响应体
+
+        :param encoding: 压缩编码
+        :return: 尚未压缩时返回 None
+        """
+        return self._bodies.get(encoding)
+
+    def encode(self, encoding: str) -> bytes:
+        """
+        压缩响应体并缓存
+
+        :param encoding: 压缩编码
+        :return:
+        """
+        encoded = self._bodies.get(encoding)
+        if encoded is None:
+            encoded = self._bodies[encoding] = encode_body(self.body, encoding)
+        return encoded
+
+
+class ConfigCache(TTLLRUCache[str, ConfigEntry]):
+    """
+    按 API Key 缓存配置，并维护 API Key ID 到 Key 的反向索引，用于按 ID 失效
+
+    未缓存的 ID 失效时无法得知其 Key，按 ID 记录失效时刻，写入时同时检查条目的 API Key ID
+    """
+
+    def __init__(self, *, maxsize: int, ttl: float) -> None:
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._keys_by_id: dict[int, str] = {}
+        self._id_stamps: OrderedDict[int, int] = OrderedDict()
+
+    def set(self, key: str, value: ConfigEntry, *, generation: int | None = None) -> None:
+        if generation is not None and self._is_stale(self._id_stamps, value.api_key_id, generation):
+            return
+        super().set(key, value, generation=generation)
+        if key in self._data:
+            self._keys_by_id[value.api_key_id] = key
+
+    def clear(self) -> None:
+        super().clear()
+        self._id_stamps.clear()
+
+    def _on_remove(self, key: str, value: ConfigEntry) -> None:
+        if self._keys_by_id.get(value.api_key_id) == key:
+            del self._keys_by_id[value.api_key_id]
+
+    def invalidate_ids(self, api_key_ids: list[int] | None) -> None:
+        """
+        按 API Key ID 使缓存失效
+
+        :param api_key_ids: API Key ID 列表，为 None 时清空全部缓存
+        :return:
+        """
+        if api_key_ids is None:
+            self.clear()
+            return
+        for api_key_id in api_key_ids:
+            self._stamp(self._id_stamps, api_key_id)
+            key = self._keys_by_id.get(api_key_id)
+            if key is not None:
+                self.invalidate(key)
+
+
+config_cache: ConfigCache = ConfigCache(
+    maxsize=option_settings.CONFIG_CACHE_MAXSIZE,
+    ttl=option_settings.CONFIG_CACHE_TTL,
+)
+document_cache: TTLLRUCache[str, ConfigDocument] = TTLLRUCache(
+    maxsize=option_settings.DOCUMENT_CACHE_MAXSIZE,
+    ttl=option_settings.DOCUMENT_CACHE_TTL,
+)
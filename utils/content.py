@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+
+from typing import Any
+
+
+def canonical_json(data: Any) -> bytes:
+    """
+    配置数据的规范化 JSON 序列化（键排序、紧凑、UTF-8）
+
+    :param data: 配置数据
+    :return:
+    """
+    return json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def content_hash(data: Any) -> str:
+    """
+    计算配置数据的内容哈希
+
+    :param data: 配置数据
+    :return: SHA-256 十六进制摘要
+    """
+    return digest(canonical_json(data))
+
+
+def digest(body: bytes) -> str:
+    """
+    计算规范化 JSON 的内容哈希
+
+    :param body: canonical_json 的结果
+    :return: SHA-256 十六进制摘要
+    """
+    return hashlib.sha256(body).hexdigest()
+
+
+def make_etag(hash_value: str) -> str:
+    """
+    由内容哈希生成强 ETag
+
+    :param hash_value: 内容哈希
+    :return:
+    """
+    return f'"{hash_value}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str | None) -> bool:
+    """
+    判断 If-None-Match 请求头是否命中 ETag
+
+    :param if_none_match: If-None-Match 请求头
+    :param etag: 当前 ETag
+    :return:
+    """
+    if not if_none_match or not etag:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
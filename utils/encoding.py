@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import gzip
+import json
+
+from typing import Any
+
+from backend.plugin.option.conf import option_settings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+IDENTITY = 'identity'
+
+
+def serialize_config_response(config_data: Any) -> bytes:
+    """
+    序列化 get-config 响应体，与 ConfigDataResponse 的 JSON 输出一致
+
+    :param config_data: 配置数据
+    :return:
+    """
+    return json.dumps({'config_data': config_data}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def supported_encodings() -> tuple[str, ...]:
+    """
+    按优先级排列的可用压缩编码
+
+    :return:
+    """
+    return ('zstd', 'gzip') if zstandard is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding: str | None, size: int) -> str:
+    """
+    根据 Accept-Encoding 选择响应编码
+
+    :param accept_encoding: Accept-Encoding 请求头
+    :param size: 未压缩响应体字节数，小于阈值时不压缩
+    :return: 'zstd'、'gzip' 或 'identity'
+    """
+    if not accept_encoding or size < option_settings.RESPONSE_COMPRESS_MIN_SIZE:
+        return IDENTITY
+    accepted = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for coding in supported_encodings():
+        if accepted.get(coding, accepted.get('*', 0.0)) > 0:
+            return coding
+    return IDENTITY
+
+
+def encode_body(body: bytes, encoding: str) -> bytes:
+    """
+    压缩响应体
+
+    :param body: 未压缩响应体
+    :param encoding: 'zstd'、'gzip' 或 'identity'
+    :return:
+    """
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=option_settings.RESPONSE_GZIP_LEVEL, mtime=0)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=option_settings.RESPONSE_ZSTD_LEVEL).compress(body)
+    return body
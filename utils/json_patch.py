@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import copy
+
+from typing import Any, List
+
+from backend.plugin.option.utils.json_pointer import (
+    JsonPointerError,
+    JsonPointerNotFound,
+    array_index,
+    escape_token,
+    parse_pointer,
+    resolve_pointer,
+)
+
+
+class JsonPatchError(ValueError):
+    """补丁格式错误或无法应用"""
+
+
+class JsonPatchTestFailed(JsonPatchError):
+    """JSON Patch test 操作比对失败"""
+
+
+def merge_patch(target: Any, patch: Any) -> Any:
+    """
+    应用 RFC 7396 JSON Merge Patch，不修改原文档
+
+    :param target: 原文档
+    :param patch: 合并补丁，值为 null 的字段会被删除
+    :return: 新文档
+    """
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def _add(document: Any, tokens: List[str], value: Any) -> Any:
+    """内部方法：在指定位置添加值，数组位置插入，对象位置新增或覆盖"""
+    if not tokens:
+        return value
+    parent = resolve_pointer(document, tokens[:-1])
+    last = tokens[-1]
+    if isinstance(parent, dict):
+        parent[last] = value
+    elif isinstance(parent, list):
+        parent.insert(array_index(last, len(parent), allow_end=True), value)
+    else:
+        raise JsonPointerNotFound(last)
+    return document
+
+
+def _remove(document: Any, tokens: List[str]) -> Any:
+    """内部方法：删除指定位置的值并返回被删除的值"""
+    if not tokens:
+        raise JsonPatchError('不能删除整个文档')
+    parent = resolve_pointer(document, tokens[:-1])
+    last = tokens[-1]
+    if isinstance(parent, dict):
+        if last not in parent:
+            raise JsonPointerNotFound(last)
+        return parent.pop(last)
+    if isinstance(parent, list):
+        return parent.pop(array_index(last, len(parent)))
+    raise JsonPointerNotFound(last)
+
+
+def _replace(document: Any, tokens: List[str], value: Any) -> Any:
+    """内部方法：替换已存在位置的值"""
+    resolve_pointer(document, tokens)
+    if not tokens:
+        return value
+    parent = resolve_pointer(document, tokens[:-1])
+    last = tokens[-1]
+    if isinstance(parent, list):
+        parent[array_index(last, len(parent))] = value
+    else:
+        parent[last] = value
+    return document
+
+
+def apply_json_patch(document: Any, operations: Any) -> Any:
+    """
+    应用 RFC 6902 JSON Patch，不修改原文档，任一操作失败则整体失败
+
+    :param document: 原文档
+    :param operations: 操作数组
+    :return: 新文档
+    """
+    if not isinstance(operations, list):
+        raise JsonPatchError('JSON Patch 必须是操作数组')
+    document = copy.deepcopy(document)
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or 'op' not in operation or 'path' not in operation:
+            raise JsonPatchError(f'第 {index} 个操作缺少 op 或 path')
+        op = operation['op']
+        path = operation['path']
+        if not isinstance(path, str):
+            raise JsonPatchError(f'第 {index} 个操作的 path 必须是字符串')
+        try:
+            tokens = parse_pointer(path)
+            if op in ('add', 'replace', 'test') and 'value' not in operation:
+                raise JsonPatchError(f'第 {index} 个操作缺少 value')
+            if op in ('move', 'copy'):
+                if 'from' not in operation:
+                    raise JsonPatchError(f'第 {index} 个操作缺少 from')
+                if not isinstance(operation['from'], str):
+                    raise JsonPatchError(f'第 {index} 个操作的 from 必须是字符串')
+
+            if op == 'add':
+                document = _add(document, tokens, copy.deepcopy(operation['value']))
+            elif op == 'remove':
+                _remove(document, tokens)
+            elif op == 'replace':
+                document = _replace(document, tokens, copy.deepcopy(operation['value']))
+            elif op == 'move':
+                from_tokens = parse_pointer(operation['from'])
+                if from_tokens != tokens and tokens[: len(from_tokens)] == from_tokens:
+                    raise JsonPatchError(f'第 {index} 个操作不能移动到自身的子路径')
+                if from_tokens != tokens:
+                    document = _add(document, tokens, _remove(document, from_tokens))
+            elif op == 'copy':
+                value = copy.deepcopy(resolve_pointer(document, parse_pointer(operation['from'])))
+                document = _add(document, tokens, value)
+            elif op == 'test':
+                if not _equal(resolve_pointer(document, tokens), operation['value'], numeric=True):
+                    raise JsonPatchTestFailed(f'第 {index} 个操作 test 比对失败: {path}')
+            else:
+                raise JsonPatchError(f'第 {index} 个操作不支持: {op}')
+        except (JsonPointerError, JsonPointerNotFound) as e:
+            raise JsonPatchError(f'第 {index} 个操作路径无效: {path}') from e
+    return document
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _equal(a: Any, b: Any, numeric: bool = False) -> bool:
+    """
+    内部方法：比较两个 JSON 值，true/false 与数字始终不相等
+
+    :param a:
+    :param b:
+    :param numeric: 为真时整数与浮点数按数值比较（RFC 6902 test 操作）；
+        为假时区分 1 与 1.0，生成的差异保留数字类型的变化
+    :return:
+    """
+    if numeric and _is_number(a) and _is_number(b):
+        return a == b
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_equal(a[key], b[key], numeric) for key in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_equal(x, y, numeric) for x, y in zip(a, b))
+    return a == b
+
+
+def diff_json(source: Any, target: Any, path: str = '') -> List[dict]:
+    """
+    生成将 source 变换为 target 的 RFC 6902 JSON Patch
+
+    :param source: 原文档
+    :param target: 目标文档
+    :param path: 当前位置的 JSON Pointer
+    :return: 操作数组，文档相同时为空
+    """
+    if _equal(source, target):
+        return []
+    if isinstance(source, dict) and isinstance(target, dict):
+        operations = []
+        for key in source:
+            if key not in target:
+                operations.append({'op': 'remove', 'path': f'{path}/{escape_token(key)}'})
+        for key, value in target.items():
+            child = f'{path}/{escape_token(key)}'
+            if key in source:
+                operations.extend(diff_json(source[key], value, child))
+            else:
+                operations.append({'op': 'add', 'path': child, 'value': value})
+        return operations
+    if isinstance(source, list) and isinstance(target, list):
+        # 跳过相同的前缀和后缀，只比较中间变化的部分
+        size = min(len(source), len(target))
+        start = 0
+        while start < size and _equal(source[start], target[start]):
+            start += 1
+        end = 0
+        while end < size - start and _equal(source[-1 - end], target[-1 - end]):
+            end += 1
+        source_middle = source[start:len(source) - end]
+        target_middle = target[start:len(target) - end]
+        common = min(len(source_middle), len(target_middle))
+        operations = []
+        for i in range(common):
+            operations.extend(diff_json(source_middle[i], target_middle[i], f'{path}/{start + i}'))
+        for i in range(len(source_middle) - 1, common - 1, -1):
+            operations.append({'op': 'remove', 'path': f'{path}/{start + i}'})
+        for i in range(common, len(target_middle)):
+            operations.append({'op': 'add', 'path': f'{path}/{start + i}', 'value': target_middle[i]})
+        return operations
+    return [{'op': 'replace', 'path': path, 'value': target}]
+
+
+def diff_merge_patch(source: Any, target: Any) -> Any:
+    """
+    生成将 source 变换为 target 的 RFC 7396 JSON Merge Patch
+
+    Merge Patch 以 null 表示删除，target 中值为 null 的字段无法表达，调用方需自行校验
+
+    :param source: 原文档
+    :param target: 目标文档
+    :return: 合并补丁，文档相同时为空对象
+    """
+    if not isinstance(source, dict) or not isinstance(target, dict):
+        return copy.deepcopy(target)
+    patch = {}
+    for key in source:
+        if key not in target:
+            patch[key] = None
+    for key, value in target.items():
+        if key not in source:
+            patch[key] = copy.deepcopy(value)
+        elif not _equal(source[key], value):
+            patch[key] = diff_merge_patch(source[key], value)
+    return patch
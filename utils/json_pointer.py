@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from typing import Any, List
+
+
+class JsonPointerError(ValueError):
+    """JSON Pointer 语法错误"""
+
+
+class JsonPointerNotFound(LookupError):
+    """JSON Pointer 指向的位置不存在"""
+
+
+def parse_pointer(pointer: str) -> List[str]:
+    """
+    解析 RFC 6901 JSON Pointer
+
+    :param pointer: 如 /smtp/to，空字符串表示整个文档
+    :return: 反转义后的引用片段
+    """
+    if pointer == '':
+        return []
+    if not pointer.startswith('/'):
+        raise JsonPointerError(f'JSON Pointer 必须以 / 开头: {pointer}')
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def escape_token(token: str) -> str:
+    """
+    转义 JSON Pointer 引用片段
+
+    :param token: 对象键名
+    :return:
+    """
+    return token.replace('~', '~0').replace('/', '~1')
+
+
+def array_index(token: str, size: int, *, allow_end: bool = False) -> int:
+    """
+    将引用片段解析为数组下标
+
+    :param token: 引用片段
+    :param size: 数组长度
+    :param allow_end: 是否允许 '-' 或等于长度的下标（用于追加）
+    :return:
+    """
+    if token == '-' and allow_end:
+        return size
+    # 只接受 ASCII 数字，str.isdigit 对 '²' 等字符同样返回 True
+    if not (token.isascii() and token.isdigit()) or (len(token) > 1 and token[0] == '0'):
+        raise JsonPointerNotFound(token)
+    index = int(token)
+    if index > size or (index == size and not allow_end):
+        raise JsonPointerNotFound(token)
+    return index
+
+
+def resolve_pointer(document: Any, pointer: str | List[str]) -> Any:
+    """
+    获取 JSON Pointer 指向的值
+
+    :param document: JSON 文档
+    :param pointer: JSON Pointer 字符串或已解析的引用片段
+    :return:
+    """
+    tokens = parse_pointer(pointer) if isinstance(pointer, str) else pointer
+    value = document
+    for token in tokens:
+        if isinstance(value, dict):
+            if token not in value:
+                raise JsonPointerNotFound(token)
+            value = value[token]
+        elif isinstance(value, list):
+            value = value[array_index(token, len(value))]
+        else:
+            raise JsonPointerNotFound(token)
+    return value
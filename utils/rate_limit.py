@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import time
+
+from collections import OrderedDict
+from typing import Any
+
+
+class TokenBucketLimiter:
+    """
+    进程内令牌桶限流器
+
+    每个桶只保存剩余令牌数及上次更新时间，取令牌时按流逝时间补充；桶数量超过上限时淘汰最久未使用的桶。
+    事件循环内单线程访问，无需加锁
+    """
+
+    def __init__(self, *, max_buckets: int) -> None:
+        self.max_buckets = max_buckets
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def acquire(self, key: str, rate: float, burst: int, cost: float = 1) -> float:
+        """
+        取令牌
+
+        :param key: 桶标识
+        :param rate: 每秒补充的令牌数
+        :param burst: 桶容量
+        :param cost: 本次消耗的令牌数
+        :return: 成功时为 0，令牌不足时为需要等待的秒数
+        """
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = float(burst)
+        else:
+            tokens = min(float(burst), bucket[0] + (now - bucket[1]) * rate)
+        retry_after = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            retry_after = (cost - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# 令牌桶的原子实现，时间取 Redis 服务器时间，避免各 worker 时钟偏差；结果以字符串返回，避免小数被截断
+_REDIS_ACQUIRE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = burst
+else
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+end
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(retry_after)
+"""
+
+
+class RedisTokenBucketLimiter:
+    """
+    基于 Redis 的共享令牌桶限流器，多个 worker 共用同一个桶
+
+    client 需提供 redis.asyncio.Redis 的 register_script 接口；桶在补满后自动过期
+    """
+
+    def __init__(self, client: Any, prefix: str) -> None:
+        self.prefix = prefix
+        self._script = client.register_script(_REDIS_ACQUIRE_SCRIPT)
+
+    async def acquire(self, key: str, rate: float, burst: int, cost: float = 1) -> float:
+        """
+        取令牌
+
+        :param key: 桶标识
+        :param rate: 每秒补充的令牌数
+        :param burst: 桶容量
+        :param cost: 本次消耗的令牌数
+        :return: 成功时为 0，令牌不足时为需要等待的秒数
+        """
+        result = await self._script(keys=[f'{self.prefix}:{key}'], args=[rate, burst, cost])
+        return float(result.decode() if isinstance(result, bytes) else result)
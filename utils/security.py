@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import hashlib
+import hmac
+
+
+def key_digest(key: str) -> bytes:
+    """
+    计算 API Key 的定长摘要，用于索引查找
+
+    :param key: API Key
+    :return: 32 字节 SHA-256 摘要
+    """
+    return hashlib.sha256(key.encode('utf-8')).digest()
+
+
+def keys_equal(stored: str, provided: str) -> bool:
+    """
+    常量时间比较 API Key，避免通过响应时间泄露 Key 前缀
+
+    :param stored: 数据库中的 API Key
+    :param provided: 请求携带的 API Key
+    :return:
+    """
+    return hmac.compare_digest(stored.encode('utf-8'), provided.encode('utf-8'))
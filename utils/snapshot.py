@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置快照文件
+
+只读的单文件格式，按 API Key 摘要排序的定长索引支持内存映射后直接二分查找::
+
+    [头部 80 字节][响应体 ...][索引 92 字节 * count]
+
+头部：magic(8) 格式版本(u16) 保留(u16) 条目数(u32) 生成时间毫秒(u64) 快照版本(u64)
+      数据起点(u64) 索引起点(u64) 响应体及索引的 SHA-256(32)
+索引：Key 摘要(32) API Key ID(u64) 配置版本号(u64) 内容哈希(32) 响应体偏移(u64) 响应体长度(u32)
+
+所有整数为小端序
+"""
+import hashlib
+import mmap
+import os
+import struct
+import time
+
+from typing import NamedTuple
+
+MAGIC = b'OPTSNAP\x00'
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct('<8sHHIQQQQ32s')
+ENTRY = struct.Struct('<32sQQ32sQI')
+DIGEST_SIZE = 32
+
+
+class SnapshotError(Exception):
+    """快照文件无效"""
+
+
+class SnapshotRecord(NamedTuple):
+    """快照中单个 API Key 的配置"""
+
+    api_key_id: int
+    revision: int
+    content_hash: str
+    body: bytes
+
+
+class SnapshotInfo(NamedTuple):
+    """快照文件概要"""
+
+    path: str
+    count: int
+    version: int
+    created_ms: int
+    size: int
+
+
+class SnapshotWriter:
+    """
+    快照写入器
+
+    响应体按添加顺序写入临时文件，索引在内存中排序后追加到末尾，成功后原子替换目标文件；
+    作为上下文管理器使用时，异常退出会删除临时文件
+    """
+
+    def __init__(self, path: str, version: int | None = None) -> None:
+        self.path = path
+        self.created_ms = int(time.time() * 1000)
+        self.version = self.created_ms if version is None else version
+        self._tmp_path = f'{path}.tmp'
+        self._file = open(self._tmp_path, 'wb')
+        self._file.write(bytes(HEADER.size))
+        self._offset = HEADER.size
+        self._hash = hashlib.sha256()
+        self._index: list[tuple[bytes, int, int, bytes, int, int]] = []
+        self._bodies: dict[str, tuple[int, int]] = {}
+
+    def has_body(self, content_hash: str) -> bool:
+        """
+        是否已写入该内容的响应体
+
+        :param content_hash: 十六进制内容哈希
+        :return:
+        """
+        return content_hash in self._bodies
+
+    def add(self, digest: bytes, api_key_id: int, revision: int, content_hash: str, body: bytes | None) -> None:
+        """
+        添加一个 API Key 的配置，相同内容的响应体只写入一次，多个索引指向同一位置
+
+        :param digest: API Key 的 SHA-256 摘要
+        :param api_key_id: API Key ID
+        :param revision: 配置版本号
+        :param content_hash: 十六进制内容哈希
+        :param body: get-config 响应体，该内容已写入时可为 None
+        :return:
+        """
+        if len(digest) != DIGEST_SIZE:
+            raise SnapshotError('API Key 摘要长度应为 32 字节')
+        location = self._bodies.get(content_hash)
+        if location is None:
+            if body is None:
+                raise SnapshotError(f'缺少内容 {content_hash} 的响应体')
+            self._file.write(body)
+            self._hash.update(body)
+            location = self._bodies[content_hash] = (self._offset, len(body))
+            self._offset += len(body)
+        self._index.append((digest, api_key_id, revision, bytes.fromhex(content_hash), *location))
+
+    def commit(self) -> SnapshotInfo:
+        """
+        写入索引和头部并替换目标文件
+
+        :return:
+        """
+        self._index.sort(key=lambda item: item[0])
+        index_offset = self._offset
+        previous = None
+        for item in self._index:
+            if item[0] == previous:
+                raise SnapshotError('快照中存在重复的 API Key')
+            previous = item[0]
+            packed = ENTRY.pack(*item)
+            self._file.write(packed)
+            self._hash.update(packed)
+        self._file.seek(0)
+        self._file.write(
+            HEADER.pack(
+                MAGIC, FORMAT_VERSION, 0, len(self._index), self.created_ms, self.version,
+                HEADER.size, index_offset, self._hash.digest(),
+            )
+        )
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        size = index_offset + ENTRY.size * len(self._index)
+        return SnapshotInfo(self.path, len(self._index), self.version, self.created_ms, size)
+
+    def abort(self) -> None:
+        """丢弃未完成的快照"""
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def __enter__(self) -> 'SnapshotWriter':
+        return self
+
+    def __exit__(self, exc_type, *args) -> None:
+        if exc_type is not None and not self._file.closed:
+            self.abort()
+
+
+class SnapshotReader:
+    """
+    内存映射的快照读取器
+
+    查找时直接在映射内存上对索引二分查找，不复制索引；只有命中的响应体被复制一次
+    """
+
+    def __init__(self, path: str, *, verify: bool = True) -> None:
+        self.path = path
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        try:
+            self._load_header(verify)
+        except Exception:
+            self.close()
+            raise
+
+    def _load_header(self, verify: bool) -> None:
+        if len(self._view) < HEADER.size:
+            raise SnapshotError('快照文件不完整')
+        (magic, format_version, _, count, created_ms, version, data_offset, index_offset, checksum) = HEADER.unpack_from(
+            self._view
+        )
+        if magic != MAGIC:
+            raise SnapshotError('不是配置快照文件')
+        if format_version != FORMAT_VERSION:
+            raise SnapshotError(f'不支持的快照格式版本: {format_version}')
+        if index_offset + ENTRY.size * count != len(self._view):
+            raise SnapshotError('快照文件长度与索引不一致')
+        if verify and hashlib.sha256(self._view[data_offset:]).digest() != checksum:
+            raise SnapshotError('快照文件校验失败')
+        self.count = count
+        self.created_ms = created_ms
+        self.version = version
+        self._index_offset = index_offset
+
+    def _digest_at(self, position: int) -> memoryview:
+        start = self._index_offset + position * ENTRY.size
+        return self._view[start:start + DIGEST_SIZE]
+
+    def get(self, digest: bytes) -> SnapshotRecord | None:
+        """
+        按 API Key 摘要查找
+
+        :param digest: API Key 的 SHA-256 摘要
+        :return: 不存在时返回 None
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._digest_at(middle).tobytes() < digest:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.count or self._digest_at(low) != digest:
+            return None
+        _, api_key_id, revision, content_hash, offset, length = ENTRY.unpack_from(
+            self._view, self._index_offset + low * ENTRY.size
+        )
+        return SnapshotRecord(api_key_id, revision, content_hash.hex(), self._view[offset:offset + length].tobytes())
+
+    def info(self) -> SnapshotInfo:
+        return SnapshotInfo(self.path, self.count, self.version, self.created_ms, len(self._view))
+
+    def close(self) -> None:
+        """释放内存映射"""
+        self._view.release()
+        self._mmap.close()
+
+    def __len__(self) -> int:
+        return self.count
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import json
+import zlib
+
+from typing import Any, NamedTuple
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.dialects import mysql
+from sqlalchemy.types import TypeDecorator
+
+from backend.plugin.option.conf import option_settings
+from backend.plugin.option.utils.content import canonical_json
+
+# 压缩存储的前缀，合法 JSON 文本不会以 NUL 开头
+ZLIB_PREFIX = b'\x00z'
+
+
+class StoredConfig(bytes):
+    """已编码的配置存储值，写入时不再重复序列化"""
+
+
+class EncodedConfig(NamedTuple):
+    """配置数据的规范化 JSON 及存储值"""
+
+    body: bytes
+    stored: StoredConfig
+
+
+def encode_config(config_data: Any) -> EncodedConfig:
+    """
+    编码配置数据，规范化 JSON 超过阈值时以 zlib 压缩存储
+
+    大文档应在线程池中调用
+
+    :param config_data: 配置数据
+    :return:
+    """
+    body = canonical_json(config_data)
+    return EncodedConfig(body, store_body(body))
+
+
+def store_body(body: bytes) -> StoredConfig:
+    """
+    由规范化 JSON 生成存储值，超过阈值时以 zlib 压缩
+
+    :param body: 规范化 JSON
+    :return:
+    """
+    if len(body) >= option_settings.CONFIG_COMPRESS_MIN_SIZE:
+        return StoredConfig(ZLIB_PREFIX + zlib.compress(body, option_settings.CONFIG_COMPRESS_LEVEL))
+    return StoredConfig(body)
+
+
+def decode_config(raw: bytes | str | None) -> Any:
+    """
+    解码配置存储值，兼容迁移前的 JSON 文本
+
+    :param raw: 存储值
+    :return: 配置数据
+    """
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        return json.loads(raw)
+    raw = bytes(raw)
+    if raw.startswith(ZLIB_PREFIX):
+        raw = zlib.decompress(raw[len(ZLIB_PREFIX):])
+    return json.loads(raw)
+
+
+class ConfigJSON(TypeDecorator):
+    """
+    配置数据列类型
+
+    以规范化 JSON 存入二进制列，大文档压缩存储；读取时自动解码。
+    需要在线程池中解码时，查询可用 type_coerce(column, LargeBinary) 取得原始存储值
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect: Any) -> Any:
+        if dialect.name == 'mysql':
+            return dialect.type_descriptor(mysql.LONGBLOB())
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value: Any, dialect: Any) -> bytes:
+        if isinstance(value, StoredConfig):
+            return bytes(value)
+        return bytes(encode_config(value).stored)
+
+    def process_result_value(self, value: Any, dialect: Any) -> Any:
+        return decode_config(value)
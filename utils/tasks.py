@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import contextvars
+
+from typing import Any, Coroutine
+
+
+def create_background_task(coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+    """
+    在空上下文中创建后台任务
+
+    create_task 会复制当前上下文，后台任务通常由某个请求首次触发启动，
+    在空上下文中创建才不会沿用该请求的服务方法指标归属及剖析记录
+
+    :param coro:
+    :return:
+    """
+    return contextvars.Context().run(asyncio.get_running_loop().create_task, coro)